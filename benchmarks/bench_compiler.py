@@ -0,0 +1,205 @@
+"""
+Benchmark the compiler pipeline on a generated source tree (see synthetic.source_tree).
+
+Usage: python benchmarks/bench_compiler.py [--tables N] [--columns N] [--indexes N] [--lob-ratio R]
+                                           [--plsql N] [--plsql-size BYTES] [--jobs N] [--repeat N]
+                                           [--save-baseline FILE] [--baseline FILE] [--tolerance R]
+
+It times compile_db end to end and each of its phases (from the build report DB.REPORT.json), then each step on its
+own: parse_table, table_ddl, table_ctl_file, dbmeta rendering, generate_ifs_model_script and the tgz packaging.
+
+--save-baseline stores the timings, --baseline compares the timings with a stored baseline and fails (exit code 1)
+if one of them is slower than the baseline by more than the tolerance (25% by default).
+"""
+
+__author__ = 'yufa'
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+import ezdb
+import ezdb.compiler.xmlparser as xmlparser
+import ezdb.compiler.dbobject.dbmeta as dbmeta
+import ezdb.generator.ifs as installation
+from ezdb.compiler.report import REPORT_FILE
+
+
+_BASELINE_VERSION = 1
+
+# A timing is not a regression if it is slower than the baseline by less than this (seconds), whatever the tolerance
+_MIN_DELTA = 0.01
+
+_RELEASE_NUMBER = '4.0.0.0'
+
+
+def _timed(func, *args):
+	start = time.time()
+	func(*args)
+	return time.time() - start
+
+
+def _xmlfiles(db_dir, folder):
+	folder = os.path.join(db_dir, folder)
+	return [os.path.join(folder, file_name) for file_name in sorted(os.listdir(folder))]
+
+
+def _bench_compile_db(common_db_dir, source_db_dir, work_dir, jobs, repeat):
+	"""
+	Time compile_db end to end, and each of its phases.
+	"""
+
+	results = {}
+	for i in range(repeat):
+		target_dir = os.path.join(work_dir, 'out_%d' % i)
+		os.mkdir(target_dir)
+		results['compile_db'] = min(results.get('compile_db', sys.maxint),
+		                            _timed(ezdb.compile_db, common_db_dir, source_db_dir, target_dir, _RELEASE_NUMBER,
+		                                   False, jobs))
+
+		with open(os.path.join(target_dir, REPORT_FILE)) as f:
+			for phase in json.load(f)['phases']:
+				name = 'compile_db.%s' % phase['name']
+				results[name] = min(results.get(name, sys.maxint), phase['wall_seconds'])
+		shutil.rmtree(target_dir)
+	return results
+
+
+def _bench_steps(common_db_dir, source_db_dir, work_dir, repeat):
+	"""
+	Time each step of the compilation on its own.
+	"""
+
+	results = {}
+
+	def timed(name, func, *args):
+		results[name] = min(_timed(func, *args) for _ in range(repeat))
+
+	dbmeta.set_db_objects_table(xmlparser.parse_table(os.path.join(common_db_dir, 'TABLE', 'DB_OBJECTS.XML')))
+	dbmeta.set_db_table_columns_table(xmlparser.parse_table(os.path.join(common_db_dir, 'TABLE', 'DB_TABLE_COLUMNS.XML')))
+
+	xmlfiles = _xmlfiles(source_db_dir, 'TABLE')
+	tables = []
+	timed('parse_table', lambda: tables.__setitem__(slice(None), [xmlparser.parse_table(xmlfile) for xmlfile in xmlfiles]))
+
+	timed('table_ddl', lambda: [(table.table_ddl(), table.index_ddl()) for table in tables])
+
+	loadable = [table for table in tables if not any(column.data_type == 'BLOB' for column in table.columns.values())]
+	for table in loadable:
+		table.init_on_install = 'Y'
+	timed('table_ctl_file', lambda: [table.table_ctl_file() for table in loadable])
+
+	timed('dbmeta', lambda: [(table.table_metadata(), table.table_index_metadata(), table.table_column_metadata())
+	                         for table in tables])
+
+	install_objects = [obj for table in tables for obj in installation.table_install_objects(table)]
+	for folder in synthetic.PLSQL_TYPES:
+		for xmlfile in _xmlfiles(source_db_dir, folder):
+			if xmlfile.endswith('.XML'):
+				install_objects.append(installation.InstallObject(folder, xmlparser.parse_plsql(xmlfile).install_order,
+				                                                  os.path.basename(xmlfile).split('.')[0], 0))
+	timed('generate_ifs_model_script',
+	      lambda: ''.join(installation.generate_ifs_model_script(install_objects, _RELEASE_NUMBER)))
+
+	# The packaging of the DB folder, i.e. the package phase of a build writing the DB folder first. The DB folder is
+	# kept by an incremental compilation, so the next builds only package it again.
+	target_dir = os.path.join(work_dir, 'steps')
+	os.mkdir(target_dir)
+	compiler = ezdb.Compiler()
+	compiler.set_output_mode('directory')
+	compiler.compile_db(common_db_dir, source_db_dir, target_dir, _RELEASE_NUMBER, True)
+	for _ in range(repeat):
+		compiler.compile_db(common_db_dir, source_db_dir, target_dir, _RELEASE_NUMBER, True)
+		with open(os.path.join(target_dir, REPORT_FILE)) as f:
+			seconds = [phase['wall_seconds'] for phase in json.load(f)['phases'] if phase['name'] == 'package'][0]
+		results['tgz'] = min(results.get('tgz', sys.maxint), seconds)
+
+	shutil.rmtree(target_dir)
+	return results
+
+
+def _compare(results, baseline, tolerance):
+	"""
+	Print the timings against the baseline and return the names of the regressions.
+	"""
+
+	regressions = []
+	print '%-32s %10s %10s %8s' % ('', 'baseline', 'current', 'ratio')
+	for name in sorted(set(results) | set(baseline)):
+		current, previous = results.get(name), baseline.get(name)
+		if current is None or previous is None:
+			print '%-32s %10s %10s %8s' % (name, '%.3f' % previous if previous is not None else '-',
+			                               '%.3f' % current if current is not None else '-', '')
+			continue
+
+		ratio = current / previous if previous else 1.0
+		regression = current > previous * (1 + tolerance) and current - previous > _MIN_DELTA
+		regression and regressions.append(name)
+		print '%-32s %10.3f %10.3f %7.2fx%s' % (name, previous, current, ratio, '  REGRESSION' if regression else '')
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark the compiler pipeline on a generated source tree.')
+	parser.add_argument('--tables', type=int, default=500)
+	parser.add_argument('--columns', type=int, default=30)
+	parser.add_argument('--indexes', type=int, default=3)
+	parser.add_argument('--lob-ratio', type=float, default=0.05)
+	parser.add_argument('--plsql', type=int, default=120)
+	parser.add_argument('--plsql-size', type=int, default=8192, help='size of a plsql source file in bytes')
+	parser.add_argument('--jobs', type=int, default=1, help='number of processes used by compile_db')
+	parser.add_argument('--repeat', type=int, default=3)
+	parser.add_argument('--save-baseline', metavar='FILE', help='store the timings in the given file')
+	parser.add_argument('--baseline', metavar='FILE', help='compare the timings with the given baseline file')
+	parser.add_argument('--tolerance', type=float, default=0.25,
+	                    help='fail if a timing is slower than the baseline by more than this ratio')
+	args = parser.parse_args()
+
+	parameters = {'tables': args.tables, 'columns': args.columns, 'indexes': args.indexes,
+	              'lob_ratio': args.lob_ratio, 'plsql': args.plsql, 'plsql_size': args.plsql_size, 'jobs': args.jobs}
+
+	baseline = None
+	if args.baseline:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+		if baseline.get('version') != _BASELINE_VERSION or baseline.get('parameters') != parameters:
+			print 'FAILED: the baseline %s was measured with other parameters: %s' % (args.baseline,
+			                                                                           baseline.get('parameters'))
+			return 2
+
+	work_dir = tempfile.mkdtemp(prefix='ezdb_bench_')
+	try:
+		common_db_dir, source_db_dir = synthetic.source_tree(os.path.join(work_dir, 'src'), args.tables, args.columns,
+		                                                     args.indexes, args.lob_ratio, args.plsql, args.plsql_size)
+		print '%d tables (%d columns, %d indexes), %d plsql objects.' % (args.tables, args.columns, args.indexes,
+		                                                                 args.plsql)
+
+		results = _bench_compile_db(common_db_dir, source_db_dir, work_dir, args.jobs, args.repeat)
+		results.update(_bench_steps(common_db_dir, source_db_dir, work_dir, args.repeat))
+	finally:
+		shutil.rmtree(work_dir)
+
+	if args.save_baseline:
+		with open(args.save_baseline, 'w') as f:
+			json.dump({'version': _BASELINE_VERSION, 'parameters': parameters, 'results': results}, f,
+			          indent=2, sort_keys=True)
+		print 'Baseline saved: %s' % args.save_baseline
+
+	regressions = _compare(results, baseline['results'] if baseline else {}, args.tolerance)
+	if regressions:
+		print 'FAILED: %d regression(s): %s' % (len(regressions), ', '.join(regressions))
+		return 1
+	return 0
+
+
+if __name__ == '__main__':
+	import logging
+	logging.disable(logging.CRITICAL)
+	sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Measure the generation of the DB_OBJECTS/DB_TABLE_COLUMNS DAT rows (see ezdb.compiler.dbobject.dbmeta).
+
+Usage: python benchmarks/bench_dbmeta.py [--tables N] [--columns N] [--indexes N] [--repeat N]
+
+The rows are generated by the row encoders of dbmeta and by the reference implementation below (the previous
+per-row dict merge + str.format), which must produce identical DAT files, otherwise the benchmark fails.
+"""
+
+__author__ = 'yufa'
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+import ezdb.compiler.xmlparser as xmlparser
+import ezdb.compiler.dbobject.dbmeta as dbmeta
+
+
+class ReferenceRows(object):
+	"""
+	Rows generated as dbmeta did before the row encoders: the defaults are merged and escaped again for each row.
+	"""
+
+	def __init__(self, table_db_objects, table_db_table_columns):
+		self.table_db_objects = table_db_objects
+		self.table_db_table_columns = table_db_table_columns
+		self.db_objects_template = self._template(table_db_objects)
+		self.db_table_columns_template = self._template(table_db_table_columns)
+
+	@staticmethod
+	def _template(table):
+		return ','.join(['"{%s}"' % item.name.lower() for item in table.sorted_columns()]) + '#$EOR$#\n'
+
+	@staticmethod
+	def _params(table, values):
+		params = {}
+		for k, v in table.columns.iteritems():
+			k = k.lower()
+			if k not in values:
+				params[k] = v.default_value.strip("'")
+		params.update(values)
+		for k, v in params.iteritems():
+			if isinstance(v, str):
+				params[k] = v.replace('"', '""')
+		return params
+
+	def db_table_columns_metadata(self, table_name, sorted_columns):
+		rows = []
+		for idx, column in enumerate(sorted_columns):
+			col_dict = dict(column.as_dict())
+			col_dict['table_name'] = table_name
+			col_dict['column_id'] = idx + 1
+			rows.append(self.db_table_columns_template.format(**self._params(self.table_db_table_columns, col_dict)))
+		return ''.join(rows)
+
+	def db_objects_metadata(self, **kwargs):
+		return self.db_objects_template.format(**self._params(self.table_db_objects, kwargs))
+
+
+def _generate(rows, tables):
+	"""
+	Return the content of DB_OBJECTS.DAT and DB_TABLE_COLUMNS.DAT generated for the given tables, the same rows as
+	Table.table_metadata, table_index_metadata and table_column_metadata.
+	"""
+
+	db_objects = []
+	db_table_columns = []
+	for table in tables:
+		db_objects.append(rows.db_objects_metadata(
+			table_name=table.name, table_type=table.type, object_type='TABLE',
+			standard_custom=table.standard_or_custom, description=table.documentation, release=table.release,
+			relevant_for=table.products_formula, story_id=table.story, init_on_install=table.init_on_install,
+			init_on_upgrade=table.init_on_upgrade, init_on_demand=table.init_on_demand, ini_trans=table.init_trans,
+			logging=table.logging))
+		for index in table.indexes.values():
+			db_objects.append(rows.db_objects_metadata(
+				table_name=index.name, table_type=index.type, hist_table_name=table.name, parameter=index.columns,
+				object_type='INDEX', standard_custom=table.standard_or_custom, release=index.release,
+				relevant_for=table.products_formula, story_id=index.story))
+		db_table_columns.append(rows.db_table_columns_metadata(table.name, table.sorted_columns()))
+	return ''.join(db_objects), ''.join(db_table_columns)
+
+
+def _parse(work_dir, name, content):
+	xmlfile = os.path.join(work_dir, name + '.XML')
+	with open(xmlfile, 'w') as f:
+		f.write(content)
+	return xmlparser.parse_table(xmlfile)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark the generation of the dictionary DAT rows.')
+	parser.add_argument('--tables', type=int, default=2000)
+	parser.add_argument('--columns', type=int, default=40)
+	parser.add_argument('--indexes', type=int, default=3)
+	parser.add_argument('--repeat', type=int, default=3)
+	args = parser.parse_args()
+
+	work_dir = tempfile.mkdtemp(prefix='ezdb_bench_')
+	try:
+		table_db_objects = _parse(work_dir, 'DB_OBJECTS', synthetic.dictionary_table_xml('DB_OBJECTS'))
+		table_db_table_columns = _parse(work_dir, 'DB_TABLE_COLUMNS', synthetic.dictionary_table_xml('DB_TABLE_COLUMNS'))
+		dbmeta.set_db_objects_table(table_db_objects)
+		dbmeta.set_db_table_columns_table(table_db_table_columns)
+
+		tables = [_parse(work_dir, 'LO_BENCH_%05d' % i,
+		                 synthetic.table_xml('LO_BENCH_%05d' % i, args.columns, args.indexes))
+		          for i in range(args.tables)]
+		row_count = sum(1 + len(table.indexes) + len(table.columns) for table in tables)
+	finally:
+		shutil.rmtree(work_dir)
+
+	print '%d tables, %d DAT rows.' % (args.tables, row_count)
+
+	implementations = (('reference', ReferenceRows(table_db_objects, table_db_table_columns)), ('encoder', dbmeta))
+	reference = _generate(implementations[0][1], tables)
+	for name, rows in implementations:
+		if _generate(rows, tables) != reference:
+			print 'FAILED: %s generates different rows.' % name
+			return 1
+
+	print '%-10s %10s %12s %10s %8s' % ('rows', 'seconds', 'rows/s', 'MB/s', 'speedup')
+	size = sum(len(dat) for dat in reference) / 1048576.0
+	baseline = None
+	for name, rows in implementations:
+		seconds = min(_timed(_generate, rows, tables) for _ in range(args.repeat))
+		baseline = baseline or seconds
+		print '%-10s %10.3f %12.0f %10.2f %7.2fx' % (name, seconds, row_count / seconds, size / seconds, baseline / seconds)
+	return 0
+
+
+def _timed(func, *args):
+	start = time.time()
+	func(*args)
+	return time.time() - start
+
+
+if __name__ == '__main__':
+	import logging
+	logging.disable(logging.CRITICAL)
+	sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Measure the memory used by the schema model (Table/Column/Index objects) of a generated schema.
+
+Usage: python benchmarks/bench_memory.py [--tables N] [--columns N] [--indexes N]
+
+The table xml files are generated first, then parsed and kept in memory by a fresh python process, which reports
+its peak resident set size (ru_maxrss) before and after parsing.
+"""
+
+__author__ = 'yufa'
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+
+
+def _peak_rss():
+	"""
+	Return the peak resident set size of the current process in KB.
+	"""
+
+	import resource
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak / 1024 if sys.platform == 'darwin' else peak
+
+
+def _measure(xml_dir):
+	"""
+	Parse all the table xml files of the given folder and print the peak RSS before and after parsing (as json).
+	"""
+
+	from ezdb.compiler.registry import ModelRegistry
+
+	registry = ModelRegistry()
+	before = _peak_rss()
+	for file_name in sorted(os.listdir(xml_dir)):
+		registry.table(os.path.join(xml_dir, file_name))
+	tables = registry.tables()
+	after = _peak_rss()
+
+	print json.dumps({'tables': len(tables),
+	                  'columns': sum(len(table.columns) for table in tables),
+	                  'before_kb': before,
+	                  'after_kb': after})
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark the memory used by the schema model.')
+	parser.add_argument('--tables', type=int, default=5000)
+	parser.add_argument('--columns', type=int, default=60)
+	parser.add_argument('--indexes', type=int, default=3)
+	parser.add_argument('--xml-dir', help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.xml_dir:
+		_measure(args.xml_dir)
+		return 0
+
+	try:
+		_peak_rss()
+	except ImportError:
+		print 'The module resource is not available on this platform.'
+		return 1
+
+	work_dir = tempfile.mkdtemp(prefix='ezdb_bench_')
+	try:
+		for i in range(args.tables):
+			with open(os.path.join(work_dir, 'LO_BENCH_%05d.XML' % i), 'w') as f:
+				f.write(synthetic.table_xml('LO_BENCH_%05d' % i, args.columns, args.indexes))
+
+		result = json.loads(subprocess.check_output([sys.executable, os.path.abspath(__file__), '--xml-dir', work_dir]))
+	finally:
+		shutil.rmtree(work_dir)
+
+	model_kb = result['after_kb'] - result['before_kb']
+	print '%d tables, %d columns.' % (result['tables'], result['columns'])
+	print 'peak RSS: %.1f MB (%.1f MB before parsing)' % (result['after_kb'] / 1024.0, result['before_kb'] / 1024.0)
+	print 'model:    %.1f MB, %.0f bytes per column' % (model_kb / 1024.0, model_kb * 1024.0 / max(result['columns'], 1))
+	return 0
+
+
+if __name__ == '__main__':
+	import logging
+	logging.disable(logging.CRITICAL)
+	sys.exit(main())
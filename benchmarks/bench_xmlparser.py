@@ -0,0 +1,92 @@
+"""
+Compare the xml parser backends (see ezdb.compiler.xmlparser.PARSER_BACKENDS) on generated table xml files.
+
+Usage: python benchmarks/bench_xmlparser.py [--tables N] [--columns N] [--indexes N] [--repeat N]
+
+All the backends must build identical Table objects, otherwise the benchmark fails.
+"""
+
+__author__ = 'yufa'
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+import ezdb.compiler.xmlparser as xmlparser
+
+
+def _table_signature(table):
+	columns = [(column.as_dict().items(), column.sql_loader_ctl_expression) for column in table.sorted_columns()]
+	indexes = sorted((index.name, index.type, index.columns, index.story, index.release)
+	                 for index in table.indexes.itervalues())
+	attributes = (table.name, table.documentation, table.story, table.products_formula, table.release, table.type,
+	              table.logging, table.init_on_install, table.init_on_upgrade, table.init_on_demand,
+	              table.standard_or_custom, table.init_trans)
+	return attributes, columns, indexes
+
+
+def _parse_all(backend, xmlfiles):
+	xmlparser.set_parser_backend(backend)
+	return [xmlparser.parse_table(xmlfile) for xmlfile in xmlfiles]
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark the xml parser backends.')
+	parser.add_argument('--tables', type=int, default=200)
+	parser.add_argument('--columns', type=int, default=300)
+	parser.add_argument('--indexes', type=int, default=4)
+	parser.add_argument('--repeat', type=int, default=3)
+	args = parser.parse_args()
+
+	work_dir = tempfile.mkdtemp(prefix='ezdb_bench_')
+	try:
+		xmlfiles = []
+		for i in range(args.tables):
+			xmlfile = os.path.join(work_dir, 'LO_BENCH_%05d.XML' % i)
+			with open(xmlfile, 'w') as f:
+				f.write(synthetic.table_xml('LO_BENCH_%05d' % i, args.columns, args.indexes))
+			xmlfiles.append(xmlfile)
+		size = sum(os.path.getsize(xmlfile) for xmlfile in xmlfiles)
+
+		print '%d table xml files, %d columns each, %.1f MB in total.' % (args.tables, args.columns, size / 1048576.0)
+
+		signatures = {}
+		for backend in xmlparser.PARSER_BACKENDS:
+			signatures[backend] = [_table_signature(table) for table in _parse_all(backend, xmlfiles)]
+		reference = signatures[xmlparser.PARSER_BACKENDS[0]]
+		for backend, signature in signatures.iteritems():
+			if signature != reference:
+				print 'FAILED: backend %s builds different tables.' % backend
+				return 1
+
+		timings = {}
+		for backend in xmlparser.PARSER_BACKENDS:
+			timings[backend] = min(_timed(_parse_all, backend, xmlfiles) for _ in range(args.repeat))
+
+		baseline = timings[xmlparser.PARSER_BACKENDS[0]]
+		print '%-8s %10s %12s %10s %8s' % ('backend', 'seconds', 'tables/s', 'MB/s', 'speedup')
+		for backend in xmlparser.PARSER_BACKENDS:
+			seconds = timings[backend]
+			print '%-8s %10.3f %12.1f %10.2f %7.2fx' % (backend, seconds, args.tables / seconds,
+			                                           size / 1048576.0 / seconds, baseline / seconds)
+		return 0
+	finally:
+		shutil.rmtree(work_dir)
+
+
+def _timed(func, *args):
+	start = time.time()
+	func(*args)
+	return time.time() - start
+
+
+if __name__ == '__main__':
+	import logging
+	logging.disable(logging.CRITICAL)
+	sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Synthetic SaveDB xml files used by the benchmarks.
+"""
+
+__author__ = 'yufa'
+
+import os
+import random
+from xml.sax.saxutils import escape, quoteattr
+
+
+SCALAR_TYPES = ('NUMBER', 'NUMBER(10)', 'NUMBER(18,4)', 'VARCHAR2(30)', 'VARCHAR2(255)', 'VARCHAR2(4000)',
+                'CHAR(1)', 'DATE', 'TIMESTAMP(6)', 'RAW(16)')
+LOB_TYPES = ('CLOB', 'BLOB')
+
+
+def _attrs(mapping):
+	return ''.join(' %s=%s' % (k, quoteattr(str(v))) for k, v in mapping if v is not None)
+
+
+def table_xml(name, columns=20, indexes=2, lob_ratio=0.05, rnd=None, init_on_install='N'):
+	"""
+	Return the content of a table xml file with the given number of columns and indexes.
+	"""
+
+	rnd = rnd or random.Random(name)
+	lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+	         '<table%s>' % _attrs([('name', name), ('story', 'US%d' % rnd.randint(1, 999999)), ('release', '4.0.0.0'),
+	                              ('type', 'REGULAR'), ('init_on_install', init_on_install)]),
+	         '  <documentation>%s</documentation>' % escape('Synthetic table %s, "generated" for benchmarks.' % name),
+	         '  <columns>']
+
+	column_names = ['ID'] + ['COL_%04d' % i for i in range(1, columns)]
+	for i, column in enumerate(column_names):
+		if i == 0:
+			data_type = 'NUMBER'
+		elif rnd.random() < lob_ratio:
+			data_type = rnd.choice(LOB_TYPES)
+		else:
+			data_type = rnd.choice(SCALAR_TYPES)
+
+		lines.append('    <column%s>' % _attrs([('name', column), ('data_type', data_type),
+		                                        ('nullable', 'N' if i == 0 else rnd.choice('YN')),
+		                                        ('story', 'US138139'), ('release', '4.0.0.0'), ('products', 'W')]))
+		lines.append('      <documentation>Column %s of %s</documentation>' % (column, name))
+		if data_type.startswith('CHAR') and rnd.random() < 0.5:
+			lines.append("      <default_value>'N'</default_value>")
+		lines.append('    </column>')
+
+	lines.append('  </columns>')
+	lines.append('  <indexes>')
+	for i in range(indexes):
+		if i == 0:
+			index_type, index_columns = 'PRIMARY', ['ID']
+		else:
+			index_type = 'UNIQUE' if i % 3 == 0 else 'NON-UNIQUE'
+			index_columns = rnd.sample(column_names[1:], min(len(column_names) - 1, rnd.randint(1, 3)))
+		if not index_columns: continue
+
+		index_name = 'PK_%s' % name[:27] if i == 0 else 'I%d_%s' % (i, name[:26])
+		lines.append('    <index%s>' % _attrs([('old_name', index_name), ('type', index_type)]))
+		lines.append('      <columns>')
+		lines.extend('        <column%s/>' % _attrs([('name', column)]) for column in index_columns)
+		lines.append('      </columns>')
+		lines.append('    </index>')
+	lines.append('  </indexes>')
+	lines.append('</table>')
+
+	return '\n'.join(lines) + '\n'
+
+
+PLSQL_TYPES = ('PACKAGE', 'PROCEDURE', 'FUNCTION', 'TYPE', 'TRIGGER', 'SEQUENCE')
+
+
+def plsql_xml(object_type, name, install_order=1):
+	"""
+	Return the content of a plsql object (PACKAGE, PROCEDURE, ...) xml file.
+	"""
+
+	tag = object_type.lower()
+	return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+	        '<{tag}{attrs}>\n'
+	        '  <documentation>Synthetic {object_type} {name}</documentation>\n'
+	        '</{tag}>\n').format(tag=tag, object_type=object_type, name=name,
+	                             attrs=_attrs([('name', name), ('story', 'US138139'), ('install_order', install_order)]))
+
+
+DB_OBJECTS_COLUMNS = (('TABLE_NAME', 'VARCHAR2(30)', None), ('TABLE_TYPE', 'VARCHAR2(30)', None),
+                      ('OBJECT_TYPE', 'VARCHAR2(30)', None), ('STANDARD_CUSTOM', 'VARCHAR2(1)', "'S'"),
+                      ('DESCRIPTION', 'VARCHAR2(4000)', None), ('RELEASE', 'VARCHAR2(30)', None),
+                      ('RELEVANT_FOR', 'VARCHAR2(30)', None), ('STORY_ID', 'VARCHAR2(30)', None),
+                      ('INIT_ON_INSTALL', 'VARCHAR2(1)', "'N'"), ('INIT_ON_UPGRADE', 'VARCHAR2(1)', "'N'"),
+                      ('INIT_ON_DEMAND', 'VARCHAR2(1)', "'N'"), ('INI_TRANS', 'NUMBER', None),
+                      ('LOGGING', 'VARCHAR2(1)', None), ('HIST_TABLE_NAME', 'VARCHAR2(30)', None),
+                      ('PARAMETER', 'VARCHAR2(4000)', None), ('INSTALL_ORDER', 'NUMBER', '1'),
+                      ('CREATED', 'DATE', 'SYSDATE'))
+DB_TABLE_COLUMNS_COLUMNS = (('TABLE_NAME', 'VARCHAR2(30)', None), ('COLUMN_NAME', 'VARCHAR2(30)', None),
+                            ('COLUMN_ID', 'NUMBER', None), ('DATA_TYPE', 'VARCHAR2(100)', None),
+                            ('NULLABLE', 'VARCHAR2(1)', None), ('DEFAULT_VALUE', 'VARCHAR2(4000)', None),
+                            ('COLUMN_DESC', 'VARCHAR2(4000)', None), ('STORY_ID', 'VARCHAR2(30)', None),
+                            ('RELEASE', 'VARCHAR2(30)', None), ('PRODUCTS', 'VARCHAR2(30)', None),
+                            ('DEPRECATED_RELEASE', 'VARCHAR2(30)', None), ('SEQUENCE_NAME', 'VARCHAR2(30)', None),
+                            ('NOTE', 'CLOB', None))
+
+
+def dictionary_table_xml(name):
+	"""
+	Return the content of a dictionary table xml file (DB_OBJECTS, DB_TABLE_COLUMNS or their _UPGRADE version).
+	"""
+
+	columns = DB_TABLE_COLUMNS_COLUMNS if name.startswith('DB_TABLE_COLUMNS') else DB_OBJECTS_COLUMNS
+	lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+	         '<table%s>' % _attrs([('name', name), ('type', 'DICTIONARY'), ('init_on_install', 'Y')]),
+	         '  <documentation>Dictionary table %s</documentation>' % name,
+	         '  <columns>']
+	for column, data_type, default_value in columns:
+		lines.append('    <column%s>' % _attrs([('name', column), ('data_type', data_type),
+		                                        ('nullable', 'N' if column in ('TABLE_NAME', 'COLUMN_NAME') else 'Y')]))
+		if default_value:
+			lines.append('      <default_value>%s</default_value>' % escape(default_value))
+		lines.append('    </column>')
+	lines.append('  </columns>')
+	lines.append('  <indexes>')
+	lines.append('    <index type="PRIMARY">')
+	lines.append('      <columns>')
+	lines.extend('        <column%s/>' % _attrs([('name', column)]) for column in
+	             (['TABLE_NAME', 'COLUMN_NAME'] if columns is DB_TABLE_COLUMNS_COLUMNS else ['TABLE_NAME']))
+	lines.append('      </columns>')
+	lines.append('    </index>')
+	lines.append('  </indexes>')
+	lines.append('</table>')
+
+	return '\n'.join(lines) + '\n'
+
+
+def plsql_source(object_type, name, size=4096):
+	"""
+	Return the content of a plsql source file (SQL, PKS or PKB) of about the given size in bytes.
+	"""
+
+	lines = ['CREATE OR REPLACE %s %s AS' % (object_type, name)]
+	length = len(lines[0])
+	i = 0
+	while length < size:
+		line = "  -- %s %s, synthetic line %d, padded to make the file bigger" % (object_type, name, i)
+		lines.append(line)
+		length += len(line) + 1
+		i += 1
+	lines.append('END;')
+	lines.append('/')
+	return '\n'.join(lines) + '\n'
+
+
+def _write(path, content):
+	folder = os.path.dirname(path)
+	if not os.path.isdir(folder):
+		os.makedirs(folder)
+	with open(path, 'w') as f:
+		f.write(content)
+
+
+def source_tree(root, tables=100, columns=20, indexes=2, lob_ratio=0.05, plsql=30, plsql_size=4096, init_ratio=0.1):
+	"""
+	Generate a db source tree under root and return (common_db_dir, source_db_dir):
+	common_db_dir has the TOOLS templates and the dictionary tables (DB_OBJECTS, DB_TABLE_COLUMNS and their _UPGRADE
+	version), source_db_dir has the given number of tables and plsql objects (of about plsql_size bytes each).
+	A share (init_ratio) of the tables is loaded on install, they don't have BLOB columns which can't be loaded.
+	"""
+
+	common_db_dir = os.path.join(root, 'common')
+	source_db_dir = os.path.join(root, 'source')
+	rnd = random.Random(root)
+
+	for folder in ('SCHEMA_CREATION', 'COMMON', 'AUTO_UPGRADE'):
+		_write(os.path.join(common_db_dir, 'TOOLS', folder, 'README.TXT'), 'Template of the folder %s\n' % folder)
+
+	for name in ('DB_OBJECTS', 'DB_OBJECTS_UPGRADE', 'DB_TABLE_COLUMNS', 'DB_TABLE_COLUMNS_UPGRADE'):
+		_write(os.path.join(common_db_dir, 'TABLE', name + '.XML'), dictionary_table_xml(name))
+
+	for i in range(tables):
+		name = 'LO_SYN_%05d' % i
+		init = rnd.random() < init_ratio
+		_write(os.path.join(source_db_dir, 'TABLE', name + '.XML'),
+		       table_xml(name, columns, indexes, 0 if init else lob_ratio, rnd, 'Y' if init else 'N'))
+
+	for i in range(plsql):
+		object_type = PLSQL_TYPES[i % len(PLSQL_TYPES)]
+		name = '%s_SYN_%05d' % (object_type[:3], i)
+		folder = os.path.join(source_db_dir, object_type)
+		_write(os.path.join(folder, name + '.XML'), plsql_xml(object_type, name, i % 3 + 1))
+		if object_type == 'PACKAGE':
+			_write(os.path.join(folder, name + '.PKS'), plsql_source('PACKAGE', name, plsql_size // 4))
+			_write(os.path.join(folder, name + '.PKB'), plsql_source('PACKAGE BODY', name, plsql_size))
+		else:
+			_write(os.path.join(folder, name + '.SQL'), plsql_source(object_type, name, plsql_size))
+
+	return common_db_dir, source_db_dir
@@ -1,12 +1,15 @@
 __author__ = 'yufa'
 
+import os
+import time
 import logging
 import logging.config
+import argparse
+import sys
 import ConfigParser
 
 import ezdb
 
-logging.config.fileConfig('logging.cnf')
 config = ConfigParser.ConfigParser()
 config.read('ezdb.cnf')
 
@@ -23,15 +26,106 @@ def parse_options(section, option):
 _boolean_states = {'1': True, 'yes': True, 'true': True, 'on': True,
                    '0': False, 'no': False, 'false': False, 'off': False}
 
-enable_snapshot = parse_options('snapshot_function', 'enable_snapshot')
-common_db_dir = parse_options('db_compiler', 'common_db_dir')
-source_db_dir = parse_options('db_compiler', 'source_db_dir')
-target_db_dir = parse_options('db_compiler', 'target_db_dir')
-release_number = parse_options('db_compiler', 'release_number')
 
-enable_snapshot = _boolean_states.get(enable_snapshot.lower(), False)
-if enable_snapshot:
-	ezdb.enable_snapshot(enable_snapshot)
+def parse_flag(section, option, default=False):
+	if not config.has_option(section, option):
+		return default
+	return _boolean_states.get(config.get(section, option).lower(), default)
 
-if common_db_dir and source_db_dir and target_db_dir and release_number:
-	ezdb.compile_db(common_db_dir, source_db_dir, target_db_dir, release_number)
+
+def parse_str(section, option, default=None):
+	if not config.has_option(section, option):
+		return default
+	return config.get(section, option) or default
+
+
+def parse_int(section, option, default=0):
+	if not config.has_option(section, option):
+		return default
+	return config.getint(section, option)
+
+
+arg_parser = argparse.ArgumentParser(description='Generate the DB package based on the db XML files.')
+arg_parser.add_argument('--incremental', action='store_true', default=parse_flag('db_compiler', 'incremental'),
+                        help='only generate the objects whose source files have changed since the last build')
+arg_parser.add_argument('--jobs', type=int, metavar='N', default=parse_int('db_compiler', 'jobs', 1),
+                        help='number of processes used to compile the tables')
+arg_parser.add_argument('--profile', action='store_true', default=parse_flag('db_compiler', 'profile'),
+                        help='profile the build phases and dump the statistics of the slowest ones next to DB.tgz')
+arg_parser.add_argument('--watch', action='store_true',
+                        help='keep running, and compile the DB package again when the source files change')
+arg_parser.add_argument('--interval', type=float, metavar='SECONDS', default=1.0,
+                        help='how often the source files are checked for changes in watch mode (default 1 second)')
+arg_parser.add_argument('--check', action='store_true',
+                        help='only check the source files and report all their problems, without generating the package')
+arg_parser.add_argument('--previous', metavar='PACKAGE', default=parse_str('db_compiler', 'previous_package'),
+                        help='DB package (or DB folder) of the previous release to generate the delta upgrade script from')
+
+
+def _print_rebuild(rebuild):
+	print time.strftime('%H:%M:%S'), rebuild
+
+
+def main():
+	args = arg_parser.parse_args()
+	logging.config.fileConfig('logging.cnf')
+
+	enable_snapshot = parse_options('snapshot_function', 'enable_snapshot')
+	common_db_dir = parse_options('db_compiler', 'common_db_dir')
+	source_db_dir = parse_options('db_compiler', 'source_db_dir')
+	target_db_dir = parse_options('db_compiler', 'target_db_dir')
+	release_number = parse_options('db_compiler', 'release_number')
+	snapshot_target_db_dir = parse_str('snapshot_function', 'snapshot_target_db_dir')
+
+	enable_snapshot = _boolean_states.get(enable_snapshot.lower(), False)
+	if enable_snapshot:
+		ezdb.enable_snapshot(enable_snapshot)
+
+	if config.has_option('db_compiler', 'parser_backend'):
+		ezdb.set_parser_backend(config.get('db_compiler', 'parser_backend'))
+
+	ezdb.set_install_sessions(parse_int('db_compiler', 'install_sessions', 4))
+	ezdb.set_index_build(parse_str('db_compiler', 'index_build', 'default'), parse_int('db_compiler', 'index_degree', 4),
+	                     parse_str('db_compiler', 'upgrade_index_build', 'online'))
+	ezdb.set_previous_package(args.previous)
+	ezdb.set_dat_chunk_size(parse_int('db_compiler', 'dat_chunk_size_mb', 64) * 1024 * 1024)
+
+	cache_dir = os.environ.get('EZDB_CACHE_DIR') or \
+	            (config.get('model_cache', 'cache_dir') if config.has_option('model_cache', 'cache_dir') else None)
+	if cache_dir:
+		ezdb.enable_model_cache(cache_dir, parse_int('model_cache', 'max_size_mb', 512) * 1024 * 1024)
+
+	if config.has_section('package'):
+		ezdb.set_output_mode(parse_str('package', 'output_mode', 'archive'), parse_flag('package', 'mirror'))
+		ezdb.enable_skip_unchanged(parse_flag('package', 'skip_unchanged'))
+		ezdb.set_copy_options(parse_int('package', 'copy_threads', 4), parse_flag('package', 'hardlink'))
+		compression = parse_str('package', 'compression', 'gzip')
+		level = parse_str('package', 'compression_level')
+		ezdb.set_package_compression(compression, int(level) if level else None,
+		                             parse_int('package', 'compression_threads', 1))
+
+	if common_db_dir and source_db_dir and args.check:
+		start = time.time()
+		problems = ezdb.check_db(common_db_dir, source_db_dir)
+		for problem in problems:
+			print problem
+		print '%d problems found in %.3fs.' % (len(problems), time.time() - start)
+		sys.exit(1 if problems else 0)
+	elif common_db_dir and source_db_dir and target_db_dir and release_number and args.watch:
+		print 'Watching %s and %s, press Ctrl+C to stop.' % (common_db_dir, source_db_dir)
+		try:
+			ezdb.watch_db(common_db_dir, source_db_dir, target_db_dir, release_number, args.jobs, args.interval,
+			              _print_rebuild)
+		except KeyboardInterrupt:
+			pass
+	elif common_db_dir and source_db_dir and target_db_dir and release_number and snapshot_target_db_dir:
+		ezdb.compile_variants(common_db_dir, source_db_dir, [(target_db_dir, False), (snapshot_target_db_dir, True)],
+		                      release_number, args.incremental, args.jobs, args.profile)
+	elif common_db_dir and source_db_dir and target_db_dir and release_number:
+		ezdb.compile_db(common_db_dir, source_db_dir, target_db_dir, release_number, args.incremental, args.jobs,
+		                args.profile)
+
+
+# The guard is required by multiprocessing on Windows, where the worker processes import this script.
+if __name__ == '__main__':
+	main()
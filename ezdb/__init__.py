@@ -1,25 +1,43 @@
 __author__ = 'yufa'
 
 import os
+import copy
+import time
 import shutil
 import logging
+import threading
+from collections import namedtuple
+import multiprocessing
 
 import compiler.dbobject.dbmeta as dbmeta
+import compiler.dbobject.index as index
 import compiler.xmlparser as xmlparser
+from compiler.manifest import BuildManifest, file_digest
+from compiler.cache import ModelCache, DEFAULT_MAX_SIZE
+from compiler.overlay import SourceOverlay
+from compiler.registry import ModelRegistry
+from compiler.watcher import SourceWatcher
+from compiler.checker import SchemaChecker
+from compiler.schema import SCHEMA_FILE, dump_records, read_schema
+from compiler.report import BuildReport
+from common.exception import EzDBError
 import generator.ifs as installation
+import generator.archive as archive
+import generator.parallel as parallel
+import generator.delta as delta
+from generator.sink import DirectorySink, ArchiveSink, TeeSink
+from generator.copier import FileCopier
 
 
-__all__ = ['enable_snapshot', 'compile_db']
+__all__ = ['Compiler', 'enable_snapshot', 'set_parser_backend', 'enable_model_cache', 'set_package_compression',
+           'set_output_mode', 'enable_skip_unchanged', 'set_copy_options', 'set_install_sessions', 'set_dat_chunk_size',
+           'set_index_build', 'set_previous_package', 'compile_db', 'compile_variants', 'watch_db',
+           'check_db', 'read_schema']
 
-_enable_snapshot = False
+OUTPUT_MODES = ('archive', 'directory')
 
 
-def enable_snapshot(flag=False):
-	global _enable_snapshot
-	_enable_snapshot = flag
-
-
-def _create_db_package_structure(root_dir, db_folder, force_create=False):
+def _create_db_package_structure(sink):
 	"""
 	Create the folder structure of the generated db package for installation/upgrade.
 	The folder structure is like -
@@ -40,237 +58,854 @@ def _create_db_package_structure(root_dir, db_folder, force_create=False):
 	 |--SYNONYM
 	"""
 
-	logging.info('Start creating the folder structure: %s.' % db_folder)
-
-	os.chdir(root_dir)
-	if os.path.exists(db_folder):
-		if force_create:
-			shutil.rmtree(db_folder, ignore_errors=False)
-		else:
-			raise Exception('Folder [DB] has already exists!')
+	logging.info('Start creating the folder structure.')
 
-	os.mkdir(db_folder)
-	os.chdir(db_folder)
 	for folder in ('TOOLS', 'TABLE', 'INIT_TABLE', 'VIEW', 'PACKAGE', 'PROCEDURE',
 	               'FUNCTION', 'TYPE', 'TRIGGER', 'SEQUENCE', 'SYNONYM'):
-		os.mkdir(folder)
+		sink.add_folder(folder)
 
-	os.chdir('TOOLS')
 	for folder in ('SCHEMA_CREATION', 'COMMON', 'AUTO_UPGRADE'):
-		os.mkdir(folder)
-
-	logging.info('Finish creating the folder structure: %s.' % db_folder)
-
-
-def _generate_install_script(target_db_dir, release_number):
-	"""
-	Generate installation from scratch (IFS) script
-	"""
-
-	logging.info('Start generating installation script (ifs)...')
-
-	ifs_script = os.path.join(target_db_dir, 'TOOLS', 'SCHEMA_CREATION', 'IFS_MODEL.SQL')
-	with open(ifs_script, 'w') as t:
-		for line in installation.generate_ifs_model_script(target_db_dir, release_number):
-			t.write(line)
+		sink.add_folder('TOOLS/%s' % folder)
 
-	logging.info('Finish generating installation script.')
+	logging.info('Finish creating the folder structure.')
 
 
-def _copy_template_files(from_db_dir, to_db_dir):
+def _copy_template_files(from_db_dir, sink, manifest=None):
 	"""
-	Copy the static template files (TOOLS folder) from one directory to another
+	Copy the static template files (TOOLS folder) into the DB package.
+	The copied files are recorded as artifacts into the given build manifest, so a template deleted since the previous
+	build is removed from the reused DB folder (see BuildManifest.remove_stale_artifacts).
+
+	>>> import tempfile
+	>>> work_dir = tempfile.mkdtemp()
+	>>> os.makedirs(os.path.join(work_dir, 'src', 'TOOLS', 'COMMON'))
+	>>> for name in ('LOAD_SQLLDR.BAT', 'README.TXT'):
+	...     open(os.path.join(work_dir, 'src', 'TOOLS', 'COMMON', name), 'w').close()
+	>>> def build():
+	...     sink = DirectorySink(os.path.join(work_dir, 'DB'), clean=False)
+	...     manifest = BuildManifest(os.path.join(work_dir, 'DB.MANIFEST'))
+	...     manifest.load()
+	...     sink.add_folder('TOOLS/COMMON')
+	...     _copy_template_files(os.path.join(work_dir, 'src'), sink, manifest)
+	...     sink.close()
+	...     manifest.remove_stale_artifacts(sink.db_dir)
+	...     manifest.save()
+	...     return sorted(os.listdir(os.path.join(sink.db_dir, 'TOOLS', 'COMMON')))
+	>>> build()
+	['LOAD_SQLLDR.BAT', 'README.TXT']
+	>>> os.remove(os.path.join(work_dir, 'src', 'TOOLS', 'COMMON', 'README.TXT'))
+	>>> build()
+	['LOAD_SQLLDR.BAT']
+	>>> shutil.rmtree(work_dir)
 	"""
 
 	logging.info('Start copying some template files...')
 
-	for folder in os.listdir(os.path.join(from_db_dir, 'TOOLS')):
+	for folder in sorted(os.listdir(os.path.join(from_db_dir, 'TOOLS'))):
 		source_dir = os.path.join(from_db_dir, 'TOOLS', folder)
-		target_dir = os.path.join(to_db_dir, 'TOOLS', folder)
 
-		for file in os.listdir(source_dir):
-			shutil.copyfile(os.path.join(source_dir, file), os.path.join(target_dir, file))
+		for file in sorted(os.listdir(source_dir)):
+			name = 'TOOLS/%s/%s' % (folder, file)
+			sink.copy(name, os.path.join(source_dir, file))
+			manifest and manifest.record(name, None, [name], {})
 
 	logging.info('Finish copying template files.')
 
 
-def _copy_db_raw_files(from_db_dir, to_db_dir):
-	logging.info('Start copying db raw files (XML)...')
-
-	for folder in ('TABLE', 'VIEW', 'PACKAGE', 'PROCEDURE', 'FUNCTION', 'TYPE', 'TRIGGER', 'SEQUENCE', 'SYNONYM'):
-		source_dir = os.path.join(from_db_dir, folder)
-		target_dir = os.path.join(to_db_dir, folder)
-
-		if not os.path.exists(source_dir): continue
-		if not os.path.exists(target_dir): os.mkdir(target_dir)
-
-		for file in os.listdir(source_dir):
-			logging.debug('Copying %s' % os.path.join(source_dir, file))
-			shutil.copyfile(os.path.join(source_dir, file), os.path.join(target_dir, file))
-
-	logging.info('Finish copying db raw files (XML).')
-
-
-def _generate_tables(source_db_dir, target_db_dir):
+def _render_table(table, dictionary, index_build, enable_snapshot):
 	"""
-	Generate table SQL files by parsing the table XML files
+	Render everything generated from the given table, with the given dictionary tables (dbmeta.Dictionary), index
+	build mode and snapshot option: (table DDL, index DDL, DB_OBJECTS metadata, DB_TABLE_COLUMNS metadata)
 	"""
 
-	logging.info('Start generating table SQL file...')
-
-	src_table_folder = os.path.join(source_db_dir, 'TABLE')
-	target_table_folder = os.path.join(target_db_dir, 'TABLE')
-	target_init_table_folder = os.path.join(target_db_dir, 'INIT_TABLE')
-
-	db_objects_dat_file = os.path.join(target_init_table_folder, 'DB_OBJECTS.DAT')
-	db_table_columns_dat_file = os.path.join(target_init_table_folder, 'DB_TABLE_COLUMNS.DAT')
-
-	db_objects = None
-	db_table_columns = None
-
-	try:
-		db_objects = open(db_objects_dat_file, 'a')
-		db_table_columns = open(db_table_columns_dat_file, 'a')
-
-		table_db_objects = xmlparser.parse_table(os.path.join(src_table_folder, 'DB_OBJECTS.XML'))
-		table_db_table_columns = xmlparser.parse_table(os.path.join(src_table_folder, 'DB_TABLE_COLUMNS.XML'))
-		dbmeta.set_db_objects_table(table_db_objects)
-		dbmeta.set_db_table_columns_table(table_db_table_columns)
-		with open(os.path.join(target_init_table_folder, 'DB_OBJECTS.CTL'), 'w') as t:
-			t.write(table_db_objects.table_ctl_file())
-		with open(os.path.join(target_init_table_folder, 'DB_TABLE_COLUMNS.CTL'), 'w') as t:
-			t.write(table_db_table_columns.table_ctl_file())
-
-		table_db_objects_upgrade = xmlparser.parse_table(os.path.join(src_table_folder, 'DB_OBJECTS_UPGRADE.XML'))
-		table_db_table_columns_upgrade = xmlparser.parse_table(os.path.join(src_table_folder, 'DB_TABLE_COLUMNS_UPGRADE.XML'))
-		with open(os.path.join(target_init_table_folder, 'DB_OBJECTS_UPGRADE.CTL'), 'w') as t:
-			t.write(table_db_objects_upgrade.table_ctl_file())
-		with open(os.path.join(target_init_table_folder, 'DB_TABLE_COLUMNS_UPGRADE.CTL'), 'w') as t:
-			t.write(table_db_table_columns_upgrade.table_ctl_file())
-
-
-		for file in os.listdir(src_table_folder):
-			if not file.upper().endswith('.XML'): continue
-
-			table = xmlparser.parse_table(os.path.join(src_table_folder, file), _enable_snapshot)
-			table_sql = os.path.join(target_table_folder, table.name + '.SQL')
-			#table_ctl = os.path.join(tgt_init_table_folder, table.name + '.CTL')
+	table = table.variant(enable_snapshot)
+	index_ddl = None
+	objects_metadata = table.table_metadata(dictionary)
+	if table.indexes:
+		index_ddl = table.index_ddl(*index_build)
+		objects_metadata += table.table_index_metadata(dictionary)
 
-			with open(table_sql, 'w') as t: t.write(table.table_ddl())
+	return table.table_ddl(), index_ddl, objects_metadata, table.table_column_metadata(dictionary)
 
-			db_table_columns.write(table.table_column_metadata())
-			db_objects.write(table.table_metadata())
 
-			if table.indexes:
-				table_idx_sql = os.path.join(target_table_folder, table.name + '.IDX.SQL')
-				with open(table_idx_sql, 'w') as t: t.write(table.index_ddl())
-				db_objects.write(table.table_index_metadata())
-	finally:
-		db_objects and db_objects.close()
-		db_table_columns and db_table_columns.close()
+# The settings of the compilation served by a table compilation worker process, see _init_table_worker. A pool of
+# worker processes serves a single compilation.
+_worker_settings = None
 
-	logging.info('Finish generating table SQL file.')
 
-
-def _process_plsql_object(source_db_dir, target_db_dir):
+def _init_table_worker(table_db_objects, table_db_table_columns, parser_backend, model_cache, index_build,
+                       enable_snapshot):
 	"""
-	Process PLSQL object by processing xml files to get the metatdata stored in db_objects
+	Initialize the dictionary tables and the settings in a table compilation worker process.
 	"""
 
-	logging.info('Start processing plsql object...')
-
-	src_table_folder = os.path.join(source_db_dir, 'TABLE')
-	target_init_table_folder = os.path.join(target_db_dir, 'INIT_TABLE')
+	# the worker is forked while the compilations running in the other threads of the parent process may hold the
+	# locks of the logging module, a worker would wait for them forever
+	logging._lock = threading.RLock()
+	for handler_ref in logging._handlerList:
+		handler = handler_ref()
+		handler and handler.createLock()
 
-	db_objects_dat_file = os.path.join(target_init_table_folder, 'DB_OBJECTS.DAT')
-	db_objects = None
+	global _worker_settings
+	_worker_settings = (dbmeta.Dictionary(table_db_objects, table_db_table_columns), parser_backend, model_cache,
+	                    index_build, enable_snapshot)
 
-	try:
-		db_objects = open(db_objects_dat_file, 'a')
-		table_db_objects = xmlparser.parse_table(os.path.join(src_table_folder, 'DB_OBJECTS.XML'))
-		dbmeta.set_db_objects_table(table_db_objects)
 
-		for object in ('PACKAGE', 'PROCEDURE', 'FUNCTION', 'TYPE', 'TRIGGER', 'SEQUENCE'):
-			src_object_folder = os.path.join(source_db_dir, object)
-			tgt_object_folder = os.path.join(target_db_dir, object)
+def _compile_table_job(args):
+	xmlfile, parse_snapshot = args
+	dictionary, parser_backend, model_cache, index_build, enable_snapshot = _worker_settings
+	start = time.time()
+	table = xmlparser.parse_table(xmlfile, parse_snapshot, parser_backend, model_cache)
+	return (table,) + _render_table(table, dictionary, index_build, enable_snapshot) + (time.time() - start,)
 
-			for file in os.listdir(src_object_folder):
-				if not file.upper().endswith('.XML'): continue
 
-				obj = xmlparser.parse_plsql(os.path.join(src_object_folder, file))
-				db_objects.write(obj.metadata())
-
-				if obj.object_type == 'PACKAGE':
-					obj_file = file.replace('XML', 'PKS')
-					shutil.copyfile(os.path.join(src_object_folder, obj_file), os.path.join(tgt_object_folder, obj_file))
-					obj_file = file.replace('XML', 'PKB')
-					shutil.copyfile(os.path.join(src_object_folder, obj_file), os.path.join(tgt_object_folder, obj_file))
-				else:
-					obj_file = file.replace('XML', 'SQL')
-					shutil.copyfile(os.path.join(src_object_folder, obj_file), os.path.join(tgt_object_folder, obj_file))
+def _plsql_object_files(object_type, xml_file_name):
+	"""
+	Return the source files of a PLSQL object to be copied into the DB package.
+	"""
 
-	finally:
-		db_objects and db_objects.close()
+	if object_type == 'PACKAGE':
+		return [xml_file_name.replace('XML', 'PKS'), xml_file_name.replace('XML', 'PKB')]
+	return [xml_file_name.replace('XML', 'SQL')]
 
-	logging.info('Finish processing plsql object.')
 
-def _clone_db_metadata(target_dir):
+def _chunks(fragments, chunk_size):
 	"""
-	Copy DAT file for DB_OBJECTS_UPGRADE and DB_TABLE_COLUMNS_UPGRADE
+	Join the given metadata fragments (whole rows) into chunks of about chunk_size bytes, or a single one if chunk_size
+	is 0 or the data is not larger than chunk_size.
 	"""
 
-	logging.info('Start cloning db metatdata...')
-
-	init_table_folder = os.path.join(target_dir, 'INIT_TABLE')
-	shutil.copyfile(os.path.join(init_table_folder, 'DB_OBJECTS.DAT'), os.path.join(init_table_folder, 'DB_OBJECTS_UPGRADE.DAT'))
-	shutil.copyfile(os.path.join(init_table_folder, 'DB_TABLE_COLUMNS.DAT'), os.path.join(init_table_folder, 'DB_TABLE_COLUMNS_UPGRADE.DAT'))
+	if not chunk_size or sum(len(fragment) for fragment in fragments) <= chunk_size:
+		return [''.join(fragments)]
+
+	chunks, chunk, size = [], [], 0
+	for fragment in fragments:
+		chunk.append(fragment)
+		size += len(fragment)
+		if size >= chunk_size:
+			chunks.append(''.join(chunk))
+			chunk, size = [], 0
+	if chunk:
+		chunks.append(''.join(chunk))
+	return chunks
+
+def _read_digest(target_dir):
+	digest_file = os.path.join(target_dir, archive.DIGEST_FILE)
+	if not os.path.exists(digest_file):
+		return None
+	with open(digest_file) as f:
+		return f.read()
+
+def _write_digest(target_dir, digest):
+	with open(os.path.join(target_dir, archive.DIGEST_FILE), 'w') as f:
+		f.write(digest)
+
+def _generate_release_file(sink, release_number):
+	"""
+	Generate file RELEASE.TXT
+	"""
+	sink.write('RELEASE.TXT', release_number)
 
-	logging.info('Finish cloning db metadata.')
+def _remove_db_folder(target_dir):
+	folder = os.path.join(target_dir, 'DB')
+	if os.path.exists(folder):
+		shutil.rmtree(folder, ignore_errors=False)
 
-def _generate_db_tgz(target_dir):
-	import tarfile
-	logging.info('Start generating db zip package...')
 
-	os.chdir(target_dir)
-	with tarfile.open('DB.tgz', 'w|gz') as tar:
-		tar.add('DB')
+class Rebuild(namedtuple('Rebuild', 'number changes parsed changed seconds error')):
+	"""
+	A build of watch_db: its number (0 for the first build), the source file changes (change, path) which triggered
+	it, the number of xml files parsed, whether the package was written, the seconds spent, and the error if it failed.
+	str() is its timing line.
+	"""
 
-	logging.info('Finish generating db zip package.')
+	__slots__ = ()
 
-def _generate_release_file(target_dir, release_number):
+	def __str__(self):
+		if self.number == 0:
+			what = 'Initial build'
+		else:
+			counts = {}
+			for change, _ in self.changes:
+				counts[change] = counts.get(change, 0) + 1
+			what = 'Rebuild %d (%s: %s%s)' % (self.number,
+			                                  ', '.join('%d %s' % (counts[change], change) for change in sorted(counts)),
+			                                  ', '.join(os.path.basename(path) for _, path in self.changes[:3]),
+			                                  ', ...' if len(self.changes) > 3 else '')
+		if self.error:
+			return '%s failed after %.3fs: %s' % (what, self.seconds, self.error)
+		return '%s: %d xml files parsed, package %s in %.3fs.' % (what, self.parsed,
+		                                                         'written' if self.changed else 'unchanged', self.seconds)
+
+
+def check_db(common_db_dir, source_db_dir):
 	"""
-	Generate file RELEASE.TXT
+	Check the db source files for the problems which would break the build or the installation (invalid attributes,
+	unknown data types, duplicate columns, index columns which are not in the table, names defined twice, missing
+	PLSQL files...), without compiling or writing anything. Return all the problems (see checker.Problem) in the order
+	of the files and the lines, an empty list if the sources are valid.
 	"""
-	with open(os.path.join(target_dir, 'RELEASE.TXT'), 'w') as f:
-		f.write(release_number)
-
-def _remove_db_staging_folder(target_dir):
-	for _ in ('DB', 'DB_STAGING'):
-		folder = os.path.join(target_dir, _)
-		if os.path.exists(folder):
-			shutil.rmtree(folder, ignore_errors=False)
 
-def compile_db(common_db_dir, source_db_dir, target_dir, release_number):
-	logging.info('------------ B E G I N ------------')
+	start = time.time()
+	checker = SchemaChecker()
+	problems = checker.check(SourceOverlay(os.path.abspath(common_db_dir), os.path.abspath(source_db_dir)))
+	logging.info('%d files checked in %.3fs, %d problems found.' % (checker.files, time.time() - start, len(problems)))
+	return problems
 
-	_create_db_package_structure(target_dir, 'DB', True)
-	_create_db_package_structure(target_dir, 'DB_STAGING', True)
 
-	target_db_dir = os.path.join(target_dir, 'DB')
-	staging_db_dir = os.path.join(target_dir, 'DB_STAGING')
+class Compiler(object):
+	"""
+	Compiler of the db xml files into the DB package, with its own settings.
 
-	_copy_db_raw_files(common_db_dir, staging_db_dir)
-	_copy_db_raw_files(source_db_dir, staging_db_dir)
+	A compilation keeps all its state (sources, parsed objects, dictionary tables, output) to itself and only uses
+	absolute paths, never the working directory, so several compilers can run at the same time in the threads of a
+	process, e.g. in a build service. The settings of a compiler must not be changed while it is compiling.
+	The module functions (enable_snapshot, compile_db ...) use a default compiler.
+	"""
 
-	_generate_tables(staging_db_dir, target_db_dir)
-	_process_plsql_object(staging_db_dir, target_db_dir)
-	_clone_db_metadata(target_db_dir)
-	_generate_install_script(target_db_dir, release_number)
-	_copy_template_files(common_db_dir, target_db_dir)
-	_generate_release_file(target_db_dir, release_number)
-	_generate_db_tgz(target_dir)
-	_remove_db_staging_folder(target_dir)
+	def __init__(self):
+		self.__enable_snapshot = False
+		self.__parser_backend = 'iterparse'
+		self.__model_cache = None
+		# (compression, level, threads) of the DB package, see set_package_compression
+		self.__package_compression = ('gzip', None, 1)
+		# (output mode, mirror) see set_output_mode
+		self.__output_mode = ('archive', False)
+		self.__skip_unchanged = False
+		# (threads, hardlink) see set_copy_options
+		self.__copy_options = (4, False)
+		self.__install_sessions = 4
+		self.__dat_chunk_size = 64 * 1024 * 1024
+		# (mode, degree) see set_index_build
+		self.__index_build = ('default', 4)
+		# (mode, degree) of the indexes created by the delta upgrade script
+		self.__upgrade_index_build = ('online', 4)
+		self.__previous_package = None
+		# DB folder of another variant of the build, see compile_variants
+		self.__shared_db_dir = None
+
+	def enable_snapshot(self, flag=False):
+		self.__enable_snapshot = flag
+
+	def set_parser_backend(self, backend='iterparse'):
+		"""
+		Set the xml parser backend, see xmlparser.PARSER_BACKENDS.
+		"""
+
+		xmlparser.check_parser_backend(backend)
+		self.__parser_backend = backend
+
+	def enable_model_cache(self, cache_dir=None, max_size=None):
+		"""
+		Cache the parsed objects in the given directory, so an unchanged xml file is not parsed again by the next builds,
+		even in another checkout sharing the same cache directory. The cache is disabled if cache_dir is None.
+		"""
+
+		self.__model_cache = ModelCache(cache_dir, max_size or DEFAULT_MAX_SIZE) if cache_dir else None
+
+	def set_package_compression(self, compression='gzip', level=None, threads=1):
+		"""
+		Set how the DB package is compressed: gzip (DB.tgz) or xz (DB.tar.xz, if the module lzma is available), with
+		the given level (default 9 for gzip, 6 for xz). With gzip, if threads is greater than 1, the blocks of the
+		package are compressed in parallel by that many threads (0 means one per cpu), the package is still a standard
+		gzip file.
+		"""
+
+		if compression not in archive.COMPRESSIONS:
+			raise EzDBError('Unknown package compression: %s. Valid values: %s.' % (compression, ', '.join(archive.COMPRESSIONS)))
+		if compression == 'xz' and not archive.lzma:
+			raise EzDBError('The xz compression requires the module lzma, which is not available.')
+
+		self.__package_compression = (compression, level, threads or multiprocessing.cpu_count())
+
+	def set_output_mode(self, mode='archive', mirror=False):
+		"""
+		Set how the DB package is generated:
+		archive - the generated files are written straight into the package, from memory. If mirror is True, they are
+		also written into the DB folder (kept after the build, for debugging).
+		directory - the generated files are written into the DB folder, which is packaged afterwards.
+		The incremental compilation always uses the directory mode, as it reuses the DB folder of the previous build.
+		"""
+
+		if mode not in OUTPUT_MODES:
+			raise EzDBError('Unknown output mode: %s. Valid values: %s.' % (mode, ', '.join(OUTPUT_MODES)))
+
+		self.__output_mode = (mode, mirror)
+
+	def enable_skip_unchanged(self, flag=False):
+		"""
+		If flag is True, the DB package of the previous build is kept as it is (not written again) when its content
+		digest (DB.DIGEST) is unchanged, so the tools distributing the package can tell from its modification time that
+		it is unchanged. In directory mode, the DB folder is not packaged at all.
+		"""
+
+		self.__skip_unchanged = flag
+
+	def set_copy_options(self, threads=4, hardlink=False):
+		"""
+		Set how the PL/SQL and template files are copied into the DB folder (directory output mode, incremental
+		compilation or mirror): by a pool of threads (0 means one per cpu), with a reflink or a copy inside the kernel
+		when possible. If hardlink is True, the files are hard linked to the source files when they are on the same file
+		system, the DB folder must then not be modified.
+		"""
+
+		self.__copy_options = (threads or multiprocessing.cpu_count(), hardlink)
+
+	def set_install_sessions(self, sessions=4):
+		"""
+		Set the maximum number of parallel sqlplus sessions of the parallel installation scripts generated next to the
+		IFS script (TOOLS/SCHEMA_CREATION/PARALLEL). The parallel scripts are not generated if sessions is 0.
+		"""
+
+		self.__install_sessions = sessions
+
+	def set_dat_chunk_size(self, size=64 * 1024 * 1024):
+		"""
+		Split the DAT files larger than the given size (bytes) into chunks of about that size, loaded by parallel direct
+		path sql*loader sessions (see set_install_sessions). The DAT files are not split if size is 0.
+		"""
+
+		self.__dat_chunk_size = size
+
+	def set_index_build(self, mode='default', degree=4, upgrade_mode='online'):
+		"""
+		Set how the indexes are built by the generated index DDL (see index.BUILD_MODES): default (serial, logged),
+		parallel (with the given parallel degree and NOLOGGING, for a fresh installation) or online (ONLINE with the
+		given parallel degree, for an upgrade). The degree can be overridden by a table (attribute index_degree of its
+		xml file). mode is used by the IFS script, upgrade_mode by the delta upgrade script (see set_previous_package),
+		run while the tables are used.
+		"""
+
+		index.check_build_mode(mode, degree)
+		index.check_build_mode(upgrade_mode, degree)
+		self.__index_build = (mode, degree)
+		self.__upgrade_index_build = (upgrade_mode, degree)
+
+	def set_previous_package(self, path=None):
+		"""
+		Generate the delta upgrade script (see delta.diff_models) from the given DB package (or DB folder) of the
+		previous release to the compiled release. It is not generated if path is None.
+		"""
+
+		self.__previous_package = path and os.path.abspath(path)
+
+	def _model_registry(self):
+		# False disables the default model cache of xmlparser
+		return ModelRegistry(self.__enable_snapshot, self.__parser_backend, self.__model_cache or False)
+
+	def _open_sink(self, target_dir, incremental=False, reuse=False):
+		"""
+		Return the output sink of the DB package, according to the output mode. If reuse is True, the DB folder of the
+		previous build is not cleaned.
+		"""
+
+		db_dir = os.path.join(target_dir, 'DB')
+		mode, mirror = self.__output_mode
+		if incremental or mode == 'directory':
+			return DirectorySink(db_dir, not reuse, FileCopier(*self.__copy_options), self.__shared_db_dir)
+
+		compression, level, threads = self.__package_compression
+		package = ArchiveSink(os.path.join(target_dir, archive.package_file_name(compression)), compression, level,
+		                      threads)
+		if mirror:
+			return TeeSink(package, DirectorySink(db_dir, True, FileCopier(*self.__copy_options), self.__shared_db_dir))
+		return package
+
+	def _generate_install_script(self, sink, install_objects, release_number):
+		"""
+		Generate installation from scratch (IFS) script, installing the given objects compiled by the build, and the
+		scripts installing them in parallel sessions
+		"""
+
+		logging.info('Start generating installation script (ifs)...')
+
+		sink.write('TOOLS/SCHEMA_CREATION/IFS_MODEL.SQL',
+		           ''.join(installation.generate_ifs_model_script(install_objects, release_number)))
+
+		if self.__install_sessions:
+			# the folder of the previous build may have other worker scripts
+			sink.add_folder(parallel.PARALLEL_DIR, clean=True)
+			for file_name, script in parallel.generate_parallel_scripts(install_objects, release_number,
+			                                                            self.__install_sessions):
+				sink.write('%s/%s' % (parallel.PARALLEL_DIR, file_name), script)
+
+		logging.info('Finish generating installation script.')
+
+	def _compile_tables(self, xmlfiles, registry, dictionary, jobs=1):
+		"""
+		Compile the given table xml files, the results (table, table DDL, index DDL, DB_OBJECTS metadata,
+		DB_TABLE_COLUMNS metadata, seconds spent) are returned in the same order as the xml files.
+		If jobs is greater than 1, the tables not parsed yet are compiled by a pool of worker processes, and added to
+		the model registry.
+		"""
+
+		pending = [xmlfile for xmlfile in xmlfiles if not registry.has_table(xmlfile)]
+		if jobs <= 1 or len(pending) <= 1:
+			for xmlfile in xmlfiles:
+				start = time.time()
+				table = registry.table(xmlfile)
+				yield (table,) + _render_table(table, dictionary, self.__index_build, self.__enable_snapshot) + \
+				      (time.time() - start,)
+			return
+
+		logging.info('Compiling %d tables with %d processes.' % (len(pending), jobs))
+
+		pool = multiprocessing.Pool(jobs, _init_table_worker,
+		                            (dictionary.db_objects_table, dictionary.db_table_columns_table,
+		                             registry.backend, registry.cache, self.__index_build, self.__enable_snapshot))
+		try:
+			chunk_size = max(1, len(pending) // (jobs * 4))
+			results = pool.imap(_compile_table_job, [(xmlfile, registry.enable_snapshot) for xmlfile in pending],
+			                    chunk_size)
+			for xmlfile in xmlfiles:
+				if registry.has_table(xmlfile):
+					start = time.time()
+					table = registry.table(xmlfile)
+					yield (table,) + _render_table(table, dictionary, self.__index_build, self.__enable_snapshot) + \
+					      (time.time() - start,)
+				else:
+					result = next(results)
+					registry.add_table(xmlfile, result[0])
+					yield result
+			pool.close()
+		except:
+			pool.terminate()
+			raise
+		finally:
+			pool.join()
+
+	def _generate_tables(self, sources, registry, dictionary, sink, manifest=None, jobs=1, report=None):
+		"""
+		Generate table SQL files by parsing the table XML files resolved by the given source overlay, the Table objects
+		are taken from the model registry and their metadata is rendered with the given dictionary tables.
+		If the build manifest is given, the tables whose xml file is unchanged since the last build are not generated
+		again, their metadata is taken from the manifest instead.
+		Return the metadata (DB_OBJECTS rows, DB_TABLE_COLUMNS rows) of the tables, always in the order of the table xml
+		files, so the output doesn't depend on jobs, the objects to be installed by the IFS script, and the records of
+		the tables written into the schema file (see compiler.schema).
+		"""
+
+		logging.info('Start generating table SQL file...')
+
+		db_objects = []
+		db_table_columns = []
+		install_objects = []
+		schema_tables = []
+
+		if manifest:
+			manifest.check_dictionary(file_digest(sources.path('TABLE', 'DB_OBJECTS.XML'),
+			                                      sources.path('TABLE', 'DB_TABLE_COLUMNS.XML')))
+
+		tables = []
+		for file in sources.listdir('TABLE'):
+			if not file.upper().endswith('.XML'): continue
 
-	logging.info('------------ E N D ------------')
+			xmlfile = sources.path('TABLE', file)
+			key = digest = fragments = None
+			if manifest:
+				key = 'TABLE/%s' % file
+				digest = file_digest(xmlfile)
+				fragments = manifest.lookup(key, digest, sink.db_dir)
+				if fragments is not None:
+					logging.debug('Table file %s is unchanged, skip it.' % xmlfile)
+			tables.append((key, xmlfile, digest, fragments))
+
+		compiled = self._compile_tables([xmlfile for _, xmlfile, _, fragments in tables if fragments is None],
+		                                registry, dictionary, jobs)
+		for key, xmlfile, digest, fragments in tables:
+			if fragments is None:
+				table, table_ddl, index_ddl, objects_metadata, columns_metadata, seconds = next(compiled)
+				report and report.record_file(xmlfile, seconds)
+				report and report.count('compiled')
+				name = table.name
+				artifacts = ['TABLE/%s.SQL' % name]
+				sink.write('TABLE/%s.SQL' % name, table_ddl)
+
+				if index_ddl is not None:
+					artifacts.append('TABLE/%s.IDX.SQL' % name)
+					sink.write('TABLE/%s.IDX.SQL' % name, index_ddl)
+
+				fragments = {'DB_OBJECTS': objects_metadata, 'DB_TABLE_COLUMNS': columns_metadata,
+				             'INSTALL': installation.table_install_objects(table),
+				             'SCHEMA': table.variant(self.__enable_snapshot).as_record()}
+				manifest and manifest.record(key, digest, artifacts, fragments)
+			else:
+				report and report.count('unchanged')
+
+			db_table_columns.append(fragments['DB_TABLE_COLUMNS'])
+			db_objects.append(fragments['DB_OBJECTS'])
+			install_objects.extend(fragments['INSTALL'])
+			schema_tables.append(fragments['SCHEMA'])
+
+		logging.info('Finish generating table SQL file.')
+		return db_objects, db_table_columns, install_objects, schema_tables
+
+	def _process_plsql_object(self, sources, registry, dictionary, sink, manifest=None, report=None):
+		"""
+		Process PLSQL object by processing xml files (resolved by the given source overlay) to get the metatdata stored
+		in db_objects. The PLSQL objects are taken from the model registry.
+		If the build manifest is given, the objects whose files are unchanged since the last build are skipped.
+		Return the metadata (DB_OBJECTS rows) of the objects, the objects to be installed by the IFS script, and the
+		records of the objects written into the schema file.
+		"""
+
+		logging.info('Start processing plsql object...')
+
+		db_objects = []
+		install_objects = []
+		schema_objects = []
 
+		for object in ('PACKAGE', 'PROCEDURE', 'FUNCTION', 'TYPE', 'TRIGGER', 'SEQUENCE'):
+			for file in sources.listdir(object):
+				if not file.upper().endswith('.XML'): continue
 
+				obj_files = _plsql_object_files(object, file)
+				fragments = None
+				if manifest:
+					key = '%s/%s' % (object, file)
+					digest = file_digest(*[sources.path(object, f) for f in [file] + obj_files if sources.exists(object, f)])
+					fragments = manifest.lookup(key, digest, sink.db_dir)
+
+				if fragments is None:
+					start = time.time()
+					obj = registry.plsql(sources.path(object, file))
+					obj_files = _plsql_object_files(obj.object_type, file)
+					for obj_file in obj_files:
+						if not sources.exists(object, obj_file):
+							raise EzDBError('File %s is missing for the object %s.' % (obj_file, obj.name))
+						sink.copy('%s/%s' % (object, obj_file), sources.path(object, obj_file))
+
+					# the files are named after the xml file
+					size = sum(os.path.getsize(sources.path(object, obj_file)) for obj_file in obj_files)
+					fragments = {'DB_OBJECTS': obj.metadata(dictionary),
+					             'INSTALL': [installation.InstallObject(object, obj.install_order, file.split('.')[0],
+					                                                    size)],
+					             'SCHEMA': obj.as_record()}
+
+					manifest and manifest.record(key, digest, ['%s/%s' % (object, f) for f in obj_files], fragments)
+					report and report.record_file(sources.path(object, file), time.time() - start)
+					report and report.count('compiled')
+					report and report.count('copied_files', len(obj_files))
+				else:
+					logging.debug('Object file %s is unchanged, skip it.' % file)
+					report and report.count('unchanged')
+
+				db_objects.append(fragments['DB_OBJECTS'])
+				install_objects.extend(fragments['INSTALL'])
+				schema_objects.append(fragments['SCHEMA'])
+
+		logging.info('Finish processing plsql object.')
+		return db_objects, install_objects, schema_objects
+
+	def _write_db_metadata(self, sources, registry, sink, db_objects, db_table_columns):
+		"""
+		Write the DAT files of DB_OBJECTS and DB_TABLE_COLUMNS, and their copy for DB_OBJECTS_UPGRADE and
+		DB_TABLE_COLUMNS_UPGRADE, with their control file tuned for the size of the DAT file. A DAT file larger than the
+		chunk size (see set_dat_chunk_size) is split into chunks TABLE.NNN.DAT, loaded by parallel direct path loads if
+		the table allows it. Return the DAT files to be loaded by the IFS script.
+		"""
+
+		logging.info('Start writing db metatdata...')
+
+		# the folder of the previous build may have other chunks
+		sink.add_folder('INIT_TABLE', clean=True)
+
+		data_objects = []
+		for table_name, fragments in (('DB_OBJECTS', db_objects), ('DB_TABLE_COLUMNS', db_table_columns),
+		                              ('DB_OBJECTS_UPGRADE', db_objects), ('DB_TABLE_COLUMNS_UPGRADE', db_table_columns)):
+			table = registry.table(sources.path('TABLE', '%s.XML' % table_name))
+			chunks = _chunks(fragments, self.__dat_chunk_size if table.direct_path() else 0)
+			sink.write('INIT_TABLE/%s.CTL' % table_name,
+			           table.table_ctl_file(max(len(chunk) for chunk in chunks), len(chunks) > 1))
+
+			if len(chunks) == 1:
+				sink.write('INIT_TABLE/%s.DAT' % table_name, chunks[0])
+				data_objects.append(installation.InstallObject('DATA', 1, table_name, len(chunks[0])))
+				continue
+
+			logging.info('Split the DAT file of %s into %d chunks.' % (table_name, len(chunks)))
+			for i, chunk in enumerate(chunks):
+				data_name = '%s.%03d' % (table_name, i + 1)
+				sink.write('INIT_TABLE/%s.DAT' % data_name, chunk)
+				data_objects.append(installation.InstallObject('DATA', 1, data_name, len(chunk)))
+
+		logging.info('Finish writing db metadata.')
+		return data_objects
+
+	def _generate_delta_script(self, dictionary, sink, db_objects, db_table_columns, release_number, report=None):
+		"""
+		Generate the delta upgrade script and its summary (DELTA_DIR), from the model of the previous package to the
+		model of the compiled objects: their metadata and the files written so far into the package.
+		"""
+
+		logging.info('Start generating the delta upgrade script from %s...' % self.__previous_package)
+
+		previous = delta.read_package(self.__previous_package)
+		current = delta.SchemaModel(delta.parse_dat(''.join(db_objects), dictionary.db_objects_encoder.fields),
+		                            delta.parse_dat(''.join(db_table_columns), dictionary.db_table_columns_encoder.fields),
+		                            dict(sink.members()), release_number)
+		logging.info('Previous %s, current %s.' % (previous, current))
+
+		changes = delta.diff_models(previous, current, self.__upgrade_index_build)
+		dictionary_changes = delta.dictionary_changes(previous, current)
+		sink.add_folder(delta.DELTA_DIR, clean=True)
+		tables = {'DB_OBJECTS': (dictionary.db_objects_table, dictionary.db_objects_encoder.fields),
+		          'DB_TABLE_COLUMNS': (dictionary.db_table_columns_table, dictionary.db_table_columns_encoder.fields)}
+		for change in dictionary_changes:
+			if not change.loaded: continue
+			table, fields = tables[change.table_name]
+			data = delta.format_dat(change.loaded, fields)
+			sink.write('%s/%s.CTL' % (delta.DELTA_DIR, change.table_name), table.table_ctl_file(len(data)))
+			sink.write('%s/%s.DAT' % (delta.DELTA_DIR, change.table_name), data)
+			logging.info('Reload %d rows of %s, delete %d rows.' % (len(change.loaded), change.table_name,
+			                                                        len(change.deleted)))
+		sink.write('%s/DELTA_UPGRADE.SQL' % delta.DELTA_DIR,
+		           ''.join(delta.generate_delta_script(changes, previous.release, release_number, dictionary_changes)))
+		sink.write('%s/DELTA_SUMMARY.json' % delta.DELTA_DIR,
+		           delta.delta_summary(changes, previous.release, release_number, dictionary_changes))
+		for change in changes:
+			logging.info('%s %s %s %s' % (change.change.capitalize(), change.object_type, change.name,
+			                              '; '.join(change.details)))
+			report and report.count('delta_%s' % change.change)
+
+		logging.info('Finish generating the delta upgrade script: %d changes.' % len(changes))
+
+	def _generate_db_tgz(self, target_dir):
+		"""
+		Package the DB folder of the given directory, in the order of the file names and with the normalized metadata.
+		"""
+
+		import tarfile
+		logging.info('Start generating db zip package...')
+
+		compression, level, threads = self.__package_compression
+		mtime = archive.package_mtime()
+		fileobj, files = archive.open_package(os.path.join(target_dir, archive.package_file_name(compression)),
+		                                      compression, level, threads, mtime)
+		try:
+			with tarfile.open(fileobj=fileobj, mode='w|') as tar:
+				archive.add_tree(tar, os.path.join(target_dir, 'DB'), 'DB', mtime)
+		finally:
+			for f in files:
+				f.close()
+
+		logging.info('Finish generating db zip package.')
+
+	def compile_db(self, common_db_dir, source_db_dir, target_dir, release_number, incremental=False, jobs=1,
+	               profile=False, registry=None):
+		"""
+		Compile the db xml files into the DB package (DB.tgz).
+
+		The source files are read straight from common_db_dir and source_db_dir, a file in source_db_dir overrides the
+		one with the same name in common_db_dir.
+
+		With incremental compilation, the generated DB folder is kept after packaging together with a build manifest
+		(DB.MANIFEST), and the next build only generates the objects whose source files have changed.
+
+		If jobs is greater than 1, the tables are parsed and rendered by a pool of jobs worker processes, the generated
+		files are the same as the ones generated by a serial build.
+
+		By default, the generated files are written straight into the package, see set_output_mode.
+
+		The package only depends on the source files and the settings: the objects are generated in a stable order, the
+		metadata of the tar members is normalized and no build time is written into the generated files. The digest of
+		its content is written to DB.DIGEST next to the package, see enable_skip_unchanged.
+		Return True if the package was written, False if the previous one was kept.
+
+		The time and memory spent by each phase are written to a report (DB.REPORT.json) next to DB.tgz. If profile is
+		True, the phases also run under cProfile, and the statistics of the slowest ones are dumped next to the report.
+
+		The objects are parsed by the given model registry, a new one by default. A registry kept across the builds
+		(see watch_db) doesn't parse the unchanged xml files again.
+		"""
+
+		logging.info('------------ B E G I N ------------')
+
+		common_db_dir, source_db_dir, target_dir = [os.path.abspath(path) for path in
+		                                            (common_db_dir, source_db_dir, target_dir)]
+		report = BuildReport(profile, enable_snapshot=self.__enable_snapshot, incremental=incremental, jobs=jobs,
+		                     parser_backend=self.__parser_backend, output_mode=self.__output_mode[0],
+		                     skip_unchanged=self.__skip_unchanged, index_build=self.__index_build[0])
+		target_db_dir = os.path.join(target_dir, 'DB')
+		compression, level, _ = self.__package_compression
+
+		sink = None
+		try:
+			with report.phase('prepare'):
+				sources = SourceOverlay(common_db_dir, source_db_dir)
+				registry = registry or self._model_registry()
+				dictionary = dbmeta.Dictionary(registry.table(sources.path('TABLE', 'DB_OBJECTS.XML')),
+				                               registry.table(sources.path('TABLE', 'DB_TABLE_COLUMNS.XML')))
+
+				manifest = None
+				if incremental:
+					manifest = BuildManifest(os.path.join(target_dir, 'DB.MANIFEST'), self.__enable_snapshot,
+					                         {'index_build': self.__index_build})
+					manifest.load()
+
+				reuse = bool(manifest) and not manifest.empty and os.path.isdir(target_db_dir)
+				if reuse:
+					logging.info('Incremental compilation, reuse the folder: %s.' % target_db_dir)
+				else:
+					manifest and manifest.clear()
+				sink = self._open_sink(target_dir, incremental, reuse)
+				_create_db_package_structure(sink)
+
+			with report.phase('tables'):
+				db_objects, db_table_columns, install_objects, schema_tables = \
+					self._generate_tables(sources, registry, dictionary, sink, manifest, jobs, report)
+			with report.phase('plsql'):
+				plsql_db_objects, plsql_install_objects, schema_objects = \
+					self._process_plsql_object(sources, registry, dictionary, sink, manifest, report)
+				db_objects.extend(plsql_db_objects)
+				install_objects.extend(plsql_install_objects)
+			logging.info(str(registry))
+
+			with report.phase('metadata'):
+				install_objects.extend(self._write_db_metadata(sources, registry, sink, db_objects, db_table_columns))
+			with report.phase('ifs'):
+				self._generate_install_script(sink, install_objects, release_number)
+				report.count('objects', len(install_objects))
+			with report.phase('templates'):
+				_copy_template_files(common_db_dir, sink, manifest)
+				# the artifacts of all the sources are known now, the ones of the previous build may be removed
+				manifest and manifest.remove_stale_artifacts(target_db_dir)
+			with report.phase('schema'):
+				sink.write(SCHEMA_FILE, dump_records(release_number, schema_tables, schema_objects), binary=True)
+			if self.__previous_package:
+				with report.phase('delta'):
+					self._generate_delta_script(dictionary, sink, db_objects, db_table_columns, release_number, report)
+			else:
+				sink.remove_folder(delta.DELTA_DIR)
+			with report.phase('package'):
+				_generate_release_file(sink, release_number)
+				package = os.path.join(target_dir, archive.package_file_name(compression))
+				digest = '%s  %s\n' % (archive.content_digest(sink.members(), compression, level),
+				                       os.path.basename(package))
+				changed = not (self.__skip_unchanged and os.path.exists(package) and _read_digest(target_dir) == digest)
+				if changed:
+					sink.close()
+					if isinstance(sink, DirectorySink):
+						self._generate_db_tgz(target_dir)
+					_write_digest(target_dir, digest)
+				else:
+					logging.info('The content of the DB package is unchanged, keep the package: %s.' % package)
+					sink.abort()
+					report.count('unchanged')
+				report.count('bytes', os.path.getsize(package))
+
+				copy_stats = sink.copy_stats
+				for method, size in copy_stats.iteritems():
+					report.count('%s_bytes' % method, size)
+				report.count('copy_avoided_bytes', sum(size for method, size in copy_stats.iteritems() if method != 'copy'))
+		except:
+			sink and sink.abort()
+			raise
+
+		with report.phase('cleanup'):
+			if isinstance(sink, DirectorySink) and not incremental:
+				_remove_db_folder(target_dir)
+			manifest and manifest.save()
+			self.__model_cache and self.__model_cache.trim()
+
+		report.save(target_dir)
+
+		logging.info('------------ E N D ------------')
+		return changed
+
+	def _variant(self, enable_snapshot, shared_db_dir=None):
+		compiler = copy.copy(self)
+		compiler.__enable_snapshot = enable_snapshot
+		compiler.__shared_db_dir = shared_db_dir
+		return compiler
+
+	def compile_variants(self, common_db_dir, source_db_dir, variants, release_number, incremental=False, jobs=1,
+	                     profile=False):
+		"""
+		Compile several variants of the DB package in one run, variants is a list of (target_dir, enable_snapshot), e.g.
+		[(target_dir, False), (snapshot_target_dir, True)] for the regular and the snapshot packages. The snapshot option
+		of the compiler is not used.
+
+		The xml files are parsed once, all the variants are rendered from the same parsed objects (see Table.variant):
+		they only differ by the column SNAPSHOT_ID, the primary keys, and the DDL, control files and metadata of the
+		tables. The PL/SQL and template files copied into the DB folder of the first variant are hard linked into the DB
+		folders of the next ones (when the first DB folder is kept: incremental compilation or mirror), the DB folders
+		must then not be modified.
+		Return whether the package of each variant was written, see compile_db.
+		"""
+
+		# the DB folder written by the build and kept after it
+		keep_db_dir = incremental or self.__output_mode == ('archive', True)
+
+		registry = self._model_registry()
+		shared_db_dir = None
+		changed = []
+		for target_dir, enable_snapshot in variants:
+			compiler = self._variant(enable_snapshot, shared_db_dir)
+			changed.append(compiler.compile_db(common_db_dir, source_db_dir, target_dir, release_number, incremental, jobs,
+			                                   profile, registry))
+			if keep_db_dir and shared_db_dir is None:
+				shared_db_dir = os.path.join(os.path.abspath(target_dir), 'DB')
+		return changed
+
+	def watch_db(self, common_db_dir, source_db_dir, target_dir, release_number, jobs=1, interval=1.0, on_rebuild=None,
+	             max_rebuilds=None):
+		"""
+		Compile the DB package, then keep polling the source directories every interval seconds and compile it again
+		(incrementally) when files are changed, added or deleted, until interrupted (or after max_rebuilds rebuilds).
+
+		The parsed objects are kept in memory across the builds: only the xml files changed since the previous build are
+		parsed again, only the objects generated from the changed files are generated again (see compile_db). A failed
+		build (e.g. an invalid xml file) doesn't stop watching, the next change triggers a new build.
+		on_rebuild is called with the Rebuild of each build, by default its timing line is logged.
+		"""
+
+		registry = self._model_registry()
+		watcher = SourceWatcher(os.path.abspath(common_db_dir), os.path.abspath(source_db_dir))
+
+		def build(number, changes):
+			misses = registry.misses
+			start = time.time()
+			changed = error = None
+			try:
+				changed = self.compile_db(common_db_dir, source_db_dir, target_dir, release_number, True, jobs,
+				                          registry=registry)
+			except Exception, e:
+				logging.exception('The build failed, fix the source files to trigger a new build.')
+				error = str(e) or e.__class__.__name__
+			rebuild = Rebuild(number, changes, registry.misses - misses, changed, time.time() - start, error)
+			if on_rebuild:
+				on_rebuild(rebuild)
+			else:
+				logging.info(str(rebuild))
+
+		build(0, [])
+		rebuilds = 0
+		while max_rebuilds is None or rebuilds < max_rebuilds:
+			time.sleep(interval)
+			changes = watcher.poll()
+			if not changes: continue
+
+			for change, path in changes:
+				registry.invalidate(path)
+			rebuilds += 1
+			build(rebuilds, changes)
+
+
+# The compiler of the module functions
+_compiler = Compiler()
+
+enable_snapshot = _compiler.enable_snapshot
+set_parser_backend = _compiler.set_parser_backend
+enable_model_cache = _compiler.enable_model_cache
+set_package_compression = _compiler.set_package_compression
+set_output_mode = _compiler.set_output_mode
+enable_skip_unchanged = _compiler.enable_skip_unchanged
+set_copy_options = _compiler.set_copy_options
+set_install_sessions = _compiler.set_install_sessions
+set_dat_chunk_size = _compiler.set_dat_chunk_size
+set_index_build = _compiler.set_index_build
+set_previous_package = _compiler.set_previous_package
+compile_db = _compiler.compile_db
+compile_variants = _compiler.compile_variants
+watch_db = _compiler.watch_db
@@ -16,4 +16,5 @@ const.PLSQL_PROCEDURE = 'PROCEDURE'
 const.PLSQL_TYPE = 'TYPE'
 const.PLSQL_FUNCTION = 'FUNCTION'
 const.PLSQL_SEQUENCE = 'SEQUENCE'
-const.PLSQL_TRIGGER = 'TRIGGER'
\ No newline at end of file
+const.PLSQL_TRIGGER = 'TRIGGER'
+const.EZDB_VERSION = '1.0.0.0'
@@ -0,0 +1,20 @@
+__author__ = 'yufa'
+
+
+def intern_str(value):
+	"""
+	Return the interned version of the given value if it is a str, so that the values repeated across the model
+	(story, release, products, data type, ...) are stored only once. Other values are returned unchanged.
+
+	>>> intern_str('US' + '138139') is intern_str('US138139')
+	True
+	>>> intern_str(None) is None
+	True
+	"""
+
+	return intern(value) if value.__class__ is str else value
+
+
+if __name__ == '__main__':
+	import doctest
+	doctest.testmod()
@@ -0,0 +1,122 @@
+__author__ = 'yufa'
+
+import os
+import zlib
+import errno
+import hashlib
+import logging
+import tempfile
+import cPickle as pickle
+from ezdb.common.constants import const
+
+
+_CACHE_FORMAT = 5
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+
+class ModelCache(object):
+	"""
+	On-disk content addressed cache of the parsed objects (Table/PLSQL).
+
+	An entry is keyed by the digest of the xml file content, the parse options (e.g. the snapshot flag) and the EzDB
+	version, and holds the object pickled and compressed. The entries are written atomically, so the same cache
+	directory can be shared by several checkouts and concurrent builds. The cache is kept under max_size bytes by
+	trim(), which removes the least recently used entries first (an entry's mtime is refreshed on every hit).
+	"""
+
+	def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE):
+		self.cache_dir = os.path.abspath(cache_dir)
+		self.max_size = max_size
+		self.hits = 0
+		self.misses = 0
+
+		if not os.path.isdir(self.cache_dir):
+			try:
+				os.makedirs(self.cache_dir)
+			except OSError, e:
+				if e.errno != errno.EEXIST: raise
+
+	def key(self, kind, content, *options):
+		sha1 = hashlib.sha1('%s|%s|%s|%s|' % (const.EZDB_VERSION, _CACHE_FORMAT, kind, options))
+		sha1.update(content)
+		return sha1.hexdigest()
+
+	def __path(self, key):
+		return os.path.join(self.cache_dir, key[:2], key[2:])
+
+	def get(self, key):
+		"""
+		Return the object cached under the given key, or None if it is not cached.
+		"""
+
+		path = self.__path(key)
+		try:
+			with open(path, 'rb') as f:
+				obj = pickle.loads(zlib.decompress(f.read()))
+			os.utime(path, None)
+		except (IOError, OSError):
+			self.misses += 1
+			return None
+		except Exception, e:
+			logging.warning('Ignore the corrupted cache entry %s: %s' % (path, e))
+			self.misses += 1
+			return None
+
+		self.hits += 1
+		return obj
+
+	def put(self, key, obj):
+		path = self.__path(key)
+		folder = os.path.dirname(path)
+		try:
+			if not os.path.isdir(folder):
+				os.makedirs(folder)
+		except OSError, e:
+			if e.errno != errno.EEXIST: raise
+
+		fd, temp_file = tempfile.mkstemp(dir=folder, prefix='.tmp')
+		try:
+			with os.fdopen(fd, 'wb') as f:
+				f.write(zlib.compress(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL), 1))
+			os.rename(temp_file, path)
+		except OSError:
+			# On Windows, the entry may have been written by another build in the meantime, keep that one.
+			os.path.exists(temp_file) and os.remove(temp_file)
+
+	def trim(self):
+		"""
+		Remove the least recently used entries until the cache size is under max_size.
+		"""
+
+		entries = []
+		total_size = 0
+		for folder in os.listdir(self.cache_dir):
+			folder = os.path.join(self.cache_dir, folder)
+			if not os.path.isdir(folder): continue
+			for file_name in os.listdir(folder):
+				path = os.path.join(folder, file_name)
+				try:
+					stat = os.stat(path)
+				except OSError:
+					continue
+				entries.append((stat.st_mtime, stat.st_size, path))
+				total_size += stat.st_size
+
+		logging.info('Model cache: %d hits, %d misses, %d entries, %.1f MB.' %
+		             (self.hits, self.misses, len(entries), total_size / 1048576.0))
+
+		if total_size <= self.max_size: return
+
+		entries.sort()
+		removed = 0
+		for _, size, path in entries:
+			if total_size <= self.max_size: break
+			try:
+				os.remove(path)
+			except OSError:
+				continue
+			total_size -= size
+			removed += 1
+
+		logging.info('Model cache: removed %d least recently used entries.' % removed)
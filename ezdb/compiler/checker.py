@@ -0,0 +1,302 @@
+__author__ = 'yufa'
+
+import os
+from xml.parsers import expat
+from collections import namedtuple
+
+from ezdb.common.exception import EzDBError
+from ezdb.common.constants import const
+from dbobject.column import Column
+from dbobject.table import Table
+from dbobject.index import Index
+from dbobject.plsql import PLSQL
+
+
+PLSQL_FOLDERS = ('PACKAGE', 'PROCEDURE', 'FUNCTION', 'TYPE', 'TRIGGER', 'SEQUENCE')
+
+# The dictionary tables whose DAT files are generated by the compiler
+DICTIONARY_TABLES = ('DB_OBJECTS', 'DB_TABLE_COLUMNS', 'DB_OBJECTS_UPGRADE', 'DB_TABLE_COLUMNS_UPGRADE')
+
+
+class Problem(namedtuple('Problem', 'path line message')):
+	"""
+	A problem found in a db source file, line is 0 if it is about the whole file.
+
+	>>> print Problem('TABLE/LO_DEMO.XML', 4, 'Column NAME is already defined at line 3.')
+	TABLE/LO_DEMO.XML:4: Column NAME is already defined at line 3.
+	"""
+
+	__slots__ = ()
+
+	def __str__(self):
+		if self.line:
+			return '%s:%d: %s' % self
+		return '%s: %s' % (self.path, self.message)
+
+
+class Element(object):
+	"""
+	Light xml element knowing the line of its start tag, only what the checks need: the text before the first child
+	is kept, the tail is not.
+	"""
+
+	__slots__ = ('tag', 'attrib', 'line', 'text', 'children')
+
+	def __init__(self, tag, attrib, line):
+		self.tag = tag
+		self.attrib = attrib
+		self.line = line
+		self.text = None
+		self.children = []
+
+	def __iter__(self):
+		return iter(self.children)
+
+	def findall(self, *tags):
+		"""
+		Return the descendants reached by the given path of tags, e.g. findall('columns', 'column').
+		"""
+
+		elems = [self]
+		for tag in tags:
+			elems = [child for elem in elems for child in elem.children if child.tag == tag]
+		return elems
+
+
+def parse_lines(xmlfile):
+	"""
+	Parse the given xml file into a tree of Element, return the root element. The tree is built straight from the
+	expat events, which is several times faster than the pure python ElementTree parser needed for the lines.
+	"""
+
+	parser = expat.ParserCreate()
+	parser.buffer_text = True
+	parser.returns_unicode = False
+	stack = []
+	tree = []
+
+	def start(tag, attrib):
+		elem = Element(tag, attrib, parser.CurrentLineNumber)
+		(stack[-1].children if stack else tree).append(elem)
+		stack.append(elem)
+
+	def end(tag):
+		stack.pop()
+
+	def data(text):
+		elem = stack[-1]
+		if not elem.children:
+			elem.text = (elem.text or '') + text
+
+	parser.StartElementHandler = start
+	parser.EndElementHandler = end
+	parser.CharacterDataHandler = data
+	with open(xmlfile, 'rb') as f:
+		parser.ParseFile(f)
+	return tree[0]
+
+
+class SchemaChecker(object):
+	"""
+	Check the db source files without generating anything: every file is parsed and validated on its own, and the
+	names are collected into global indexes to find the collisions between files (tables and PLSQL objects sharing
+	a name, indexes with the same name on different tables). All the problems are collected instead of stopping at the
+	first one, with the file and the line they are found at.
+
+	>>> import tempfile, shutil
+	>>> db_dir = tempfile.mkdtemp()
+	>>> with open(os.path.join(db_dir, 'LO_DEMO.XML'), 'w') as f: f.write('''<table name="LO_DEMO">
+	... <columns>
+	... <column name="ID" data_type="NUMBER"/>
+	... <column name="ID" data_type="VARCHAR2"/>
+	... </columns>
+	... <indexes>
+	... <index type="PRIMARY"><columns><column name="CODE"/></columns></index>
+	... <index old_name="PK_LO_DEMO" type="UNIQUE"><columns><column name="ID"/></columns></index>
+	... </indexes>
+	... </table>''')
+	>>> checker = SchemaChecker()
+	>>> checker.check_table(os.path.join(db_dir, 'LO_DEMO.XML'))
+	>>> for problem in checker.problems: print problem.line, problem.message
+	4 Column ID is already defined at line 3.
+	7 Index PK_LO_DEMO: column CODE is not a column of the table LO_DEMO.
+	8 Index PK_LO_DEMO is already defined on the table LO_DEMO at line 7.
+	>>> shutil.rmtree(db_dir)
+	"""
+
+	def __init__(self):
+		self.problems = []
+		self.files = 0
+		# name -> (owner, path, line), see __define
+		self.__objects = {}
+		self.__triggers = {}
+		self.__indexes = {}
+
+	def problem(self, path, line, message):
+		self.problems.append(Problem(path, line, message))
+
+	def __define(self, namespace, name, description, owner, path, line):
+		# owner tells what defines the name, e.g. "as a table" or "on the table LO_DEMO"
+		if name in namespace:
+			previous_owner, previous_path, previous_line = namespace[name]
+			where = 'at line %d' % previous_line if previous_path == path else 'in %s:%d' % (previous_path, previous_line)
+			self.problem(path, line, '%s is already defined %s %s.' % (description, previous_owner, where))
+		else:
+			namespace[name] = (owner, path, line)
+
+	def __update(self, obj, elem, path):
+		try:
+			return obj.update(elem.attrib)
+		except (EzDBError, ValueError):
+			pass
+		# set again one by one, so an invalid attribute doesn't hide the others
+		for key, value in elem.attrib.items():
+			try:
+				obj.update({key: value})
+			except (EzDBError, ValueError), e:
+				self.problem(path, elem.line, 'Invalid %s="%s": %s' % (key, value, e))
+
+	def __parse(self, path):
+		self.files += 1
+		try:
+			return parse_lines(path)
+		except expat.ExpatError, e:
+			self.problem(path, e.lineno, 'Invalid xml: %s' % expat.ErrorString(e.code))
+		except IOError, e:
+			self.problem(path, 0, 'Cannot read the file: %s' % e)
+
+	def check_table(self, path):
+		root = self.__parse(path)
+		if root is None: return
+		if root.tag.lower() != 'table':
+			return self.problem(path, root.line, 'Not a table xml file, the root element is <%s>.' % root.tag)
+
+		table = Table()
+		self.__update(table, root, path)
+		try:
+			table_name = table.name
+		except EzDBError, e:
+			return self.problem(path, root.line, str(e))
+		self.__define(self.__objects, table_name, 'Table %s' % table_name, 'as a table', path, root.line)
+
+		lines = {}
+		for item in root.findall('columns', 'column'):
+			column = Column()
+			self.__update(column, item, path)
+			for child in item:
+				try:
+					column[child.tag] = child.text
+				except (EzDBError, ValueError), e:
+					self.problem(path, child.line, 'Invalid <%s>: %s' % (child.tag, e))
+
+			try:
+				column_name = column.name
+			except EzDBError, e:
+				self.problem(path, item.line, str(e))
+				continue
+			if column_name in lines:
+				self.problem(path, item.line, 'Column %s is already defined at line %d.' % (column_name, lines[column_name]))
+				continue
+			lines[column_name] = item.line
+
+			try:
+				data_type = column.parsed_data_type
+			except EzDBError, e:
+				self.problem(path, item.line, 'Column %s: %s' % (column_name, e))
+			else:
+				# see Column.column_ctl_str
+				if data_type.width is None and not column.sql_loader_ctl_expression:
+					self.problem(path, item.line, 'Column %s: unknown data type %s.' % (column_name, data_type))
+			table.add_column(column)
+
+		for item in root.findall('indexes', 'index'):
+			columns = []
+			for column in item.findall('columns', 'column'):
+				column_name = column.attrib.get('name', '').upper()
+				if not column_name:
+					self.problem(path, column.line, 'Index column name is not set.')
+				columns.append((column_name, column.line))
+			# Function-based index is not covered, it is ignored by the compiler.
+			if not columns: continue
+
+			index = Index()
+			self.__update(index, item, path)
+			try:
+				index.columns = ','.join(column_name for column_name, line in columns)
+				try:
+					_ = index.name
+				except EzDBError:
+					# named as the compiler does, without its warning (see Table.add_index)
+					index.update_name(table_name, len(table.indexes))
+				table.add_index(index)
+			except EzDBError, e:
+				self.problem(path, item.line, str(e))
+				continue
+
+			for column_name, line in columns:
+				if column_name and column_name not in table.columns and column_name != const.COLUMN_SNAPSHOT_ID:
+					self.problem(path, line, 'Index %s: column %s is not a column of the table %s.' %
+					             (index.name, column_name, table_name))
+			self.__define(self.__indexes, index.name, 'Index %s' % index.name, 'on the table %s' % table_name, path,
+			              item.line)
+
+	def check_plsql(self, folder, path, exists):
+		"""
+		Check the PLSQL object xml file in the given folder, exists(file_name) tells if a file of the folder exists.
+		"""
+
+		root = self.__parse(path)
+		if root is None: return
+
+		try:
+			plsql = PLSQL(root.tag.upper())
+		except EzDBError, e:
+			return self.problem(path, root.line, 'Not a PLSQL object xml file: %s' % e)
+		self.__update(plsql, root, path)
+		try:
+			name = plsql.name
+		except EzDBError, e:
+			return self.problem(path, root.line, str(e))
+
+		if plsql.object_type != folder:
+			self.problem(path, root.line, 'The %s %s is in the folder %s.' % (plsql.object_type, name, folder))
+		namespace = self.__triggers if plsql.object_type == const.PLSQL_TRIGGER else self.__objects
+		object_type = plsql.object_type.lower()
+		self.__define(namespace, name, '%s %s' % (object_type.capitalize(), name), 'as a %s' % object_type, path,
+		              root.line)
+
+		xml_file_name = os.path.basename(path)
+		if plsql.object_type == const.PLSQL_PACKAGE:
+			files = [xml_file_name.replace('XML', 'PKS'), xml_file_name.replace('XML', 'PKB')]
+		else:
+			files = [xml_file_name.replace('XML', 'SQL')]
+		for file_name in files:
+			if not exists(file_name):
+				self.problem(path, 0, 'File %s is missing for the object %s.' % (file_name, name))
+
+	def check(self, sources):
+		"""
+		Check all the db source files resolved by the given source overlay, return the problems in the order of the
+		files and the lines.
+		"""
+
+		for table_name in DICTIONARY_TABLES:
+			if not sources.exists('TABLE', '%s.XML' % table_name):
+				self.problem(os.path.join('TABLE', '%s.XML' % table_name), 0, 'The dictionary table file is missing.')
+
+		for file_name in sources.listdir('TABLE'):
+			if file_name.upper().endswith('.XML'):
+				self.check_table(sources.path('TABLE', file_name))
+
+		for folder in PLSQL_FOLDERS:
+			exists = lambda file_name: sources.exists(folder, file_name)
+			for file_name in sources.listdir(folder):
+				if file_name.upper().endswith('.XML'):
+					self.check_plsql(folder, sources.path(folder, file_name), exists)
+
+		return sorted(self.problems)
+
+
+if __name__ == '__main__':
+	import doctest
+	doctest.testmod()
@@ -1,8 +1,11 @@
 __author__ = 'yufa'
 
 import logging
+import itertools
+import datatype
 from ezdb.common.exception import EzDBError
 from ezdb.common.constants import const
+from ezdb.common.utils import intern_str
 
 
 class Column(object):
@@ -36,15 +39,16 @@ class Column(object):
 
 	"""
 
+	__slots__ = ('__name', '__data_type', '__parsed_data_type', '__nullable', '__documentation', '__default_value',
+	             '__story', '__products', '__release', '__sql_loader_ctl_expression', '__deprecated_release',
+	             '__sequence_name', '__order')
 
-	_order = 0
+	_order = itertools.count()
 
 	def __init__(self, name=None, data_type=None, nullable='Y', default_value=None,
 	             documentation=None, story=None, release=None, products='W',
 	             sql_loader_ctl_expression=None, deprecated_release=None, sequence_name=None):
 
-		self.__attrs = {}
-
 		if name:
 			self.name = name
 		else:
@@ -53,7 +57,7 @@ class Column(object):
 		if data_type:
 			self.data_type = data_type
 		else:
-			self.__data_type = None
+			self.__data_type = self.__parsed_data_type = None
 
 		self.nullable = nullable
 		self.default_value = default_value
@@ -65,9 +69,7 @@ class Column(object):
 		self.deprecated_release = deprecated_release
 		self.sequence_name = sequence_name
 
-		self.__order = Column._order
-
-		Column._order += 1
+		self.__order = next(Column._order)
 
 
 	@property
@@ -85,7 +87,7 @@ class Column(object):
 	def name(self, value):
 		if len(value) > 30:
 			raise EzDBError('Column name length can not exceed 30!')
-		self.__name = self.__attrs['column_name'] = value.upper()
+		self.__name = value.upper()
 
 	@property
 	def data_type(self):
@@ -98,7 +100,19 @@ class Column(object):
 	def data_type(self, value):
 		if not value:
 			raise EzDBError('Column data type cannot be None!')
-		self.__data_type = self.__attrs['data_type'] = value.upper()
+		self.__data_type = intern_str(value.upper())
+		self.__parsed_data_type = datatype.data_type(value)
+
+	@property
+	def parsed_data_type(self):
+		"""
+		The DataType object of the column data type, shared by all the columns of the same type.
+		"""
+
+		if self.__parsed_data_type:
+			return self.__parsed_data_type
+		else:
+			raise EzDBError('Column data type is not set!')
 
 	@property
 	def nullable(self):
@@ -111,15 +125,13 @@ class Column(object):
 		else:
 			self.__nullable = 'N'
 
-		self.__attrs['nullable'] = self.__nullable
-
 	@property
 	def documentation(self):
 		return self.__documentation
 
 	@documentation.setter
 	def documentation(self, value):
-		self.__documentation = self.__attrs['column_desc'] = value or ''
+		self.__documentation = value or ''
 
 	@property
 	def default_value(self):
@@ -127,7 +139,7 @@ class Column(object):
 
 	@default_value.setter
 	def default_value(self, value):
-		self.__attrs['default_value'] = self.__default_value = value or ''
+		self.__default_value = intern_str(value or '')
 
 	@property
 	def story(self):
@@ -135,7 +147,7 @@ class Column(object):
 
 	@story.setter
 	def story(self, value):
-		self.__story = self.__attrs['story_id'] = value.upper() if value else const.DEFAULT_STORY_NUMBER
+		self.__story = intern_str(value.upper()) if value else const.DEFAULT_STORY_NUMBER
 
 	@property
 	def products(self):
@@ -143,7 +155,7 @@ class Column(object):
 
 	@products.setter
 	def products(self, value):
-		self.__products = self.__attrs['products'] = value or const.DEFAULT_PRODUCT_CODE
+		self.__products = intern_str(value) or const.DEFAULT_PRODUCT_CODE
 
 	@property
 	def release(self):
@@ -151,7 +163,7 @@ class Column(object):
 
 	@release.setter
 	def release(self, value):
-		self.__release = self.__attrs['release'] = value or const.DEFAULT_RELEASE_NUMBER
+		self.__release = intern_str(value) or const.DEFAULT_RELEASE_NUMBER
 
 	@property
 	def sql_loader_ctl_expression(self):
@@ -167,7 +179,7 @@ class Column(object):
 
 	@deprecated_release.setter
 	def deprecated_release(self, value):
-		self.__deprecated_release = self.__attrs['deprecated_release'] = value or ''
+		self.__deprecated_release = intern_str(value) or ''
 
 	@property
 	def sequence_name(self):
@@ -175,7 +187,7 @@ class Column(object):
 
 	@sequence_name.setter
 	def sequence_name(self, value):
-		self.__sequence_name = self.__attrs['sequence_name'] = value or ''
+		self.__sequence_name = value or ''
 
 	def __eq__(self, other):
 		if isinstance(other, Column):
@@ -195,14 +207,46 @@ class Column(object):
 
 
 	def as_dict(self):
-		return self.__attrs
-		#a = {(k, getattr(self, k)) for k, v in self.__class__.__dict__.iteritems() \
-		#     if isinstance(v, property) and not k == 'sql_loader_ctl_expression'}
-		#return a
+		"""
+		Return the column attributes keyed by the columns of DB_TABLE_COLUMNS.
+		"""
+
+		attrs = {'nullable': self.__nullable, 'column_desc': self.__documentation, 'default_value': self.__default_value,
+		         'story_id': self.__story, 'products': self.__products, 'release': self.__release,
+		         'deprecated_release': self.__deprecated_release, 'sequence_name': self.__sequence_name}
+		if self.__name:
+			attrs['column_name'] = self.__name
+		if self.__data_type:
+			attrs['data_type'] = self.__data_type
+		return attrs
+
+	def as_record(self):
+		"""
+		Return the column as a tuple of plain values, see ezdb.compiler.schema and from_record.
+		"""
+
+		return (self.__name, self.__data_type, self.__nullable, self.__documentation, self.__default_value,
+		        self.__story, self.__products, self.__release, self.__sql_loader_ctl_expression, self.__deprecated_release,
+		        self.__sequence_name)
+
+	@classmethod
+	def from_record(cls, record):
+		"""
+		Return the column of the given record (see as_record), the values are taken as they are, without the checks
+		and the conversions of the setters. The column is ordered after the columns created before.
+		"""
+
+		column = cls.__new__(cls)
+		(column.__name, column.__data_type, column.__nullable, column.__documentation, column.__default_value,
+		 column.__story, column.__products, column.__release, column.__sql_loader_ctl_expression,
+		 column.__deprecated_release, column.__sequence_name) = record
+		column.__parsed_data_type = datatype.data_type(column.__data_type) if column.__data_type else None
+		column.__order = next(Column._order)
+		return column
 
 
 	def column_ddl(self):
-		l = [self.name, self.data_type]
+		l = [self.name, self.parsed_data_type.ddl]
 		if self.default_value:
 			l.append('DEFAULT %s' % self.default_value)
 		if self.nullable == 'N':
@@ -239,47 +283,15 @@ class Column(object):
 
 		"""
 
-		import re
-
 		if self.sql_loader_ctl_expression:
 			return ',{0} {1}'.format(self.name, self.sql_loader_ctl_expression)
 
-		char_pattern = re.compile(r'(CHAR|VARCHAR|VARCHAR2|NVARCHAR|NVARCHAR2)\s*\(\s*(?P<size>\d+)\s*\)')
-		result = char_pattern.match(self.data_type)
-		if result:
-			len = result.group('size')
-			if int(len) > 2000:
-				return ',{0} CHAR({1}) "TO_CHAR(SUBSTR(:{2},1,2000))||TO_CHAR(SUBSTR(:{3},2001))"'.format(
-					self.name, len, self.name, self.name)
-			else:
-				return ',{0} CHAR({1}) "TO_CHAR(:{2})"'.format(self.name, len, self.name)
-
-		number_pattern = re.compile(r'(NUMBER|INTEGER|DECIMAL|FLOAT)')
-		result = number_pattern.match(self.data_type)
-		if result: return ',{0} "TO_NUMBER(:{1})"'.format(self.name, self.name)
-
-		if self.data_type == 'DATE':
-			return ',{0} DATE "YYYY-MM-DD HH24:MI:SS"'.format(self.name)
-
-		if self.data_type.startswith('TIMESTAMP'):
-			return ',{0} TIMESTAMP "YYYY-MM-DD HH24:MI:SS:FF3"'.format(self.name)
-
-		if self.data_type in ('CLOB', 'LONG', 'XMLTYPE'):
-			return ", {0}# FILTER CHAR\n,{1} CHAR(1048576) ENCLOSED BY '<start_lob>' AND '<end_lob>' NULLIF {2}#='Y'".format(
-				self.name[0:29], self.name, self.name[0:29]
-			)
-
-		if self.data_type in ('ROWID', 'UROWID'):
-			return ',{0} CHAR(30) "TO_CHAR(:1)"'.format(self.name, self.name)
-
-		raw_pattern = re.compile(r'RAW\s*\(\s*(?P<size>\d+)\s*\)')
-		result = raw_pattern.match(self.data_type)
-		if result:
-			return ',{0} "HEXTORAW(:{1})"'.format(self.name, self.name)
-
-		msg = 'Unknown column data type: %s' % str(self)
-		logging.error(msg)
-		raise EzDBError(msg)
+		ctl_str = self.parsed_data_type.ctl_field(self.name)
+		if ctl_str is None:
+			msg = 'Unknown column data type: %s' % str(self)
+			logging.error(msg)
+			raise EzDBError(msg)
+		return ctl_str
 
 
 _snapshot_id_column = None
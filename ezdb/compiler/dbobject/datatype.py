@@ -0,0 +1,118 @@
+__author__ = 'yufa'
+
+import re
+
+
+_CHAR_PATTERN = re.compile(r'(CHAR|VARCHAR|VARCHAR2|NVARCHAR|NVARCHAR2)\s*\(\s*(?P<size>\d+)\s*\)')
+_NUMBER_PATTERN = re.compile(r'(NUMBER|INTEGER|DECIMAL|FLOAT)')
+_RAW_PATTERN = re.compile(r'RAW\s*\(\s*(?P<size>\d+)\s*\)')
+
+# The maximum size of a lob value in the sql*loader DAT file
+LOB_SIZE = 1048576
+
+# Columns of these types can't be loaded by sql*loader in direct path
+_NON_DIRECT_TYPES = ('CLOB', 'BLOB', 'LONG')
+
+_data_types = {}
+
+
+def data_type(value):
+	"""
+	Return the DataType object of the given column data type. Each distinct data type is parsed only once, the
+	same object is returned to all the columns of that type.
+
+	>>> data_type('varchar2(20)') is data_type('VARCHAR2(20)')
+	True
+	"""
+
+	name = value.upper()
+	try:
+		return _data_types[name]
+	except KeyError:
+		return _data_types.setdefault(name, DataType(name))
+
+
+class DataType(object):
+	"""
+	Column data type, with the DDL fragment, the sql*loader field spec, the lob/direct path flags and the width
+	(maximum length of a value in the DAT file) computed once from the type string.
+	Use data_type() to get the shared instance instead of creating a new one.
+
+	>>> data_type('number(10,2)').ctl_field('amount')
+	',amount "TO_NUMBER(:amount)"'
+	>>> t = data_type('varchar2(4000)')
+	>>> t.ddl, t.width, t.is_lob, t.direct_path
+	('VARCHAR2(4000)', 4000, False, True)
+	>>> print data_type('clob').ctl_field('NOTE')
+	, NOTE# FILTER CHAR
+	,NOTE CHAR(1048576) ENCLOSED BY '<start_lob>' AND '<end_lob>' NULLIF NOTE#='Y'
+	>>> data_type('blob').direct_path, data_type('blob').ctl_template
+	(False, None)
+	"""
+
+	def __init__(self, name):
+		self.name = name
+		self.ddl = name
+		self.is_lob = name in ('CLOB', 'BLOB', 'LONG', 'XMLTYPE')
+		self.direct_path = name not in _NON_DIRECT_TYPES
+		self.ctl_template, self.width = self.__parse(name)
+
+	@staticmethod
+	def __parse(name):
+		"""
+		Return the sql*loader field template ({name} is the column name, {filler} the lob filler field name) and
+		the width of the given data type, the template is None if the type can't be loaded by sql*loader.
+		"""
+
+		result = _CHAR_PATTERN.match(name)
+		if result:
+			size = result.group('size')
+			if int(size) > 2000:
+				return (',{name} CHAR(%s) "TO_CHAR(SUBSTR(:{name},1,2000))||TO_CHAR(SUBSTR(:{name},2001))"' % size,
+				        int(size))
+			else:
+				return ',{name} CHAR(%s) "TO_CHAR(:{name})"' % size, int(size)
+
+		if _NUMBER_PATTERN.match(name):
+			return ',{name} "TO_NUMBER(:{name})"', 40
+
+		if name == 'DATE':
+			return ',{name} DATE "YYYY-MM-DD HH24:MI:SS"', 19
+
+		if name.startswith('TIMESTAMP'):
+			return ',{name} TIMESTAMP "YYYY-MM-DD HH24:MI:SS:FF3"', 23
+
+		if name in ('CLOB', 'LONG', 'XMLTYPE'):
+			return (", {filler}# FILTER CHAR\n,{name} CHAR(%d) ENCLOSED BY '<start_lob>' AND '<end_lob>' NULLIF {filler}#='Y'"
+			        % LOB_SIZE, LOB_SIZE)
+
+		if name in ('ROWID', 'UROWID'):
+			return ',{name} CHAR(30) "TO_CHAR(:1)"', 30
+
+		result = _RAW_PATTERN.match(name)
+		if result:
+			return ',{name} "HEXTORAW(:{name})"', 2 * int(result.group('size'))
+
+		return None, LOB_SIZE if name == 'BLOB' else None
+
+	def ctl_field(self, column_name):
+		"""
+		Return the field spec of a column of this type in the sql*loader control file, or None if the type can't
+		be loaded by sql*loader.
+		"""
+
+		if self.ctl_template is None:
+			return None
+		return self.ctl_template.format(name=column_name, filler=column_name[0:29])
+
+	def __reduce__(self):
+		# keep the instances shared after pickling (e.g. the objects parsed in the worker processes)
+		return data_type, (self.name,)
+
+	def __str__(self):
+		return self.name
+
+
+if __name__ == '__main__':
+	import doctest
+	doctest.testmod()
@@ -1,39 +1,46 @@
 __author__ = 'yufa'
 
 import logging
+import operator
 
 from ezdb.common.exception import EzDBError
 from table import Table
 
 
 
+# The default dictionary tables, used by the objects rendering their metadata without a Dictionary
 # Table DB_OBJECTS
 _global_db_objects_table = None
 # Table DB_TABLE_COLUMNS
 _global_db_table_columns_table = None
 
-_global_db_objects_meta_template = None
-_global_db_table_columns_meta_template = None
-
-def _set_dict_table(table, table_name):
-	logging.info('Initializing table {0}.'.format(table_name))
+_global_db_objects_encoder = None
+_global_db_table_columns_encoder = None
 
+def _check_dict_table(table, table_name):
 	if not isinstance(table, Table):
 		msg = 'The given object is not a valid Table object!'
 		logging.error(msg)
 		raise EzDBError(msg)
 
-	if table_name == table.name == 'DB_OBJECTS':
-		global _global_db_objects_table
-		_global_db_objects_table = table
-	elif table_name == table.name == 'DB_TABLE_COLUMNS':
-		global _global_db_table_columns_table
-		_global_db_table_columns_table = table
-	else:
+	if not table_name == table.name:
 		msg = 'Failed to initialize table {0}, as the given table is not {1}!'.format(table_name, table_name)
 		logging.error(msg)
 		raise EzDBError(msg)
 
+def _set_dict_table(table, table_name):
+	logging.info('Initializing table {0}.'.format(table_name))
+
+	_check_dict_table(table, table_name)
+	if table_name == 'DB_OBJECTS':
+		global _global_db_objects_table, _global_db_objects_encoder
+		_global_db_objects_table = table
+		_global_db_objects_encoder = RowEncoder(table)
+	else:
+		global _global_db_table_columns_table, _global_db_table_columns_encoder
+		_global_db_table_columns_table = table
+		_global_db_table_columns_encoder = RowEncoder(table)
+
 	logging.info('Finish initializing table {0}.'.format(table_name))
 
 def set_db_objects_table(table):
@@ -42,29 +49,10 @@ def set_db_objects_table(table):
 def set_db_table_columns_table(table):
 	_set_dict_table(table, 'DB_TABLE_COLUMNS')
 
-def _table_metadata_template(table):
-	meta_template = ['"{%s}"' % item.name.lower() for item in table.sorted_columns()]
-	return ','.join(meta_template) + '#$EOR$#\n'
-
-def _db_objects_meta_template():
-	global _global_db_objects_meta_template
-	if not _global_db_objects_meta_template:
-		_global_db_objects_meta_template = _table_metadata_template(_global_db_objects_table)
-	return _global_db_objects_meta_template
-
-def _db_table_columns_meta_template():
-	global _global_db_table_columns_meta_template
-	if not _global_db_table_columns_meta_template:
-		_global_db_table_columns_meta_template = _table_metadata_template(_global_db_table_columns_table)
-	return _global_db_table_columns_meta_template
-
-def _escape_character(params):
-	for k, v in params.iteritems():
-			if isinstance(v, str):
-				v = v.replace('"', '""') #escape quota(") used in sql*loader
-				#v = v.strip("'") # Remove the single quota(') (maybe set by default value) to be used in sql*loader
-				params[k] = v
-	return params
+def _escape_character(value):
+	if isinstance(value, str) and '"' in value:
+		return value.replace('"', '""') #escape quota(") used in sql*loader
+	return value
 
 def _escape_default_value(value):
 	# Remove the single quota(')
@@ -73,6 +61,47 @@ def _escape_default_value(value):
 	return value.strip("'")
 
 
+class RowEncoder(object):
+	"""
+	Encode the rows of a dictionary table (DB_OBJECTS/DB_TABLE_COLUMNS) in the format of a sql*loader DAT file.
+
+	It is built once per dictionary table: the field order is fixed by the table columns, and the default values are
+	resolved and escaped up front, so encoding a row only escapes the given values.
+
+	>>> from column import Column
+	>>> table = Table()
+	>>> table.name = 'DB_DEMO'
+	>>> for name, default_value in (('table_name', None), ('description', 'say "hi"!'), ('init_on_install', "'N'")):
+	...     table.add_column(Column(name, 'VARCHAR2(30)', default_value=default_value))
+	>>> encoder = RowEncoder(table)
+	>>> encoder.encode({'table_name': 'LO_DEMO', 'description': 'a "demo" table', 'not_a_column': 1})
+	'"LO_DEMO","a ""demo"" table","N"#$EOR$#\\n'
+	>>> encoder.encode({'table_name': 'LO_DEMO'})
+	'"LO_DEMO","say ""hi""!","N"#$EOR$#\\n'
+	"""
+
+	def __init__(self, table):
+		self.fields = [column.name.lower() for column in table.sorted_columns()]
+		self.__defaults = dict((name.lower(), _escape_character(_escape_default_value(column.default_value)))
+		                       for name, column in table.columns.iteritems())
+		self.__format = ','.join(['"%s"'] * len(self.fields)) + '#$EOR$#\n'
+		getter = operator.itemgetter(*self.fields)
+		self.__getter = getter if len(self.fields) > 1 else lambda row: (getter(row),)
+
+	def encode(self, values, extra=None):
+		"""
+		Return one row, the fields not in values (or extra) are set to their default value.
+		"""
+
+		row = self.__defaults.copy()
+		for mapping in (values, extra or {}):
+			row.update(mapping)
+			for key, value in mapping.iteritems():
+				if value.__class__ is str and '"' in value:
+					row[key] = value.replace('"', '""') #escape quota(") used in sql*loader
+		return self.__format % self.__getter(row)
+
+
 def db_table_columns_metadata(table_name, sorted_columns):
 	"""
 	All the table columns' metadata will be saved in db dict table - DB_TABLE_COLUMNS, and this kind data
@@ -83,21 +112,9 @@ def db_table_columns_metadata(table_name, sorted_columns):
 	if not _global_db_table_columns_table:
 		raise EzDBError('Table DB_TABLE_COLUMNS is not created!')
 
-	table_column = []
-	for idx, column in enumerate(sorted_columns):
-		col_dict = column.as_dict()
-		col_dict['table_name'] = table_name
-		col_dict['column_id'] = idx + 1
-
-		params = {}
-		for k, v in _global_db_table_columns_table.columns.iteritems():
-			k = k.lower()
-			if k not in col_dict:
-				params[k] = _escape_default_value(v.default_value)
-		params.update(col_dict)
-		params = _escape_character(params)
-		table_column.append(_db_table_columns_meta_template().format(**params))
-	return ''.join(table_column)
+	encode = _global_db_table_columns_encoder.encode
+	return ''.join([encode(column.as_dict(), {'table_name': table_name, 'column_id': idx + 1})
+	                for idx, column in enumerate(sorted_columns)])
 
 def db_objects_metadata(**kwargs):
 	"""
@@ -109,13 +126,31 @@ def db_objects_metadata(**kwargs):
 	if not _global_db_objects_table:
 		raise EzDBError('Table DB_OBJECTS is not created!')
 
-	params = {}
-	for k, v in _global_db_objects_table.columns.iteritems():
-		k = k.lower()
-		if k not in kwargs:
-			params[k] = _escape_default_value(v.default_value)
-	params.update(kwargs)
-	params = _escape_character(params)
+	return _global_db_objects_encoder.encode(kwargs)
+
+
+class Dictionary(object):
+	"""
+	The dictionary tables DB_OBJECTS and DB_TABLE_COLUMNS of a compilation, with their row encoders.
+
+	It renders the metadata like the module functions db_objects_metadata and db_table_columns_metadata, but with its
+	own tables instead of the default ones, so several compilations with different dictionary tables can run at the
+	same time, see Table.table_metadata(dictionary).
+	"""
 
-	return _db_objects_meta_template().format(**params)
+	def __init__(self, db_objects_table, db_table_columns_table):
+		_check_dict_table(db_objects_table, 'DB_OBJECTS')
+		_check_dict_table(db_table_columns_table, 'DB_TABLE_COLUMNS')
+		self.db_objects_table = db_objects_table
+		self.db_table_columns_table = db_table_columns_table
+		self.db_objects_encoder = RowEncoder(db_objects_table)
+		self.db_table_columns_encoder = RowEncoder(db_table_columns_table)
+
+	def db_objects_metadata(self, **kwargs):
+		return self.db_objects_encoder.encode(kwargs)
+
+	def db_table_columns_metadata(self, table_name, sorted_columns):
+		encode = self.db_table_columns_encoder.encode
+		return ''.join([encode(column.as_dict(), {'table_name': table_name, 'column_id': idx + 1})
+		                for idx, column in enumerate(sorted_columns)])
 
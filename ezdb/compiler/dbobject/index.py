@@ -2,6 +2,36 @@ __author__ = 'yufa'
 
 from ezdb.common.exception import EzDBError
 from ezdb.common.constants import const
+from ezdb.common.utils import intern_str
+
+
+# How the indexes (and the unique indexes of the primary/unique keys) are built by the index DDL:
+#   default  - serial, logged
+#   parallel - with the parallel degree and NOLOGGING (e.g. on the tables just loaded by a fresh installation), then
+#              set back to NOPARALLEL LOGGING
+#   online   - ONLINE with the parallel degree, then set back to NOPARALLEL, so the table can still be modified while
+#              the index is built (upgrade of a running database)
+BUILD_MODES = ('default', 'parallel', 'online')
+
+# (build mode, default parallel degree), see set_build_mode
+_build_mode = ('default', 4)
+
+
+def check_build_mode(mode, degree):
+	if mode not in BUILD_MODES:
+		raise EzDBError('Unknown index build mode: %s, it should be one of %s.' % (mode, ', '.join(BUILD_MODES)))
+	if degree < 1:
+		raise EzDBError('The parallel degree of the index builds should be at least 1: %s.' % degree)
+
+
+def set_build_mode(mode='default', degree=4):
+	global _build_mode
+	check_build_mode(mode, degree)
+	_build_mode = (mode, degree)
+
+
+def get_build_mode():
+	return _build_mode
 
 
 class Index(object):
@@ -17,8 +47,20 @@ class Index(object):
 	>>> index.index_ddl(table_name='LO_TEST', enable_snapshot=True)
 	'ALTER TABLE LO_TEST ADD CONSTRAINT PK_LO_TEST PRIMARY KEY(SNAPSHOT_ID,name);'
 
+	>>> index = Index('I1_LO_TEST', 'LO_TEST', columns='NAME')
+	>>> print index.index_ddl('parallel', 8)
+	CREATE INDEX I1_LO_TEST ON LO_TEST (NAME) TABLESPACE &1 PARALLEL 8 NOLOGGING;
+	ALTER INDEX I1_LO_TEST NOPARALLEL LOGGING;
+	>>> index.type = 'UNIQUE'
+	>>> print index.index_ddl('online', 8)
+	CREATE UNIQUE INDEX I1_LO_TEST ON LO_TEST (NAME) TABLESPACE &1 ONLINE PARALLEL 8;
+	ALTER TABLE LO_TEST ADD CONSTRAINT I1_LO_TEST UNIQUE (NAME) USING INDEX I1_LO_TEST;
+	ALTER INDEX I1_LO_TEST NOPARALLEL;
+
 	"""
 
+	__slots__ = ('__name', '__type', '__columns', '__table_name', '__story', '__release', '__enable_snapshot')
+
 	def __init__(self, name=None, table_name=None, type=None, story=None, release=None, columns=None, enable_snapshot=False):
 		if name:
 			self.name = name
@@ -70,7 +112,7 @@ class Index(object):
 			raise EzDBError('Index type cannot be None.')
 		if not value.upper() in ('PRIMARY', 'UNIQUE', 'NON-UNIQUE'):
 			raise EzDBError('Index type can only be "PRIMARY", "UNIQUE" and "NON-UNIQUE".')
-		self.__type = value.upper()
+		self.__type = intern_str(value.upper())
 
 	@property
 	def story(self):
@@ -78,7 +120,7 @@ class Index(object):
 
 	@story.setter
 	def story(self, value):
-		self.__story = value.upper() if value else const.DEFAULT_STORY_NUMBER
+		self.__story = intern_str(value.upper()) if value else const.DEFAULT_STORY_NUMBER
 
 	@property
 	def release(self):
@@ -86,7 +128,7 @@ class Index(object):
 
 	@release.setter
 	def release(self, value):
-		self.__release = value if value else const.DEFAULT_RELEASE_NUMBER
+		self.__release = intern_str(value) if value else const.DEFAULT_RELEASE_NUMBER
 
 	@property
 	def columns(self):
@@ -119,22 +161,47 @@ class Index(object):
 	def enable_snapshot(self, value):
 		self.__enable_snapshot = value or False
 
-	def index_ddl(self):
+	def index_ddl(self, mode=None, degree=None):
+		"""
+		Return the statements creating the index, built with the given mode (see BUILD_MODES) and parallel degree,
+		by default the ones set by set_build_mode.
+		"""
+
 		if not (self.table_name or self.columns): return ''
 
+		mode = mode or _build_mode[0]
+		degree = degree or _build_mode[1]
 		if self.type == 'PRIMARY':
-			return 'ALTER TABLE {table_name} ADD CONSTRAINT {index_name} PRIMARY KEY({columns}) USING INDEX TABLESPACE &1;'.format(
-				table_name=self.table_name, index_name=self.name, columns=self.columns
-			)
+			constraint = 'PRIMARY KEY({columns})'
+		elif self.type == 'UNIQUE':
+			constraint = 'UNIQUE ({columns})'
+		else:
+			constraint = None
 
-		if self.type == 'UNIQUE':
-			return 'ALTER TABLE {table_name} ADD CONSTRAINT {index_name} UNIQUE ({columns}) USING INDEX TABLESPACE &1;'.format(
-				index_name=self.name, table_name=self.table_name, columns=self.columns
-			)
+		if mode == 'default':
+			if constraint:
+				ddl = 'ALTER TABLE {table_name} ADD CONSTRAINT {index_name} %s USING INDEX TABLESPACE &1;' % constraint
+			else:
+				ddl = 'CREATE INDEX {index_name} ON {table_name} ({columns}) TABLESPACE &1;'
+		else:
+			build = ' PARALLEL %d' % degree if degree > 1 else ''
+			build = ' ONLINE' + build if mode == 'online' else build + ' NOLOGGING'
+			reset = ' NOPARALLEL' if degree > 1 else ''
+			reset = reset if mode == 'online' else reset + ' LOGGING'
+
+			if constraint and mode == 'online':
+				# the constraint can't be added online, it uses the unique index built online beforehand
+				ddl = ['CREATE UNIQUE INDEX {index_name} ON {table_name} ({columns}) TABLESPACE &1%s;' % build,
+				       'ALTER TABLE {table_name} ADD CONSTRAINT {index_name} %s USING INDEX {index_name};' % constraint]
+			elif constraint:
+				ddl = ['ALTER TABLE {table_name} ADD CONSTRAINT {index_name} %s USING INDEX TABLESPACE &1%s;'
+				       % (constraint, build)]
+			else:
+				ddl = ['CREATE INDEX {index_name} ON {table_name} ({columns}) TABLESPACE &1%s;' % build]
+			reset and ddl.append('ALTER INDEX {index_name}%s;' % reset)
+			ddl = '\n'.join(ddl)
 
-		return 'CREATE INDEX {index_name} ON {table_name} ({columns}) TABLESPACE &1;'.format(
-			index_name=self.name, table_name=self.table_name, columns=self.columns
-		)
+		return ddl.format(table_name=self.table_name, index_name=self.name, columns=self.columns)
 
 	def update(self, mapping):
 		for key, value in mapping.items():
@@ -145,6 +212,21 @@ class Index(object):
 						isinstance(self.__class__.__dict__[key], property):
 					self.__setattr__(key, value)
 
+	def as_record(self):
+		"""
+		Return the index as a tuple of plain values, see ezdb.compiler.schema and from_record.
+		"""
+
+		return (self.__name, self.__type, self.__columns, self.__table_name, self.__story, self.__release,
+		        self.__enable_snapshot)
+
+	@classmethod
+	def from_record(cls, record):
+		index = cls.__new__(cls)
+		(index.__name, index.__type, index.__columns, index.__table_name, index.__story, index.__release,
+		 index.__enable_snapshot) = record
+		return index
+
 	def update_name(self, table_name, seq):
 		"""
 		If the index name is not specified in the table xml file, call this method to generate the index name.
@@ -103,11 +103,27 @@ class PLSQL(object):
 					isinstance(self.__class__.__dict__[key], property):
 				self.__setattr__(key, value)
 
-	def metadata(self):
+	def as_record(self):
 		"""
-		Return the metadata to be stored in the table DB_OBJECTS
+		Return the object as a tuple of plain values, see ezdb.compiler.schema and from_record.
 		"""
-		metadata = dbmeta.db_objects_metadata(
+
+		return (self.__object_type, self.__name, self.__story, self.__release, self.__products_formula,
+		        self.__documentation, self.__install_order)
+
+	@classmethod
+	def from_record(cls, record):
+		plsql = cls.__new__(cls)
+		(plsql.__object_type, plsql.__name, plsql.__story, plsql.__release, plsql.__products_formula,
+		 plsql.__documentation, plsql.__install_order) = record
+		return plsql
+
+	def metadata(self, dictionary=None):
+		"""
+		Return the metadata to be stored in the table DB_OBJECTS, rendered with the given dictionary (dbmeta.Dictionary)
+		or the default dictionary tables.
+		"""
+		metadata = (dictionary or dbmeta).db_objects_metadata(
 			table_name = self.name,
 			object_type = self.object_type,
 			description = self.documentation,
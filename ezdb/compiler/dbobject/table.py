@@ -1,11 +1,24 @@
 __author__ = 'yufa'
 
+import copy
 import logging
+from collections import OrderedDict
 import dbmeta
 from column import Column, col_snapshot
 from index import Index
 from ezdb.common.constants import const
 from ezdb.common.exception import EzDBError
+from ezdb.common.utils import intern_str
+
+
+# The DAT files smaller than this are loaded with the default sql*loader options
+TUNED_LOAD_SIZE = 1024 * 1024
+
+# The maximum size of the sql*loader read buffer and bind array (conventional path)
+_MAX_BUFFER_SIZE = 20 * 1024 * 1024
+
+# Bounds of the number of rows of a column array (direct path)
+_COLUMN_ARRAY_ROWS = (100, 100000)
 
 
 def _is_true(value):
@@ -15,6 +28,37 @@ def _is_true(value):
 		return False
 
 
+def load_options(row_width, dat_size=0, direct=True, parallel=False):
+	"""
+	Return the OPTIONS of a sql*loader control file loading a DAT file of the given size, whose rows are at most
+	row_width bytes long. Above TUNED_LOAD_SIZE, the read buffer (and the bind array of the conventional path) grows
+	with the DAT file up to 20MB, with as many rows as it can hold. PARALLEL=TRUE lets several direct path loads
+	(e.g. the chunks of a DAT file) load the same table at the same time.
+
+	>>> load_options(200)
+	'SILENT=(HEADER, FEEDBACK), DIRECT=TRUE'
+	>>> load_options(2000, 64 * 1024 * 1024, False)
+	'SILENT=(HEADER, FEEDBACK), DIRECT=FALSE, ROWS=10485, BINDSIZE=20971520, READSIZE=20971520'
+	>>> load_options(500, 4 * 1024 * 1024, True, True)
+	'SILENT=(HEADER, FEEDBACK), DIRECT=TRUE, PARALLEL=TRUE, READSIZE=4194304, COLUMNARRAYROWS=8388'
+	"""
+
+	options = ['SILENT=(HEADER, FEEDBACK)', 'DIRECT=%s' % ('TRUE' if direct else 'FALSE')]
+	if direct and parallel:
+		options.append('PARALLEL=TRUE')
+	if dat_size < TUNED_LOAD_SIZE:
+		return ', '.join(options)
+
+	buffer_size = max(min(dat_size, _MAX_BUFFER_SIZE), row_width)
+	rows = max(1, buffer_size // row_width)
+	if direct:
+		rows = min(max(rows, _COLUMN_ARRAY_ROWS[0]), _COLUMN_ARRAY_ROWS[1])
+		options.extend(['READSIZE=%d' % buffer_size, 'COLUMNARRAYROWS=%d' % rows])
+	else:
+		options.extend(['ROWS=%d' % rows, 'BINDSIZE=%d' % buffer_size, 'READSIZE=%d' % buffer_size])
+	return ', '.join(options)
+
+
 class Table(object):
 	"""
 	Table class, model the table object created from SaveDB xml files.
@@ -41,6 +85,10 @@ class Table(object):
 
 	"""
 
+	__slots__ = ('__name', '__documentation', '__story', '__products_formula', '__release', '__type', '__logging',
+	             '__init_on_install', '__init_on_upgrade', '__init_on_demand', '__standard_or_custom', '__init_trans',
+	             '__index_degree', '__columns', '__indexes', '__enable_snapshot', '__sorted_columns')
+
 	def __init__(self, enable_snapshot=False):
 		self.__name = None
 		self.__documentation = ''
@@ -54,9 +102,11 @@ class Table(object):
 		self.__init_on_demand = 'N'
 		self.__standard_or_custom = 'S'
 		self.__init_trans = 1
+		self.__index_degree = None
 		self.__columns = {}
-		self.__indexes = {}
+		self.__indexes = OrderedDict() # in the order of the xml file, kept by the generated DDL and metadata
 		self.__enable_snapshot = enable_snapshot
+		self.__sorted_columns = None
 
 
 	@property
@@ -71,6 +121,7 @@ class Table(object):
 		if len(value) > 30:
 			raise EzDBError('Table name length can not exceed 30!')
 		self.__name = value.upper()
+		self.__sorted_columns = None
 
 	@property
 	def documentation(self):
@@ -86,7 +137,7 @@ class Table(object):
 
 	@story.setter
 	def story(self, value):
-		self.__story = value.upper() if value else const.DEFAULT_STORY_NUMBER
+		self.__story = intern_str(value.upper()) if value else const.DEFAULT_STORY_NUMBER
 
 	@property
 	def products_formula(self):
@@ -94,7 +145,7 @@ class Table(object):
 
 	@products_formula.setter
 	def products_formula(self, value):
-		self.__products_formula = value or const.DEFAULT_PRODUCT_CODE
+		self.__products_formula = intern_str(value) or const.DEFAULT_PRODUCT_CODE
 
 	@property
 	def release(self):
@@ -102,7 +153,7 @@ class Table(object):
 
 	@release.setter
 	def release(self, value):
-		self.__release = value or const.DEFAULT_RELEASE_NUMBER
+		self.__release = intern_str(value) or const.DEFAULT_RELEASE_NUMBER
 
 	@property
 	def type(self):
@@ -110,7 +161,7 @@ class Table(object):
 
 	@type.setter
 	def type(self, value):
-		self.__type = value.upper() if value else const.DEFAULT_TABLE_TYPE
+		self.__type = intern_str(value.upper()) if value else const.DEFAULT_TABLE_TYPE
 
 	@property
 	def standard_or_custom(self):
@@ -139,6 +190,23 @@ class Table(object):
 	def init_trans(self, value):
 		self.__init_trans = value or ''
 
+	@property
+	def index_degree(self):
+		"""
+		The parallel degree of the index builds of the table, overriding the default one (see index.set_build_mode).
+		"""
+
+		return self.__index_degree
+
+	@index_degree.setter
+	def index_degree(self, value):
+		try:
+			self.__index_degree = int(value) if value else None
+		except ValueError:
+			raise EzDBError('The index degree of table %s should be a number: %s.' % (self.__name, value))
+		if self.__index_degree is not None and self.__index_degree < 1:
+			raise EzDBError('The index degree of table %s should be at least 1: %s.' % (self.__name, value))
+
 	@property
 	def init_on_install(self):
 		return self.__init_on_install
@@ -170,6 +238,7 @@ class Table(object):
 	def add_column(self, column):
 		if isinstance(column, Column):
 			self.__columns[column.name] = column
+			self.__sorted_columns = None
 
 	@property
 	def indexes(self):
@@ -191,21 +260,84 @@ class Table(object):
 
 		self.__indexes[index.name] = index
 
+	@property
+	def enable_snapshot(self):
+		return self.__enable_snapshot
+
+	def variant(self, enable_snapshot):
+		"""
+		Return the table with the given snapshot option: the table itself if it already has it, otherwise a copy
+		sharing the columns of the table, with copies of its indexes, so the snapshot and the regular DDL can both be
+		rendered from a single parsed table.
+		"""
+
+		if bool(enable_snapshot) == bool(self.__enable_snapshot):
+			return self
+
+		table = copy.copy(self)
+		table.__enable_snapshot = enable_snapshot
+		table.__sorted_columns = None
+		table.__indexes = OrderedDict()
+		for name, index in self.__indexes.iteritems():
+			index = copy.copy(index)
+			index.enable_snapshot = enable_snapshot
+			table.__indexes[name] = index
+		return table
+
+	def as_record(self):
+		"""
+		Return the table, with its columns (in their order) and its indexes, as a tuple of plain values, see
+		ezdb.compiler.schema and from_record.
+		"""
+
+		columns = sorted(self.__columns.itervalues(), key=lambda column: column.order)
+		return (self.__name, self.__documentation, self.__story, self.__products_formula, self.__release, self.__type,
+		        self.__logging, self.__init_on_install, self.__init_on_upgrade, self.__init_on_demand,
+		        self.__standard_or_custom, self.__init_trans, self.__index_degree, self.__enable_snapshot,
+		        [column.as_record() for column in columns],
+		        [index.as_record() for index in self.__indexes.itervalues()])
+
+	@classmethod
+	def from_record(cls, record):
+		"""
+		Return the table of the given record (see as_record), without the checks and the conversions of the setters.
+		"""
+
+		table = cls.__new__(cls)
+		(table.__name, table.__documentation, table.__story, table.__products_formula, table.__release, table.__type,
+		 table.__logging, table.__init_on_install, table.__init_on_upgrade, table.__init_on_demand,
+		 table.__standard_or_custom, table.__init_trans, table.__index_degree, table.__enable_snapshot,
+		 columns, indexes) = record
+		table.__columns = {}
+		for column in columns:
+			column = Column.from_record(column)
+			table.__columns[column.name] = column
+		table.__indexes = OrderedDict()
+		for index in indexes:
+			index = Index.from_record(index)
+			table.__indexes[index.name] = index
+		table.__sorted_columns = None
+		return table
+
 	def sorted_columns(self):
 		"""
 		Return the columns in the sequence of their creation. i.e. when the column is added to the table.
 		SNAPSHOT column will be the first column if snapshot function is enabled.
+		The sequence is computed once and kept (as a tuple) until a column is added.
 		"""
 
-		columns = []
-		if self.name not in const.DICTIONARY_OBJECTS and self.__enable_snapshot:
-			columns.append(col_snapshot())
+		if self.__sorted_columns is None:
+			columns = []
+			if self.name not in const.DICTIONARY_OBJECTS and self.__enable_snapshot:
+				columns.append(col_snapshot())
+
+			temp = [column for column in self.__columns.values() if not column.name == const.COLUMN_SNAPSHOT_ID]
+			temp.sort(key=lambda item:item.order)
+			columns.extend(temp)
 
-		temp = [column for column in self.__columns.values() if not column.name == const.COLUMN_SNAPSHOT_ID]
-		temp.sort(key=lambda item:item.order)
-		columns.extend(temp)
+			self.__sorted_columns = tuple(columns)
 
-		return columns
+		return self.__sorted_columns
 
 	def table_ddl(self):
 		"""
@@ -223,12 +355,14 @@ class Table(object):
 		logging.debug('Table [%s]: - SQL:\n%s' % (self.name, ddl_stmt))
 		return ddl_stmt
 
-	def index_ddl(self):
+	def index_ddl(self, mode=None, degree=None):
 		"""
-		Return all the index creation statements for the table.
+		Return all the index creation statements for the table, built with the given index build mode and parallel
+		degree (by default the ones set by index.set_build_mode), the parallel degree of the table overrides the
+		given one.
 		"""
 
-		ddl = [index.index_ddl() for index in self.indexes.values()]
+		ddl = [index.index_ddl(mode, self.index_degree or degree) for index in self.indexes.values()]
 		ddl_stmt = '\n'.join(ddl)
 
 		logging.debug('Table [%s] - Indexes:\n%s' % (self.name, ddl_stmt))
@@ -240,11 +374,12 @@ class Table(object):
 					isinstance(self.__class__.__dict__[key], property):
 				self.__setattr__(key, value)
 
-	def table_metadata(self):
+	def table_metadata(self, dictionary=None):
 		"""
-		Return the table metadata to be stored in the table DB_OBJECTS
+		Return the table metadata to be stored in the table DB_OBJECTS, rendered with the given dictionary
+		(dbmeta.Dictionary) or the default dictionary tables.
 		"""
-		metadata = dbmeta.db_objects_metadata(
+		metadata = (dictionary or dbmeta).db_objects_metadata(
 			table_name = self.name,
 			table_type = self.type,
 			object_type = 'TABLE',
@@ -263,22 +398,22 @@ class Table(object):
 		logging.debug('Table [%s] metadata in table DB_OBJECTS:\n%s' % (self.name, metadata))
 		return metadata
 
-	def table_column_metadata(self):
+	def table_column_metadata(self, dictionary=None):
 		"""
 		Return the table's columns metadata data to be stored in the table DB_TABLE_COLUMNS.
 		"""
 
-		metadata = dbmeta.db_table_columns_metadata(self.name, self.sorted_columns())
+		metadata = (dictionary or dbmeta).db_table_columns_metadata(self.name, self.sorted_columns())
 		logging.debug('Table [%s] metadata in table DB_TABLE_COLUMNS:\n%s' % (self.name, metadata))
 		return metadata
 
-	def table_index_metadata(self):
+	def table_index_metadata(self, dictionary=None):
 		"""
 		Return the table's index metadata to be stored in the table DB_OBJECTS.
 		"""
 
 		metadata = ''.join(
-			[dbmeta.db_objects_metadata(
+			[(dictionary or dbmeta).db_objects_metadata(
 				table_name=index.name,
 				table_type=index.type,
 			    hist_table_name=self.name,
@@ -293,20 +428,34 @@ class Table(object):
 		logging.debug("Table [%s]'s index metadata in table DB_TABLE_COLUMNS:\n%s" % (self.name, metadata))
 		return metadata
 
-	def table_ctl_file(self):
+	def direct_path(self):
 		"""
-		Return the table control file to be used in sql*loader
+		Return True if the table can be loaded by sql*loader in direct path, i.e. it has no LOB/LONG column.
 		"""
 
-		if not (self.init_on_install == 'Y' or self.init_on_upgrade == 'Y'): return
-
-		use_direct = 'TRUE'
 		for column in self.__columns.values():
-			if column.data_type in ('CLOB', 'BLOB', 'LONG'):
-				use_direct = 'FALSE'
-				break
+			if not column.parsed_data_type.direct_path:
+				return False
+		return True
+
+	def row_width(self):
+		"""
+		Return the maximum length of a row in the DAT file: the width of each column, enclosed by quotes and separated
+		by commas, and the end of record.
+		"""
+
+		return sum((column.parsed_data_type.width or 0) + 3 for column in self.sorted_columns()) + len('#$EOR$#\r\n')
+
+	def table_ctl_file(self, dat_size=0, parallel=False):
+		"""
+		Return the table control file to be used in sql*loader, with the options tuned for a DAT file of the given size
+		(see load_options). If parallel is True, the DAT file is loaded in chunks by parallel direct path loads.
+		"""
+
+		if not (self.init_on_install == 'Y' or self.init_on_upgrade == 'Y'): return
 
-		ctl_header = ('OPTIONS (SILENT=(HEADER, FEEDBACK), DIRECT={is_direct})\n'
+		options = load_options(self.row_width(), dat_size, self.direct_path(), parallel)
+		ctl_header = ('OPTIONS ({options})\n'
 		              'LOAD DATA\n'
 		              'CHARACTERSET UTF8\n'
 		              'LENGTH SEMANTICS CHAR\n'
@@ -316,7 +465,7 @@ class Table(object):
 		              'INTO TABLE {table_name}\n'
 		              'FIELDS TERMINATED BY \',\' OPTIONALLY ENCLOSED BY \'"\' AND \'"\'\n'
 		              'TRAILING NULLCOLS\n'
-		              '(\n').format(is_direct=use_direct, table_name=self.name)
+		              '(\n').format(options=options, table_name=self.name)
 
 		column_ctrls = [column.column_ctl_str() for column in self.sorted_columns()]
 		column_ctrls[0] = column_ctrls[0].strip(',')
@@ -0,0 +1,159 @@
+__author__ = 'yufa'
+
+import os
+import hashlib
+import logging
+import cPickle as pickle
+
+
+_MANIFEST_VERSION = 6
+
+
+def file_digest(*paths):
+	"""
+	Return the sha1 hex digest of the content of the given file(s).
+	"""
+
+	sha1 = hashlib.sha1()
+	for path in paths:
+		with open(path, 'rb') as f:
+			for chunk in iter(lambda: f.read(65536), ''):
+				sha1.update(chunk)
+	return sha1.hexdigest()
+
+
+class BuildManifest(object):
+	"""
+	Build manifest kept next to the generated DB folder, used by the incremental compilation.
+
+	For each source file, it records the digest of its content, the artifacts generated from it (relative to the DB
+	folder) and the metadata fragments it contributed to the aggregated DAT files (DB_OBJECTS/DB_TABLE_COLUMNS), so
+	that an unchanged source file doesn't need to be parsed or rendered again.
+	settings are the other options the artifacts depend on (e.g. the index build mode), compared like enable_snapshot.
+
+	A source deleted since the previous build has its artifacts removed, even if nothing is reused from that build:
+
+	>>> import tempfile, shutil
+	>>> db_dir = tempfile.mkdtemp()
+	>>> for name in ('LO_A.SQL', 'LO_B.SQL'): open(os.path.join(db_dir, name), 'w').close()
+	>>> manifest = BuildManifest(os.path.join(db_dir, 'DB.MANIFEST'))
+	>>> manifest.check_dictionary('d1')
+	>>> manifest.record('TABLE/LO_A.XML', 'a1', ['LO_A.SQL'], {})
+	>>> manifest.record('TABLE/LO_B.XML', 'b1', ['LO_B.SQL'], {})
+	>>> manifest.save()
+	>>> manifest = BuildManifest(os.path.join(db_dir, 'DB.MANIFEST'))
+	>>> manifest.load()
+	>>> manifest.check_dictionary('d2') # the dictionary tables have changed and LO_B.XML is deleted
+	>>> manifest.lookup('TABLE/LO_A.XML', 'a1', db_dir) is None
+	True
+	>>> manifest.record('TABLE/LO_A.XML', 'a1', ['LO_A.SQL'], {})
+	>>> manifest.remove_stale_artifacts(db_dir)
+	>>> sorted(name for name in os.listdir(db_dir) if name.endswith('.SQL'))
+	['LO_A.SQL']
+	>>> shutil.rmtree(db_dir)
+	"""
+
+	def __init__(self, path, enable_snapshot=False, settings=None):
+		self.path = path
+		self.enable_snapshot = enable_snapshot
+		self.settings = settings
+		self.dictionary_digest = None
+		self.__previous = {}
+		# False if the fragments of the previous build can't be reused, its artifacts are still known to be removed
+		self.__reusable = True
+		self.__entries = {}
+
+	def load(self):
+		"""
+		Load the manifest of the previous build. Nothing will be reused if it is missing, built by another version or
+		built with a different snapshot option or settings.
+		"""
+
+		if not os.path.exists(self.path):
+			logging.info('No build manifest found, all the objects will be generated.')
+			return
+
+		try:
+			with open(self.path, 'rb') as f:
+				data = pickle.load(f)
+		except Exception, e:
+			logging.warning('Failed to load the build manifest %s, ignore it: %s' % (self.path, e))
+			return
+
+		if data.get('version') != _MANIFEST_VERSION or data.get('enable_snapshot') != self.enable_snapshot \
+				or data.get('settings') != self.settings:
+			logging.info('Build manifest is out of date, all the objects will be generated.')
+			return
+
+		self.dictionary_digest = data['dictionary_digest']
+		self.__previous = data['entries']
+		logging.info('Loaded build manifest with %d entries.' % len(self.__previous))
+
+	def save(self):
+		temp_file = self.path + '.tmp'
+		with open(temp_file, 'wb') as f:
+			pickle.dump({'version': _MANIFEST_VERSION,
+			             'enable_snapshot': self.enable_snapshot,
+			             'settings': self.settings,
+			             'dictionary_digest': self.dictionary_digest,
+			             'entries': self.__entries}, f, pickle.HIGHEST_PROTOCOL)
+		if os.path.exists(self.path):
+			os.remove(self.path)
+		os.rename(temp_file, self.path)
+
+	@property
+	def empty(self):
+		return not self.__previous
+
+	def clear(self):
+		self.__previous = {}
+
+	def check_dictionary(self, digest):
+		"""
+		The metadata fragments depend on the definition of DB_OBJECTS and DB_TABLE_COLUMNS, so all of them are
+		discarded if one of the dictionary tables has changed. The previous entries are kept for their artifacts, see
+		remove_stale_artifacts.
+		"""
+
+		if self.dictionary_digest != digest:
+			if self.__previous:
+				logging.info('Dictionary tables have changed, all the objects will be generated.')
+			self.__reusable = False
+		self.dictionary_digest = digest
+
+	def lookup(self, key, digest, db_dir):
+		"""
+		Return the fragments recorded for the given source if its content is unchanged and all the artifacts
+		generated from it still exist, otherwise None.
+		"""
+
+		entry = self.__previous.get(key) if self.__reusable else None
+		if not entry or entry['digest'] != digest:
+			return None
+
+		for artifact in entry['artifacts']:
+			if not os.path.exists(os.path.join(db_dir, artifact)):
+				return None
+
+		self.__entries[key] = entry
+		return entry['fragments']
+
+	def record(self, key, digest, artifacts, fragments):
+		self.__entries[key] = {'digest': digest, 'artifacts': artifacts, 'fragments': fragments}
+
+	def remove_stale_artifacts(self, db_dir):
+		"""
+		Remove the artifacts generated by the previous build which are not generated by the current build any more,
+		e.g. the source file is deleted or the table has no index now.
+		"""
+
+		current = set()
+		for entry in self.__entries.itervalues():
+			current.update(entry['artifacts'])
+
+		for entry in self.__previous.itervalues():
+			for artifact in entry['artifacts']:
+				path = os.path.join(db_dir, artifact)
+				if artifact not in current and os.path.exists(path):
+					logging.debug('Removing stale artifact %s' % path)
+					os.remove(path)
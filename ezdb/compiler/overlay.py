@@ -0,0 +1,58 @@
+__author__ = 'yufa'
+
+import os
+import logging
+from collections import OrderedDict
+
+
+class SourceOverlay(object):
+	"""
+	Read-only layered view of several db source directories (e.g. common_db_dir and source_db_dir).
+
+	Within each object folder (TABLE, PACKAGE, ...), a file in a later directory overrides the file with the same name
+	in an earlier one, which is the same result as copying the directories one after another into a staging folder,
+	but without any file I/O.
+	"""
+
+	def __init__(self, *db_dirs):
+		self.__db_dirs = db_dirs
+		self.__folders = {}
+
+	@property
+	def db_dirs(self):
+		return self.__db_dirs
+
+	def __files(self, folder):
+		files = self.__folders.get(folder)
+		if files is None:
+			files = OrderedDict()
+			for db_dir in self.__db_dirs:
+				source_dir = os.path.join(db_dir, folder)
+				if not os.path.isdir(source_dir): continue
+
+				for file_name in os.listdir(source_dir):
+					key = os.path.normcase(file_name)
+					if key in files:
+						logging.debug('%s overrides %s' % (os.path.join(source_dir, file_name), files[key]))
+					files[key] = os.path.join(source_dir, file_name)
+
+			self.__folders[folder] = files
+		return files
+
+	def listdir(self, folder):
+		"""
+		Return the names of the files in the given object folder, in their order (not the order of the file system),
+		so the generated package doesn't depend on it.
+		"""
+
+		return sorted(os.path.basename(path) for path in self.__files(folder).itervalues())
+
+	def path(self, folder, file_name):
+		"""
+		Return the path of the file which the given file name resolves to, or None if no directory has it.
+		"""
+
+		return self.__files(folder).get(os.path.normcase(file_name))
+
+	def exists(self, folder, file_name):
+		return self.path(folder, file_name) is not None
@@ -0,0 +1,87 @@
+__author__ = 'yufa'
+
+import os
+import logging
+import xmlparser
+
+
+class ModelRegistry(object):
+	"""
+	Compile-scoped registry of the parsed objects.
+
+	Every phase of a compilation gets the Table/PLSQL objects from the registry, which parses each xml file at most once
+	(misses) and returns the same object to the later requests (hits).
+	A registry can be kept across the compilations (see watch_db), the objects of the changed xml files are then
+	invalidated before each compilation.
+	The xml files are parsed with the given parser backend and model cache, see xmlparser.parse_table.
+	"""
+
+	def __init__(self, enable_snapshot=False, backend=None, cache=None):
+		self.enable_snapshot = enable_snapshot
+		self.backend = backend
+		self.cache = cache
+		self.hits = 0
+		self.misses = 0
+		self.__tables = {}
+		self.__plsql_objects = {}
+
+	@staticmethod
+	def __key(xmlfile):
+		return os.path.normcase(os.path.abspath(xmlfile))
+
+	def __get(self, objects, xmlfile, parse):
+		key = self.__key(xmlfile)
+		if key in objects:
+			self.hits += 1
+			return objects[key]
+
+		self.misses += 1
+		obj = objects[key] = parse()
+		return obj
+
+	def table(self, xmlfile):
+		"""
+		Return the Table object of the given table xml file.
+		"""
+
+		parse = lambda: xmlparser.parse_table(xmlfile, self.enable_snapshot, self.backend, self.cache)
+		return self.__get(self.__tables, xmlfile, parse)
+
+	def plsql(self, xmlfile):
+		"""
+		Return the PLSQL object of the given xml file.
+		"""
+
+		return self.__get(self.__plsql_objects, xmlfile, lambda: xmlparser.parse_plsql(xmlfile, self.backend, self.cache))
+
+	def has_table(self, xmlfile):
+		return self.__key(xmlfile) in self.__tables
+
+	def add_table(self, xmlfile, table):
+		"""
+		Register a Table object parsed somewhere else, e.g. in a worker process.
+		"""
+
+		key = self.__key(xmlfile)
+		if key in self.__tables:
+			logging.warning('Table file %s has been parsed more than once.' % xmlfile)
+		self.misses += 1
+		self.__tables[key] = table
+
+	def invalidate(self, xmlfile):
+		"""
+		Forget the object parsed from the given xml file, it is parsed again by the next request.
+		"""
+
+		key = self.__key(xmlfile)
+		self.__tables.pop(key, None)
+		self.__plsql_objects.pop(key, None)
+
+	def tables(self):
+		return self.__tables.values()
+
+	def plsql_objects(self):
+		return self.__plsql_objects.values()
+
+	def __str__(self):
+		return 'Model registry: %d xml files parsed, %d reused.' % (self.misses, self.hits)
@@ -0,0 +1,149 @@
+__author__ = 'yufa'
+
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+
+try:
+	import tracemalloc
+except ImportError:
+	tracemalloc = None
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+
+REPORT_FILE = 'DB.REPORT.json'
+
+_REPORT_VERSION = 1
+
+# Number of phases whose profile is dumped if profiling is enabled
+_PROFILED_PHASES = 3
+
+
+def _cpu_times():
+	"""
+	Return the cpu time used by the process and by its terminated child processes (e.g. the compilation workers).
+	"""
+
+	times = os.times()
+	return times[0] + times[1], times[2] + times[3]
+
+
+def _peak_memory():
+	"""
+	Return the peak memory: traced by tracemalloc (since the beginning of the phase) if it is available, otherwise
+	the peak resident set size of the process (since it started).
+	"""
+
+	if tracemalloc and tracemalloc.is_tracing():
+		return {'peak_traced_kb': tracemalloc.get_traced_memory()[1] // 1024}
+	if resource:
+		return {'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+	return {}
+
+
+class BuildReport(object):
+	"""
+	Timing and memory report of a compilation.
+
+	For each phase (tables, plsql, package ...), it records the wall time, the cpu time, the peak memory and the number
+	of items processed. It also records the time spent on each source file. With profiling enabled, each phase runs
+	under cProfile and the statistics of the slowest phases are dumped as pstats files next to the report.
+	"""
+
+	def __init__(self, profile=False, **options):
+		self.profile = profile
+		self.options = options
+		self.phases = []
+		self.files = []
+		self.__current = None
+		self.__profilers = {}
+		self.__start = time.time()
+		self.__tracing = bool(tracemalloc) and not tracemalloc.is_tracing()
+		self.__tracing and tracemalloc.start()
+
+	@contextmanager
+	def phase(self, name):
+		"""
+		Record the phase run inside the with block.
+		"""
+
+		phase = self.__current = {'name': name, 'counts': {}}
+		if tracemalloc and tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak'):
+			tracemalloc.reset_peak()
+
+		profiler = None
+		if self.profile:
+			import cProfile
+			profiler = cProfile.Profile()
+
+		wall = time.time()
+		cpu, children_cpu = _cpu_times()
+		profiler and profiler.enable()
+		try:
+			yield phase
+		finally:
+			profiler and profiler.disable()
+			end_cpu, end_children_cpu = _cpu_times()
+			phase['wall_seconds'] = round(time.time() - wall, 6)
+			phase['cpu_seconds'] = round(end_cpu - cpu, 6)
+			phase['children_cpu_seconds'] = round(end_children_cpu - children_cpu, 6)
+			phase.update(_peak_memory())
+			self.phases.append(phase)
+			self.__current = None
+			if profiler:
+				self.__profilers[name] = profiler
+
+			logging.info('Phase %s: %.3fs (cpu %.3fs) %s' % (name, phase['wall_seconds'], phase['cpu_seconds'],
+			                                                 ', '.join('%s=%s' % item for item in sorted(phase['counts'].items()))))
+
+	def count(self, item, number=1):
+		"""
+		Add the number of processed items (e.g. tables) to the current phase.
+		"""
+
+		if self.__current is not None:
+			counts = self.__current['counts']
+			counts[item] = counts.get(item, 0) + number
+
+	def record_file(self, source_file, seconds):
+		"""
+		Record the time spent on a source file in the current phase.
+		"""
+
+		if self.__current is not None:
+			self.files.append({'phase': self.__current['name'], 'file': source_file, 'seconds': round(seconds, 6)})
+
+	def save(self, target_dir):
+		"""
+		Write the report (and the profiles of the slowest phases) into the given directory.
+		"""
+
+		if self.__tracing:
+			tracemalloc.stop()
+			self.__tracing = False
+
+		profiled = sorted(self.phases, key=lambda phase: phase['wall_seconds'], reverse=True)[:_PROFILED_PHASES]
+		for phase in profiled:
+			profiler = self.__profilers.get(phase['name'])
+			if profiler:
+				phase['pstats'] = 'DB.%s.pstats' % phase['name'].upper()
+				profiler.dump_stats(os.path.join(target_dir, phase['pstats']))
+
+		report = {'version': _REPORT_VERSION,
+		          'options': self.options,
+		          'wall_seconds': round(time.time() - self.__start, 6),
+		          'phases': self.phases,
+		          'files': sorted(self.files, key=lambda item: item['seconds'], reverse=True)}
+
+		report_file = os.path.join(target_dir, REPORT_FILE)
+		with open(report_file, 'w') as f:
+			json.dump(report, f, indent=2, sort_keys=True)
+
+		logging.info('Build report: %s (%.3fs in total).' % (report_file, report['wall_seconds']))
+		return report_file
@@ -0,0 +1,117 @@
+__author__ = 'yufa'
+
+import os
+import zlib
+import marshal
+import tarfile
+from collections import OrderedDict
+
+from ezdb.common.constants import const
+from ezdb.common.exception import EzDBError
+from dbobject.column import Column
+from dbobject.table import Table
+from dbobject.plsql import PLSQL
+
+
+# The schema file, at the root of the DB folder next to RELEASE.TXT
+SCHEMA_FILE = 'SCHEMA.BIN'
+
+# The layout of the records (see Table.as_record, PLSQL.as_record...), to be increased whenever it changes
+SCHEMA_FORMAT = 1
+
+_MAGIC = 'EZDB-SCHEMA'
+
+
+def dump_records(release, table_records, object_records, level=6):
+	"""
+	Return the content of the schema file holding the given table and PLSQL object records: a header line (magic and
+	format), then the records marshalled and compressed. Marshal version 0 doesn't share the interned strings, so the
+	content only depends on the records, and an unchanged schema gives the same file.
+	"""
+
+	data = marshal.dumps((release, list(table_records), list(object_records)), 0)
+	return '%s %d\n%s' % (_MAGIC, SCHEMA_FORMAT, zlib.compress(data, level))
+
+
+class Schema(object):
+	"""
+	The compiled model of a release: the tables (with their columns and indexes, the dictionary tables included) and
+	the PLSQL objects, as the Table/Column/Index/PLSQL objects generated by the build. It is written into the DB package
+	(see SCHEMA_FILE), and loaded back much faster than the xml files are parsed.
+
+	>>> column = Column('ID', 'NUMBER(10)', nullable='N')
+	>>> table = Table()
+	>>> table.name = 'LO_DEMO'
+	>>> table.add_column(column)
+	>>> table.add_column(Column('NAME', 'VARCHAR2(20)', default_value="'N/A'"))
+	>>> schema = Schema.loads(Schema([table], [PLSQL('PACKAGE', 'PAC_DEMO')], '4.0.0.1').dumps())
+	>>> print schema
+	release 4.0.0.1: 1 tables, 1 objects
+	>>> schema.tables['LO_DEMO'].table_ddl() == table.table_ddl()
+	True
+	>>> schema.objects['PACKAGE', 'PAC_DEMO'].install_order
+	1
+	>>> Schema.loads('<table/>')
+	Traceback (most recent call last):
+	...
+	EzDBError: Not an EzDB schema file.
+	"""
+
+	def __init__(self, tables=(), objects=(), release=None):
+		self.release = release
+		self.tables = OrderedDict((table.name, table) for table in tables)
+		self.objects = OrderedDict(((plsql.object_type, plsql.name), plsql) for plsql in objects)
+
+	@property
+	def dictionary_tables(self):
+		return OrderedDict((name, table) for name, table in self.tables.iteritems() if name in const.DICTIONARY_OBJECTS)
+
+	def dumps(self, level=6):
+		return dump_records(self.release, [table.as_record() for table in self.tables.itervalues()],
+		                    [plsql.as_record() for plsql in self.objects.itervalues()], level)
+
+	@classmethod
+	def loads(cls, data):
+		header, _, body = data.partition('\n')
+		magic, _, version = header.partition(' ')
+		if magic != _MAGIC:
+			raise EzDBError('Not an EzDB schema file.')
+		if version != str(SCHEMA_FORMAT):
+			raise EzDBError('Unsupported schema format %s, this version of EzDB reads the format %d.' %
+			                (version, SCHEMA_FORMAT))
+
+		release, table_records, object_records = marshal.loads(zlib.decompress(body))
+		return cls([Table.from_record(record) for record in table_records],
+		           [PLSQL.from_record(record) for record in object_records], release)
+
+	def __str__(self):
+		return 'release %s: %d tables, %d objects' % (self.release, len(self.tables), len(self.objects))
+
+
+def read_schema(path):
+	"""
+	Return the Schema stored in the given DB package (DB.tgz), DB folder or schema file.
+	"""
+
+	if os.path.isdir(path):
+		path = os.path.join(path, SCHEMA_FILE)
+
+	try:
+		with open(path, 'rb') as f:
+			if f.read(len(_MAGIC)) == _MAGIC:
+				f.seek(0)
+				return Schema.loads(f.read())
+
+		with tarfile.open(path, 'r|*') as tar:
+			for info in tar:
+				if info.isfile() and info.name.split('/', 1)[-1] == SCHEMA_FILE:
+					return Schema.loads(tar.extractfile(info).read())
+	except (IOError, tarfile.TarError), e:
+		raise EzDBError('Failed to read the schema from %s: %s' % (path, e))
+
+	raise EzDBError('%s has no schema file %s, it was built by an older version of EzDB.' % (path, SCHEMA_FILE))
+
+
+if __name__ == '__main__':
+	import doctest
+	doctest.testmod()
@@ -0,0 +1,60 @@
+__author__ = 'yufa'
+
+import os
+
+
+class SourceWatcher(object):
+	"""
+	Poll the db source directories for changed files: a file is added, deleted, or modified if its size or its
+	modification time has changed since the previous poll. Only the file system metadata is read, not the files.
+
+	>>> import tempfile, shutil
+	>>> db_dir = tempfile.mkdtemp()
+	>>> watcher = SourceWatcher(db_dir)
+	>>> with open(os.path.join(db_dir, 'LO_DEMO.XML'), 'w') as f: f.write('<table/>')
+	>>> [(change, os.path.basename(path)) for change, path in watcher.poll()]
+	[('added', 'LO_DEMO.XML')]
+	>>> watcher.poll()
+	[]
+	>>> os.remove(os.path.join(db_dir, 'LO_DEMO.XML'))
+	>>> [(change, os.path.basename(path)) for change, path in watcher.poll()]
+	[('deleted', 'LO_DEMO.XML')]
+	>>> shutil.rmtree(db_dir)
+	"""
+
+	def __init__(self, *db_dirs):
+		self.db_dirs = db_dirs
+		self.__files = self.__scan()
+
+	def __scan(self):
+		files = {}
+		for db_dir in self.db_dirs:
+			for folder, folders, file_names in os.walk(db_dir):
+				for file_name in file_names:
+					path = os.path.join(folder, file_name)
+					try:
+						stat = os.stat(path)
+					except OSError:
+						continue # deleted meanwhile, it is reported by the next poll
+					files[path] = (stat.st_size, stat.st_mtime)
+		return files
+
+	def poll(self):
+		"""
+		Return the changes since the previous poll, as (added|modified|deleted, path) in the order of the paths.
+		"""
+
+		previous, self.__files = self.__files, self.__scan()
+
+		changes = [('deleted', path) for path in previous if path not in self.__files]
+		for path, signature in self.__files.iteritems():
+			if path not in previous:
+				changes.append(('added', path))
+			elif previous[path] != signature:
+				changes.append(('modified', path))
+		return sorted(changes, key=lambda change: change[1])
+
+
+if __name__ == '__main__':
+	import doctest
+	doctest.testmod()
@@ -1,7 +1,12 @@
 __author__ = 'yufa'
 
 import xml.etree.ElementTree as etree
+try:
+	import xml.etree.cElementTree as cetree
+except ImportError:
+	cetree = etree
 import logging
+from cStringIO import StringIO
 from ezdb.common.exception import EzDBError
 from dbobject.column import Column
 from dbobject.table import Table
@@ -9,14 +14,104 @@ from dbobject.index import Index
 from dbobject.plsql import PLSQL
 
 
-def parse_table(xmlfile, enable_snapshot=False):
+# Parser backends:
+#   etree     - build the whole element tree (pure python ElementTree), then search it for the columns/indexes.
+#   iterparse - streaming, build the objects in a single pass over the parsing events (C accelerator if available),
+#               every column/index element is cleared as soon as the object is built from it.
+PARSER_BACKENDS = ('etree', 'iterparse')
+
+_parser_backend = 'iterparse'
+
+
+def check_parser_backend(backend):
+	if backend not in PARSER_BACKENDS:
+		raise EzDBError('Unknown xml parser backend: %s, it should be one of %s.' % (backend, ', '.join(PARSER_BACKENDS)))
+
+
+def set_parser_backend(backend):
+	global _parser_backend
+	check_parser_backend(backend)
+	_parser_backend = backend
+
+
+def get_parser_backend():
+	return _parser_backend
+
+
+# Cache of the parsed objects, see ezdb.compiler.cache.ModelCache
+_model_cache = None
+
+
+def set_model_cache(cache):
+	global _model_cache
+	_model_cache = cache
+
+
+def get_model_cache():
+	return _model_cache
+
+
+def _settings(backend, cache):
+	# the settings given by the caller (e.g. an ezdb.Compiler), otherwise the module ones; cache=False disables the cache
+	return backend or _parser_backend, (_model_cache if cache is None else cache)
+
+
+def parse_table(xmlfile, enable_snapshot=False, backend=None, cache=None):
 	"""
-	Parse the given SaveDB table xml file and generate a Table object
+	Parse the given SaveDB table xml file and generate a Table object, with the given parser backend and model cache
+	(by default the ones set by set_parser_backend and set_model_cache)
 	"""
 
+	backend, cache = _settings(backend, cache)
+	parse = _parse_table_iterparse if backend == 'iterparse' else _parse_table_etree
+	if not cache:
+		return parse(xmlfile, enable_snapshot)
+
+	with open(xmlfile, 'rb') as f:
+		content = f.read()
+
+	key = cache.key('TABLE', content, enable_snapshot)
+	table = cache.get(key)
+	if table is not None:
+		logging.debug('Table file %s is found in the model cache.' % xmlfile)
+		return table
+
+	table = parse(xmlfile, enable_snapshot, StringIO(content))
+	table and cache.put(key, table)
+	return table
+
+
+def parse_plsql(xmlfile, backend=None, cache=None):
+	"""
+	Parse the given SaveDB plsql xml file and return a PLSQL object, see parse_table for the backend and the cache
+	"""
+
+	backend, cache = _settings(backend, cache)
+	parse = _parse_plsql_iterparse if backend == 'iterparse' else _parse_plsql_etree
+	if not cache:
+		return parse(xmlfile)
+
+	with open(xmlfile, 'rb') as f:
+		content = f.read()
+
+	key = cache.key('PLSQL', content)
+	plsql = cache.get(key)
+	if plsql is not None:
+		logging.debug('Object file %s is found in the model cache.' % xmlfile)
+		return plsql
+
+	plsql = parse(xmlfile, StringIO(content))
+	plsql and cache.put(key, plsql)
+	return plsql
+
+
+# The backends parse the file object "source" if it is given, otherwise the file "xmlfile".
+
+def _parse_table_etree(xmlfile, enable_snapshot=False, source=None):
+
 	logging.info('Start processing table file: %s' % xmlfile)
 
-	tree = etree.parse(xmlfile)
+	tree = etree.parse(source or xmlfile)
 	root = tree.getroot()
 	if root.tag.lower() != 'table':
 		logging.warn('Not a table xml file: %s' % xmlfile)
@@ -56,15 +151,10 @@ def parse_table(xmlfile, enable_snapshot=False):
 	return table
 
 
-def parse_plsql(xmlfile):
-
-	"""
-	Parse the given SaveDB plsql xml file and return a PLSQL object
-	"""
-
+def _parse_plsql_etree(xmlfile, source=None):
 	logging.info('Start processing xml file: %s' % xmlfile)
 
-	tree = etree.parse(xmlfile)
+	tree = etree.parse(source or xmlfile)
 	root = tree.getroot()
 	try:
 		plsql = PLSQL(root.tag.upper())
@@ -86,6 +176,86 @@ def parse_plsql(xmlfile):
 	return plsql
 
 
+def _parse_table_iterparse(xmlfile, enable_snapshot=False, source=None):
+	logging.info('Start processing table file: %s' % xmlfile)
+
+	table = None
+	documentation_found = False
+	section = None
+	depth = 0
+
+	for event, elem in cetree.iterparse(source or xmlfile, ('start', 'end')):
+		if event == 'start':
+			depth += 1
+			if depth == 1:
+				if elem.tag.lower() != 'table':
+					logging.warn('Not a table xml file: %s' % xmlfile)
+					return
+				table = Table(enable_snapshot)
+				table.update(elem.attrib)
+			elif depth == 2:
+				section = elem.tag
+			continue
+
+		if depth == 3 and section == 'columns' and elem.tag == 'column':
+			column = Column()
+			column.update(elem.attrib)
+
+			# for documentation/default_value/sql_loader_ctl_expression
+			for child in elem:
+				column[child.tag] = child.text
+
+			table.add_column(column)
+			elem.clear()
+
+		elif depth == 3 and section == 'indexes' and elem.tag == 'index':
+			# Function-based index is not covered.
+			columns = ','.join([column.attrib['name'].upper() for column in elem.findall('./columns/column')])
+			if columns:
+				index = Index()
+				index.update(elem.attrib)
+				index.columns = columns
+				table.add_index(index)
+			elem.clear()
+
+		elif depth == 2 and section == 'documentation' and not documentation_found:
+			table.documentation = elem.text
+			documentation_found = True
+
+		depth -= 1
+
+	logging.info('Finish processing table file: %s' % xmlfile)
+	return table
+
+
+def _parse_plsql_iterparse(xmlfile, source=None):
+	logging.info('Start processing xml file: %s' % xmlfile)
+
+	plsql = None
+	depth = 0
+
+	for event, elem in cetree.iterparse(source or xmlfile, ('start', 'end')):
+		if event == 'start':
+			depth += 1
+			if depth == 1:
+				try:
+					plsql = PLSQL(elem.tag.upper())
+				except EzDBError, e:
+					logging.warn('Not a valid xml file: %s; error message: %s' % (xmlfile, e.message))
+					return
+				plsql.update(elem.attrib)
+			continue
+
+		if depth == 2 and elem.tag == 'documentation':
+			plsql.documentation = elem.text
+			# nothing else is needed from the file
+			break
+
+		depth -= 1
+
+	logging.info('Finish processing type file: %s' % xmlfile)
+	return plsql
+
 
 if __name__ == '__main__':
 	table = parse_table(r'C:\Users\yufa\Desktop\Document\Study\Python\EzDB\RawFile\DB\Table\CD_FDW_STRUCTURE.XML')
@@ -0,0 +1,226 @@
+__author__ = 'yufa'
+
+import os
+import time
+import zlib
+import struct
+import hashlib
+import logging
+import tarfile
+from multiprocessing.pool import ThreadPool
+
+try:
+	import lzma
+except ImportError:
+	lzma = None
+
+from ezdb.common.exception import EzDBError
+
+
+COMPRESSIONS = ('gzip', 'xz')
+
+DIGEST_FILE = 'DB.DIGEST'
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+
+def _deflate_block(data, level, last):
+	"""
+	Compress a block as a raw deflate stream. Each block but the last one ends with a sync flush (byte aligned, not
+	final), so the compressed blocks can simply be concatenated.
+	"""
+
+	compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+	return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipFile(object):
+	"""
+	Write-only file object writing a standard (single member) gzip stream, whose blocks are compressed by a pool
+	of threads (zlib releases the GIL while compressing). The crc32 is computed in the calling thread, and the blocks
+	are written in order.
+
+	>>> import gzip, StringIO
+	>>> buf = StringIO.StringIO()
+	>>> f = ParallelGzipFile(buf, threads=2, block_size=10)
+	>>> f.write('x' * 25); f.write('the end')
+	>>> f.close()
+	>>> gzip.GzipFile(fileobj=StringIO.StringIO(buf.getvalue())).read() == 'x' * 25 + 'the end'
+	True
+	"""
+
+	def __init__(self, fileobj, level=9, threads=2, block_size=DEFAULT_BLOCK_SIZE, mtime=None):
+		self.fileobj = fileobj
+		self.level = level
+		self.block_size = block_size
+		self.__pool = ThreadPool(threads)
+		self.__max_pending = threads * 2
+		self.__pending = []
+		self.__buffer = []
+		self.__buffered = 0
+		self.__crc = zlib.crc32('') & 0xffffffff
+		self.__size = 0
+		self.__closed = False
+
+		# gzip header: magic, deflate, no flags, mtime, no extra flags, unknown OS
+		mtime = int(time.time() if mtime is None else mtime)
+		self.fileobj.write('\037\213\010\000' + struct.pack('<L', mtime & 0xffffffff) + '\000\377')
+
+	def write(self, data):
+		if self.__closed:
+			raise ValueError('write to a closed file')
+		if not data:
+			return
+
+		self.__crc = zlib.crc32(data, self.__crc) & 0xffffffff
+		self.__size += len(data)
+		self.__buffer.append(data)
+		self.__buffered += len(data)
+		if self.__buffered >= self.block_size:
+			block = ''.join(self.__buffer)
+			self.__buffer, self.__buffered = [], 0
+			for start in range(0, len(block) - self.block_size + 1, self.block_size):
+				self.__submit(block[start:start + self.block_size], False)
+			rest = len(block) % self.block_size
+			if rest:
+				self.__buffer, self.__buffered = [block[-rest:]], rest
+
+	def __submit(self, block, last):
+		self.__pending.append(self.__pool.apply_async(_deflate_block, (block, self.level, last)))
+		while len(self.__pending) > self.__max_pending:
+			self.fileobj.write(self.__pending.pop(0).get())
+
+	def close(self):
+		if self.__closed:
+			return
+		self.__closed = True
+		try:
+			self.__submit(''.join(self.__buffer), True)
+			self.__buffer = []
+			while self.__pending:
+				self.fileobj.write(self.__pending.pop(0).get())
+			self.fileobj.write(struct.pack('<LL', self.__crc, self.__size & 0xffffffff))
+		finally:
+			self.__pool.close()
+			self.__pool.join()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+
+def package_mtime():
+	"""
+	Return the modification time stored in the package (tar members and gzip header): SOURCE_DATE_EPOCH if it is
+	set, otherwise 0, so the package doesn't depend on when it was built.
+	"""
+
+	return int(os.environ.get('SOURCE_DATE_EPOCH') or 0)
+
+
+def normalize_tarinfo(info, mtime=0):
+	"""
+	Drop the build specific metadata of a tar member: owner, group, modification time and permissions (0755 for the
+	folders and the executable files, 0644 otherwise).
+
+	>>> info = normalize_tarinfo(tarfile.TarInfo('DB/RELEASE.TXT'))
+	>>> info.uid, info.gid, info.uname, info.gname, info.mtime, oct(info.mode)
+	(0, 0, '', '', 0, '0644')
+	"""
+
+	info.uid = info.gid = 0
+	info.uname = info.gname = ''
+	info.mtime = mtime
+	info.mode = 0755 if info.isdir() or info.mode & 0111 else 0644
+	return info
+
+
+def add_tree(tar, path, arcname, mtime=0):
+	"""
+	Add the given folder to the tar file recursively, like TarFile.add, but in the order of the file names and with
+	the normalized metadata (see normalize_tarinfo).
+	"""
+
+	info = normalize_tarinfo(tar.gettarinfo(path, arcname), mtime)
+	if info.isdir():
+		tar.addfile(info)
+		for file_name in sorted(os.listdir(path)):
+			add_tree(tar, os.path.join(path, file_name), '%s/%s' % (arcname, file_name), mtime)
+	else:
+		with open(path, 'rb') as f:
+			tar.addfile(info, f)
+
+
+def tree_members(root):
+	"""
+	Return the members (name relative to root, sha256 of the content or None for a folder) of the given folder, to be
+	passed to content_digest.
+	"""
+
+	members = []
+	for folder, folders, files in os.walk(root):
+		relative = os.path.relpath(folder, root).replace(os.sep, '/')
+		prefix = '' if relative == '.' else relative + '/'
+		members.extend((prefix + name, None) for name in folders)
+		for name in files:
+			with open(os.path.join(folder, name), 'rb') as f:
+				members.append((prefix + name, hashlib.sha256(f.read()).hexdigest()))
+	return members
+
+
+def content_digest(members, *parameters):
+	"""
+	Return the digest of the package content: the members (name, sha256 of the content or None for a folder) in the
+	order of their names, and the given parameters (e.g. the compression settings). It doesn't depend on the order in
+	which the members were written, so it is the same for the archive and the directory output modes.
+
+	>>> content_digest([('TABLE', None), ('RELEASE.TXT', '1a')], 'gzip') == \\
+	...     content_digest([('RELEASE.TXT', '1a'), ('TABLE', None)], 'gzip')
+	True
+	>>> content_digest([('RELEASE.TXT', '1a')], 'gzip') == content_digest([('RELEASE.TXT', '1a')], 'xz')
+	False
+	"""
+
+	sha256 = hashlib.sha256('|'.join(str(parameter) for parameter in parameters) + '\n')
+	for name, digest in sorted(members):
+		sha256.update('%s %s\n' % (name, digest or '-'))
+	return sha256.hexdigest()
+
+
+def package_file_name(compression='gzip'):
+	"""
+	Return the name of the DB package generated with the given compression.
+	"""
+
+	return 'DB.tar.xz' if compression == 'xz' else 'DB.tgz'
+
+
+def open_package(path, compression='gzip', level=None, threads=1, mtime=0):
+	"""
+	Open the given package file for writing and return (file object to write the tar stream to, file objects to
+	close in order). With threads greater than 1, the gzip stream is compressed in parallel.
+	The default level is 9 for gzip (as tarfile) and 6 for xz (the lzma default preset). The gzip header stores the
+	given modification time and no file name.
+	"""
+
+	if compression not in COMPRESSIONS:
+		raise EzDBError('Unknown package compression: %s. Valid values: %s.' % (compression, ', '.join(COMPRESSIONS)))
+	if level is None:
+		level = 6 if compression == 'xz' else 9
+
+	if compression == 'xz':
+		if not lzma:
+			raise EzDBError('The xz compression requires the module lzma, which is not available.')
+		f = lzma.LZMAFile(path, 'w', preset=level)
+		return f, [f]
+
+	f = open(path, 'wb')
+	if threads > 1:
+		logging.info('Compressing the package with %d threads.' % threads)
+		gz = ParallelGzipFile(f, level, threads, mtime=mtime)
+	else:
+		import gzip
+		gz = gzip.GzipFile('', 'wb', level, f, mtime)
+	return gz, [gz, f]
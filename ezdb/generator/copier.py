@@ -0,0 +1,192 @@
+__author__ = 'yufa'
+
+import os
+import sys
+import errno
+import shutil
+import logging
+import threading
+from multiprocessing.pool import ThreadPool
+
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
+
+try:
+	import ctypes
+	_libc = ctypes.CDLL(None, use_errno=True)
+except (ImportError, OSError, TypeError):
+	ctypes = _libc = None
+
+
+# ioctl cloning a file (reflink, the blocks are shared until one of the files is modified): btrfs, xfs ...
+_FICLONE = 0x40049409
+
+# The errors telling that a copy method is not supported by the platform or the file systems
+_UNSUPPORTED_ERRORS = (errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS, errno.EPERM,
+                       errno.EMLINK)
+
+_LINUX = sys.platform.startswith('linux')
+
+
+def _libc_function(name, restype, *argtypes):
+	function = getattr(_libc, name, None) if _libc is not None and _LINUX else None
+	if function is not None:
+		function.restype = restype
+		function.argtypes = argtypes
+	return function
+
+
+if ctypes:
+	_copy_file_range = _libc_function('copy_file_range', ctypes.c_ssize_t, ctypes.c_int, ctypes.c_void_p,
+	                                  ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint)
+	_libc_sendfile = _libc_function('sendfile', ctypes.c_ssize_t, ctypes.c_int, ctypes.c_int, ctypes.c_void_p,
+	                                ctypes.c_size_t)
+else:
+	_copy_file_range = _libc_sendfile = None
+
+
+def _check(result):
+	if result < 0:
+		error = ctypes.get_errno()
+		raise OSError(error, os.strerror(error))
+	return result
+
+
+def _kernel_copy(method, source_fd, target_fd, size):
+	"""
+	Copy size bytes from source_fd to target_fd (from their current offsets) inside the kernel.
+	"""
+
+	copied = 0
+	while copied < size:
+		count = size - copied
+		if method == 'copy_file_range':
+			result = _check(_copy_file_range(source_fd, None, target_fd, None, count, 0))
+		elif hasattr(os, 'sendfile'):
+			result = os.sendfile(target_fd, source_fd, None, count)
+		else:
+			result = _check(_libc_sendfile(target_fd, source_fd, None, count))
+		if result == 0:
+			break
+		copied += result
+
+
+# The methods to copy a file, from the cheapest one. hardlink is only used if it is enabled.
+METHODS = tuple(method for method, available in (('hardlink', hasattr(os, 'link')),
+                                                 ('reflink', bool(fcntl) and _LINUX),
+                                                 ('copy_file_range', bool(_copy_file_range)),
+                                                 ('sendfile', _LINUX and (hasattr(os, 'sendfile') or bool(_libc_sendfile))),
+                                                 ('copy', True)) if available)
+
+
+class FileCopier(object):
+	"""
+	Copy files with the cheapest method supported by the platform and the file systems:
+	hardlink (if enabled, the target then shares the source file: modifying one modifies the other), reflink
+	(same file system), a copy inside the kernel (copy_file_range, sendfile), or a copy through user space.
+	A method failing as not supported is not tried again (unless it failed because the files are on different file
+	systems).
+
+	With threads greater than 1, the files are copied by a pool of threads, copy() only waits when too many copies are
+	pending. wait() waits for all the pending copies and raises the error of a failed one.
+
+	stats tells the number of bytes copied by each method, all but 'copy' avoid copying the bytes through user space.
+
+	>>> import tempfile
+	>>> folder = tempfile.mkdtemp()
+	>>> with open(os.path.join(folder, 'A.SQL'), 'w') as f: f.write('select 1 from dual;')
+	>>> copier = FileCopier(threads=2)
+	>>> copier.copy(os.path.join(folder, 'A.SQL'), os.path.join(folder, 'B.SQL'))
+	>>> copier.close()
+	>>> open(os.path.join(folder, 'B.SQL')).read()
+	'select 1 from dual;'
+	>>> sum(copier.stats.values())
+	19
+	>>> shutil.rmtree(folder)
+	"""
+
+	def __init__(self, threads=1, hardlink=False):
+		self.hardlink = hardlink
+		self.stats = {}
+		self.__disabled = set() if hardlink and 'hardlink' in METHODS else set(['hardlink'])
+		self.__lock = threading.Lock()
+		self.__pool = ThreadPool(threads) if threads > 1 else None
+		self.__max_pending = threads * 4
+		self.__pending = []
+
+	def copy(self, source_file, target_file):
+		if self.__pool is None:
+			self.__copy(source_file, target_file)
+			return
+
+		self.__pending.append(self.__pool.apply_async(self.__copy, (source_file, target_file)))
+		while len(self.__pending) > self.__max_pending:
+			self.__pending.pop(0).get()
+
+	def wait(self):
+		while self.__pending:
+			self.__pending.pop(0).get()
+
+	def close(self):
+		try:
+			self.wait()
+		finally:
+			if self.__pool is not None:
+				self.__pool.close()
+				self.__pool.join()
+				self.__pool = None
+
+	def abort(self):
+		self.__pending = []
+		if self.__pool is not None:
+			self.__pool.terminate()
+			self.__pool.join()
+			self.__pool = None
+
+	def __done(self, method, size):
+		with self.__lock:
+			self.stats[method] = self.stats.get(method, 0) + size
+
+	def __unsupported(self, method, error):
+		if error.errno not in _UNSUPPORTED_ERRORS:
+			raise
+		# across file systems, the method may still work for other files
+		if error.errno != errno.EXDEV and method not in self.__disabled:
+			logging.debug('Copying files with %s is not supported (%s), fall back to another method.' % (method, error))
+			self.__disabled.add(method)
+
+	def __copy(self, source_file, target_file):
+		size = os.path.getsize(source_file)
+		if os.path.lexists(target_file):
+			os.remove(target_file)
+		same_device = os.stat(source_file).st_dev == os.stat(os.path.dirname(target_file) or '.').st_dev
+
+		if same_device and 'hardlink' not in self.__disabled:
+			try:
+				os.link(source_file, target_file)
+				return self.__done('hardlink', size)
+			except OSError, e:
+				self.__unsupported('hardlink', e)
+
+		with open(source_file, 'rb') as source, open(target_file, 'wb') as target:
+			for method in METHODS:
+				if method == 'hardlink' or method in self.__disabled: continue
+				if method == 'reflink' and not same_device: continue
+
+				try:
+					if method == 'reflink':
+						fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+					elif method == 'copy':
+						shutil.copyfileobj(source, target)
+					else:
+						_kernel_copy(method, source.fileno(), target.fileno(), size)
+					return self.__done(method, size)
+				except (IOError, OSError), e:
+					if method == 'copy':
+						raise
+					self.__unsupported(method, e)
+					source.seek(0)
+					target.seek(0)
+					target.truncate()
@@ -0,0 +1,509 @@
+__author__ = 'yufa'
+
+import os
+import re
+import json
+import hashlib
+import tarfile
+import logging
+from collections import OrderedDict, namedtuple
+
+import ifs
+from ezdb.common.exception import EzDBError
+from ezdb.compiler.dbobject.index import Index
+
+
+# Folder of the delta upgrade script in the DB package
+DELTA_DIR = 'TOOLS/AUTO_UPGRADE/DELTA'
+
+# The phases of the delta upgrade in order, as the IFS script (see ifs.PHASES), the triggers after the PL/SQL objects
+# they may use, the index changes last
+PHASES = ('TYPE', 'TABLE', 'SEQUENCE', 'FUNCTION', 'PROCEDURE', 'PACKAGE_HEADER', 'VIEW', 'PACKAGE_BODY', 'TRIGGER',
+          'INDEX')
+
+_END_OF_RECORD = '#$EOR$#'
+_FIELD_PATTERN = re.compile(r'"((?:[^"]|"")*)"(?:,|$)')
+_CHUNK_PATTERN = re.compile(r'^INIT_TABLE/(DB_OBJECTS|DB_TABLE_COLUMNS)(\.\d{3})?\.DAT$')
+
+# The dictionary tables updated by the delta upgrade script, with the fields identifying a row
+DICTIONARY_KEYS = OrderedDict([('DB_OBJECTS', ('object_type', 'table_name')),
+                               ('DB_TABLE_COLUMNS', ('table_name', 'column_name'))])
+
+# Oracle allows at most 1000 values in a list, and sqlplus at most 2499 characters in a line
+_DELETE_BATCH = 500
+_VALUES_PER_LINE = 5
+
+# A change of an object between two releases. change is added, modified or dropped, details tells what has changed
+# (e.g. the columns of a table), script is the piece of the delta script applying it (the dropped objects are only
+# reported, they must be dropped manually).
+Change = namedtuple('Change', 'phase object_type name change details script')
+
+# The rows of a dictionary table changed between two releases: the keys (see DICTIONARY_KEYS) of the rows to delete,
+# the removed and the modified ones, and the rows to load, the added and the modified ones.
+DictionaryChange = namedtuple('DictionaryChange', 'table_name deleted loaded')
+
+
+def parse_dat(data, fields):
+	"""
+	Return the rows of a DAT file written by dbmeta.RowEncoder, as dicts keyed by the given field names.
+
+	>>> rows = parse_dat('"LO_DEMO","a ""demo"", table"#$EOR$#\\n"LO_TEST",""#$EOR$#\\n', ['table_name', 'description'])
+	>>> [(row['table_name'], row['description']) for row in rows]
+	[('LO_DEMO', 'a "demo", table'), ('LO_TEST', '')]
+	"""
+
+	rows = []
+	for record in data.split(_END_OF_RECORD):
+		record = record.lstrip('\r\n')
+		if not record: continue
+		values = [value.replace('""', '"') for value in _FIELD_PATTERN.findall(record)]
+		if len(values) != len(fields):
+			raise EzDBError('Invalid DAT record, %d fields are expected: %s' % (len(fields), record[:200]))
+		rows.append(dict(zip(fields, values)))
+	return rows
+
+
+def format_dat(rows, fields):
+	"""
+	Return the DAT file of the given rows, dicts keyed by the given field names, as written by dbmeta.RowEncoder.
+
+	>>> rows = [{'table_name': 'LO_DEMO', 'description': 'a "demo", table'}]
+	>>> format_dat(rows, ['table_name', 'description'])
+	'"LO_DEMO","a ""demo"", table"#$EOR$#\\n'
+	>>> parse_dat(format_dat(rows, ['table_name', 'description']), ['table_name', 'description']) == rows
+	True
+	"""
+
+	return ''.join('%s%s\n' % (','.join('"%s"' % row[field].replace('"', '""') for field in fields), _END_OF_RECORD)
+	               for row in rows)
+
+
+def ctl_fields(ctl):
+	"""
+	Return the names (lower case) of the fields of the DAT file loaded by the given sql*loader control file, the
+	filler fields (of the LOB columns) are not in the DAT file.
+
+	>>> ctl_fields('OPTIONS (DIRECT=TRUE)\\nLOAD DATA\\n(\\nNAME CHAR(30) "TO_CHAR(:NAME)"\\n, NOTE# FILTER CHAR\\n'
+	...            ',NOTE CHAR(1048576) ENCLOSED BY \\'<start_lob>\\' AND \\'<end_lob>\\' NULLIF NOTE#=\\'Y\\'\\n)')
+	['name', 'note']
+	"""
+
+	fields = []
+	for line in ctl[ctl.index('\n(\n') + 3:].splitlines():
+		name = line.lstrip(', ').split(' ')[0]
+		if name and name != ')' and not name.endswith('#'):
+			fields.append(name.lower())
+	return fields
+
+
+class SchemaModel(object):
+	"""
+	The objects of a compiled release: the tables, their columns and indexes, and the PL/SQL objects, as described by
+	the rows of DB_OBJECTS and DB_TABLE_COLUMNS, and the digests of the files of the DB package (name relative to the
+	DB folder, see archive.tree_members).
+	"""
+
+	def __init__(self, db_objects, db_table_columns, files, release=None):
+		self.release = release
+		self.files = files
+		self.tables = OrderedDict()
+		self.indexes = OrderedDict()
+		self.objects = OrderedDict()
+		self.columns = {}
+		# table name -> OrderedDict(key -> row), see DICTIONARY_KEYS
+		self.dictionary = dict((table_name, OrderedDict()) for table_name in DICTIONARY_KEYS)
+
+		for row in db_objects:
+			self.dictionary['DB_OBJECTS'][(row['object_type'], row['table_name'])] = row
+			if row['object_type'] == 'TABLE':
+				self.tables[row['table_name']] = row
+			elif row['object_type'] == 'INDEX':
+				self.indexes[row['table_name']] = row
+			else:
+				self.objects[(row['object_type'], row['table_name'])] = row
+
+		for row in db_table_columns:
+			self.dictionary['DB_TABLE_COLUMNS'][(row['table_name'], row['column_name'])] = row
+			self.columns.setdefault(row['table_name'], OrderedDict())[row['column_name']] = row
+
+	def __str__(self):
+		return 'release %s: %d tables, %d indexes, %d objects' % (self.release, len(self.tables), len(self.indexes),
+		                                                          len(self.objects))
+
+
+def _package_files(path):
+	"""
+	Return the digests of the files of the given DB package (DB.tgz) or DB folder, and the content of the files
+	needed to read its model (RELEASE.TXT and the DAT/CTL files of DB_OBJECTS and DB_TABLE_COLUMNS).
+	"""
+
+	def needed(name):
+		return name == 'RELEASE.TXT' or name in ('INIT_TABLE/DB_OBJECTS.CTL', 'INIT_TABLE/DB_TABLE_COLUMNS.CTL') \
+		       or _CHUNK_PATTERN.match(name)
+
+	digests, contents = {}, {}
+	if os.path.isdir(path):
+		for root, folders, files in os.walk(path):
+			for file_name in files:
+				name = os.path.relpath(os.path.join(root, file_name), path).replace(os.sep, '/')
+				with open(os.path.join(root, file_name), 'rb') as f:
+					data = f.read()
+				digests[name] = hashlib.sha256(data).hexdigest()
+				needed(name) and contents.setdefault(name, data)
+		return digests, contents
+
+	try:
+		tar = tarfile.open(path, 'r:*')
+	except (IOError, tarfile.TarError), e:
+		raise EzDBError('Failed to read the previous DB package %s: %s' % (path, e))
+	with tar:
+		for info in tar:
+			if not info.isfile(): continue
+			name = info.name.split('/', 1)[-1]
+			data = tar.extractfile(info).read()
+			digests[name] = hashlib.sha256(data).hexdigest()
+			needed(name) and contents.setdefault(name, data)
+	return digests, contents
+
+
+def read_package(path):
+	"""
+	Return the SchemaModel of the given DB package (DB.tgz) or DB folder, e.g. the package of the previous release.
+	"""
+
+	digests, contents = _package_files(path)
+
+	rows = {}
+	for table_name in ('DB_OBJECTS', 'DB_TABLE_COLUMNS'):
+		ctl = contents.get('INIT_TABLE/%s.CTL' % table_name)
+		if ctl is None:
+			raise EzDBError('%s is not a DB package: INIT_TABLE/%s.CTL is missing.' % (path, table_name))
+		# a large DAT file is split into chunks TABLE.NNN.DAT, see set_dat_chunk_size
+		data = ''.join(contents[name] for name in sorted(contents)
+		               if _CHUNK_PATTERN.match(name) and _CHUNK_PATTERN.match(name).group(1) == table_name)
+		rows[table_name] = parse_dat(data, ctl_fields(ctl))
+
+	return SchemaModel(rows['DB_OBJECTS'], rows['DB_TABLE_COLUMNS'], digests, contents.get('RELEASE.TXT'))
+
+
+def _column_spec(row, previous=None):
+	"""
+	Return the column of an ALTER TABLE ADD (previous is None) or MODIFY statement: only what has changed is modified,
+	Oracle rejects a MODIFY setting the nullability a column already has. A column is only made NOT NULL here when it
+	is added with a default value, which Oracle sets into the existing rows, otherwise see _not_null.
+	"""
+
+	spec = ['"%s"' % row['column_name']]
+	if previous is None or row['data_type'] != previous['data_type']:
+		spec.append(row['data_type'])
+	if previous is None:
+		row['default_value'] and spec.append('DEFAULT %s' % row['default_value'])
+	elif row['default_value'] != previous['default_value']:
+		spec.append('DEFAULT %s' % (row['default_value'] or 'NULL'))
+	if previous is None:
+		row['nullable'] == 'N' and row['default_value'] and spec.append('NOT NULL')
+	elif row['nullable'] != previous['nullable'] and row['nullable'] != 'N':
+		spec.append('NULL')
+	return ' '.join(spec)
+
+
+def _not_null(row):
+	"""
+	Return the statements making an existing column NOT NULL. Oracle rejects it while a row holds a NULL (ORA-02296),
+	so the NULLs are set to the default value first. Without a default value the statement is commented out, it must
+	be run once the column is filled.
+	"""
+
+	table_name, column_name = row['table_name'], row['column_name']
+	statement = 'ALTER TABLE %s MODIFY ("%s" NOT NULL);' % (table_name, column_name)
+	if row['default_value']:
+		return ['UPDATE %s SET "%s" = %s WHERE "%s" IS NULL;' % (table_name, column_name, row['default_value'],
+		                                                        column_name),
+		        'COMMIT;',
+		        statement]
+	return ['-- %s.%s has no default value: fill it, then make it NOT NULL' % (table_name, column_name),
+	        '-- ' + statement]
+
+
+def _column_changes(previous, current):
+	"""
+	Return the changes (description, statement) of the columns of a table. A column becoming NOT NULL is added or
+	modified first, then made NOT NULL (see _not_null), unless it is added with a default value.
+
+	>>> def column(name, data_type='NUMBER', default_value='', nullable='Y'):
+	...     return {'table_name': 'LO_DEMO', 'column_name': name, 'data_type': data_type,
+	...             'default_value': default_value, 'nullable': nullable}
+	>>> previous = OrderedDict([('ID', column('ID')), ('CODE', column('CODE', 'VARCHAR2(10)'))])
+	>>> current = OrderedDict([('ID', column('ID', nullable='N')),
+	...                        ('CODE', column('CODE', 'VARCHAR2(20)', nullable='N')),
+	...                        ('NOTE', column('NOTE', 'VARCHAR2(20)', nullable='N')),
+	...                        ('STATE', column('STATE', 'VARCHAR2(10)', "'NEW'", 'N'))])
+	>>> for description, statement in _column_changes(previous, current): print statement
+	-- LO_DEMO.ID has no default value: fill it, then make it NOT NULL
+	-- ALTER TABLE LO_DEMO MODIFY ("ID" NOT NULL);
+	ALTER TABLE LO_DEMO MODIFY ("CODE" VARCHAR2(20));
+	-- LO_DEMO.CODE has no default value: fill it, then make it NOT NULL
+	-- ALTER TABLE LO_DEMO MODIFY ("CODE" NOT NULL);
+	ALTER TABLE LO_DEMO ADD ("NOTE" VARCHAR2(20));
+	-- LO_DEMO.NOTE has no default value: fill it, then make it NOT NULL
+	-- ALTER TABLE LO_DEMO MODIFY ("NOTE" NOT NULL);
+	ALTER TABLE LO_DEMO ADD ("STATE" VARCHAR2(10) DEFAULT 'NEW' NOT NULL);
+	>>> current['ID']['default_value'] = '0'
+	>>> print _column_changes(previous, current)[0][1]
+	ALTER TABLE LO_DEMO MODIFY ("ID" DEFAULT 0);
+	UPDATE LO_DEMO SET "ID" = 0 WHERE "ID" IS NULL;
+	COMMIT;
+	ALTER TABLE LO_DEMO MODIFY ("ID" NOT NULL);
+	"""
+
+	changes = []
+	for name, row in current.iteritems():
+		old = previous.get(name)
+		if old is None:
+			statements = ['ALTER TABLE %s ADD (%s);' % (row['table_name'], _column_spec(row))]
+			if row['nullable'] == 'N' and not row['default_value']:
+				statements.extend(_not_null(row))
+			changes.append(('add column %s' % name, '\n'.join(statements)))
+			continue
+
+		modified = [field for field in ('data_type', 'default_value', 'nullable') if row[field] != old[field]]
+		if modified:
+			statements = []
+			if modified != ['nullable'] or row['nullable'] != 'N':
+				statements.append('ALTER TABLE %s MODIFY (%s);' % (row['table_name'], _column_spec(row, old)))
+			if 'nullable' in modified and row['nullable'] == 'N':
+				statements.extend(_not_null(row))
+			changes.append(('modify column %s: %s' % (name, ', '.join('%s %s -> %s' % (field, old[field], row[field])
+			                                                          for field in modified)),
+			                '\n'.join(statements)))
+
+	for name in previous:
+		if name not in current:
+			changes.append(('drop column %s' % name,
+			                '-- ALTER TABLE %s DROP COLUMN "%s";' % (previous[name]['table_name'], name)))
+	return changes
+
+
+def _index_ddl(row, index_build=None):
+	index = Index(row['table_name'], row['hist_table_name'], row['table_type'], columns=row['parameter'])
+	return index.index_ddl(*(index_build or ())).replace('&1', '&TBS_INDEX') + '\n'
+
+
+def _drop_index_ddl(row):
+	if row['table_type'] in ('PRIMARY', 'UNIQUE'):
+		return 'ALTER TABLE %s DROP CONSTRAINT %s DROP INDEX;\n' % (row['hist_table_name'], row['table_name'])
+	return 'DROP INDEX %s;\n' % row['table_name']
+
+
+def _table_changes(previous, current):
+	for name, row in current.tables.iteritems():
+		if name not in previous.tables:
+			if 'Y' in (row.get('init_on_install'), row.get('init_on_upgrade')):
+				# the data of the INIT tables is not in the DB package
+				yield Change('TABLE', 'TABLE', name, 'added', ['initial data to be loaded'],
+				             ifs.object_piece('TABLE', name) +
+				             '-- %s is initialized on install/upgrade: load its data once this script has run\n' % name)
+			else:
+				yield Change('TABLE', 'TABLE', name, 'added', [], ifs.object_piece('TABLE', name))
+			continue
+
+		columns = _column_changes(previous.columns.get(name, {}), current.columns.get(name, {}))
+		if columns:
+			yield Change('TABLE', 'TABLE', name, 'modified', [description for description, _ in columns],
+			             '\n'.join(statement for _, statement in columns) + '\n')
+
+	for name in previous.tables:
+		if name not in current.tables:
+			yield Change('TABLE', 'TABLE', name, 'dropped', [], '-- DROP TABLE %s;\n' % name)
+
+
+def _index_changes(previous, current, index_build):
+	for name, row in current.indexes.iteritems():
+		old = previous.indexes.get(name)
+		if old is None:
+			yield Change('INDEX', 'INDEX', name, 'added', ['on %s (%s)' % (row['hist_table_name'], row['parameter'])],
+			             _index_ddl(row, index_build))
+		elif any(row[field] != old[field] for field in ('table_type', 'parameter', 'hist_table_name')):
+			yield Change('INDEX', 'INDEX', name, 'modified',
+			             ['%s (%s) -> %s (%s)' % (old['table_type'], old['parameter'], row['table_type'], row['parameter'])],
+			             _drop_index_ddl(old) + _index_ddl(row, index_build))
+
+	for name, old in previous.indexes.iteritems():
+		# the indexes of a dropped table go with the table
+		if name not in current.indexes and old['hist_table_name'] in current.tables:
+			yield Change('INDEX', 'INDEX', name, 'dropped', [], _drop_index_ddl(old))
+
+
+def _object_files(object_type, name):
+	"""
+	Return the files of a PL/SQL object in the package, with the phase installing each one.
+	"""
+
+	if object_type == 'PACKAGE':
+		return [('PACKAGE_HEADER', 'PACKAGE/%s.PKS' % name), ('PACKAGE_BODY', 'PACKAGE/%s.PKB' % name)]
+	return [(object_type, '%s/%s.SQL' % (object_type, name))]
+
+
+def _object_changes(previous, current):
+	for (object_type, name), row in current.objects.iteritems():
+		added = (object_type, name) not in previous.objects
+		for phase, file_name in _object_files(object_type, name):
+			if file_name not in current.files:
+				logging.warning('The file %s of the object %s is not in the package, skip it.' % (file_name, name))
+				continue
+			if added or previous.files.get(file_name) != current.files[file_name]:
+				yield Change(phase, object_type, name, 'added' if added else 'modified', [file_name],
+				             ifs.object_piece(phase, name))
+
+	for object_type, name in previous.objects:
+		if (object_type, name) not in current.objects:
+			yield Change(_object_files(object_type, name)[-1][0], object_type, name, 'dropped', [],
+			             '-- DROP %s %s;\n' % (object_type, name))
+
+
+def diff_models(previous, current, index_build=None):
+	"""
+	Return the changes (Change) from the previous SchemaModel to the current one, in the order of the delta upgrade
+	(see PHASES). In a phase, the index drops come first, then the changes in the order of the objects.
+	The indexes are created with the given build mode (mode, degree), by default the one set by index.set_build_mode.
+	"""
+
+	changes = list(_table_changes(previous, current))
+	changes.extend(_object_changes(previous, current))
+	changes.extend(_index_changes(previous, current, index_build))
+
+	order = dict((phase, i) for i, phase in enumerate(PHASES))
+	return sorted(changes, key=lambda change: (order.get(change.phase, len(PHASES)), change.change != 'dropped'))
+
+
+def dictionary_changes(previous, current):
+	"""
+	Return the changes (DictionaryChange) of the rows of the dictionary tables from the previous SchemaModel to the
+	current one, so the delta upgrade leaves the dictionary as the IFS script loads it.
+
+	>>> def model(*columns):
+	...     return SchemaModel([], [{'table_name': 'LO_DEMO', 'column_name': name, 'data_type': data_type}
+	...                             for name, data_type in columns], {})
+	>>> changes = dictionary_changes(model(('ID', 'NUMBER'), ('CODE', 'VARCHAR2(10)'), ('NOTE', 'VARCHAR2(50)')),
+	...                              model(('ID', 'NUMBER'), ('CODE', 'VARCHAR2(20)'), ('STATE', 'NUMBER')))
+	>>> [(change.table_name, change.deleted, [row['column_name'] for row in change.loaded]) for change in changes]
+	[('DB_TABLE_COLUMNS', [('LO_DEMO', 'CODE'), ('LO_DEMO', 'NOTE')], ['CODE', 'STATE'])]
+	"""
+
+	changes = []
+	for table_name in DICTIONARY_KEYS:
+		old_rows, rows = previous.dictionary[table_name], current.dictionary[table_name]
+		deleted = [key for key, row in old_rows.iteritems() if rows.get(key) != row]
+		loaded = [row for key, row in rows.iteritems() if old_rows.get(key) != row]
+		if deleted or loaded:
+			changes.append(DictionaryChange(table_name, deleted, loaded))
+	return changes
+
+
+def _quote(value):
+	return "'%s'" % value.replace("'", "''")
+
+
+def _delete_rows(table_name, keys):
+	"""
+	Return the statements deleting the rows of the given keys from a dictionary table, the keys sharing their first
+	field are deleted together.
+
+	>>> print _delete_rows('DB_OBJECTS', [('TABLE', 'LO_DEMO'), ('INDEX', 'PK_LO_DEMO'), ('TABLE', "LO_IT'S")])
+	DELETE FROM DB_OBJECTS WHERE OBJECT_TYPE = 'TABLE' AND TABLE_NAME IN (
+	  'LO_DEMO', 'LO_IT''S');
+	DELETE FROM DB_OBJECTS WHERE OBJECT_TYPE = 'INDEX' AND TABLE_NAME IN (
+	  'PK_LO_DEMO');
+	<BLANKLINE>
+	"""
+
+	first_field, second_field = DICTIONARY_KEYS[table_name]
+	groups = OrderedDict()
+	for first, second in keys:
+		groups.setdefault(first, []).append(second)
+
+	statements = []
+	for first, values in groups.iteritems():
+		for i in range(0, len(values), _DELETE_BATCH):
+			batch = [_quote(value) for value in values[i:i + _DELETE_BATCH]]
+			lines = [', '.join(batch[j:j + _VALUES_PER_LINE]) for j in range(0, len(batch), _VALUES_PER_LINE)]
+			statements.append('DELETE FROM %s WHERE %s = %s AND %s IN (\n  %s);\n' %
+			                  (table_name, first_field.upper(), _quote(first), second_field.upper(), ',\n  '.join(lines)))
+	return ''.join(statements)
+
+
+def _section(title):
+	return ('-- -------------------------------------------------------------------------------------\n'
+	        '-- {title} \n'
+	        '-- -------------------------------------------------------------------------------------\n'
+	        'prompt --- {title} \n').format(title=title)
+
+
+def generate_delta_script(changes, previous_release, release_number, dictionary=()):
+	"""
+	Generate the script upgrading the schema of the previous release to the given release with the given changes
+	(see diff_models), run instead of the full comparison of the AUTO_UPGRADE tooling. The dropped tables, columns and
+	PL/SQL objects are only commented out, they must be dropped manually once they are no longer needed. So is the
+	NOT NULL constraint of a column without default value, it must be set once the column is filled.
+	The rows of the dictionary tables are updated with the given changes (see dictionary_changes): the changed rows
+	are deleted, then loaded again by sql*loader from DELTA_DIR/<TABLE>.DAT. The data of the new INIT tables is not in
+	the DB package, it is left to the initialization of the AUTO_UPGRADE tooling.
+	"""
+
+	yield '--This script upgrades the schema of the release %s to the release %s.\n' % (previous_release,
+	                                                                                    release_number)
+	yield ifs.session_header()
+
+	phase = None
+	for change in changes:
+		if change.phase != phase:
+			phase = change.phase
+			yield _section('UPGRADE %s' % phase)
+			yield 'set feed on heading on timing on term on\n'
+		yield '-- %s %s %s%s\n' % (change.object_type, change.name, change.change,
+		                           ': %s' % '; '.join(change.details) if change.details else '')
+		yield change.script
+
+	if dictionary:
+		yield _section('Update the dictionary tables')
+		yield 'set feed on heading on timing on term on\n'
+		for change in dictionary:
+			yield _delete_rows(change.table_name, change.deleted)
+		yield 'commit;\n'
+		yield ifs.SQLLDR_DEFINE
+		for change in dictionary:
+			if change.loaded:
+				yield ifs.object_piece('DATA', change.table_name, DELTA_DIR)
+
+	yield _section('Load application release table')
+	yield ifs.update_release_number(release_number)
+	yield 'exec DBMS_UTILITY.COMPILE_SCHEMA(schema => USER, compile_all => FALSE);\n'
+	yield ifs.show_errors()
+
+
+def delta_summary(changes, previous_release, release_number, dictionary=()):
+	"""
+	Return the summary of the changes (DELTA_SUMMARY.json): each change, the number of changes by kind (added,
+	modified, dropped), and the number of rows deleted and loaded by dictionary table.
+
+	>>> summary = json.loads(delta_summary([Change('TABLE', 'TABLE', 'LO_DEMO', 'added', [], '')], '4.0', '4.1'))
+	>>> sorted(summary['counts'].items()), summary['changes'][0]['name']
+	([(u'added', 1), (u'dropped', 0), (u'modified', 0)], u'LO_DEMO')
+	"""
+
+	counts = dict.fromkeys(('added', 'modified', 'dropped'), 0)
+	for change in changes:
+		counts[change.change] += 1
+	return json.dumps({'previous_release': previous_release,
+	                   'release': release_number,
+	                   'counts': counts,
+	                   'dictionary': dict((change.table_name, {'deleted': len(change.deleted),
+	                                                           'loaded': len(change.loaded)}) for change in dictionary),
+	                   'changes': [{'object_type': change.object_type, 'name': change.name, 'phase': change.phase,
+	                                'change': change.change, 'details': change.details} for change in changes]},
+	                  indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+	import doctest
+	doctest.testmod()
@@ -1,5 +1,34 @@
 __author__ = 'yufa'
 
+from collections import namedtuple
+
+
+# An object installed by the IFS script. object_type is the folder of its files (TABLE, PACKAGE ...), or INDEX for
+# the indexes of a table, DATA for a table loaded by sql*loader. The objects of a type are installed in the order of
+# (install_order, name). The name of a DATA object is the name of its DAT file: the table name or TABLE.NNN for a chunk
+# (see _create_sqlldr_piece). cost is the size of the object used to estimate how long it takes to install it: the number
+# of columns of a table, the number of indexes of a table, the bytes of a DAT file or of the PL/SQL source files.
+InstallObject = namedtuple('InstallObject', 'object_type install_order name cost')
+
+# The phases of the installation in order: (phase, type of the objects installed)
+PHASES = (('TYPE', 'TYPE'), ('TABLE', 'TABLE'), ('SEQUENCE', 'SEQUENCE'), ('FUNCTION', 'FUNCTION'),
+          ('PROCEDURE', 'PROCEDURE'), ('PACKAGE_HEADER', 'PACKAGE'), ('VIEW', 'VIEW'), ('PACKAGE_BODY', 'PACKAGE'),
+          ('DATA', 'DATA'), ('INDEX', 'INDEX'))
+
+SQLLDR_DEFINE = ('DEFINE SQLLDR_SCRIPT="&DB_DIR/TOOLS/COMMON/LOAD_SQLLDR.BAT" \n'
+                 'prompt SQLLDR_SCRIPT=&SQLLDR_SCRIPT \n')
+
+
+def table_install_objects(table):
+	"""
+	Return the install objects of the given table: the table, and its indexes if it has some.
+	"""
+
+	objects = [InstallObject('TABLE', 1, table.name, len(table.columns))]
+	if table.indexes:
+		objects.append(InstallObject('INDEX', 1, table.name, len(table.indexes)))
+	return objects
+
 
 def _create_table_piece(table_name):
 	piece = ['set feed on heading on timing on term on',
@@ -17,21 +46,31 @@ def _create_index_piece(table_name):
 	return '\n'.join(piece).format(table_name=table_name)
 
 
-def _create_sqlldr_piece(table_name):
+def _create_sqlldr_piece(data_name, data_dir='INIT_TABLE'):
+	"""
+	data_name is the name of the DAT file: the table name, or TABLE.NNN for a chunk of a large DAT file. The chunks are
+	loaded in parallel direct path, which doesn't fire the triggers, and the table can't be altered while the other
+	chunks are being loaded, so the triggers are only disabled for a whole DAT file.
+	data_dir is the folder of the DAT and control files in the DB package.
+	"""
+
+	table_name = data_name.split('.')[0]
+	whole = data_name == table_name
+
 	piece = ['set feed on heading on timing on term on']
-	piece.append('prompt Loading {table_name} with SQL*Loader...')
-	piece.append("exec EXEC_IMMEDIATE('alter table {table_name} disable all triggers');")
-	piece.append('prompt host "&SQLLDR_SCRIPT" {table_name} "&NEW_CENTRAL_CONNECTION" '
-	             '"&DB_DIR/INIT_TABLE/{table_name}.DAT" "&DB_DIR/INIT_TABLE/{table_name}.CTL" '
+	piece.append('prompt Loading {data_name} with SQL*Loader...')
+	whole and piece.append("exec EXEC_IMMEDIATE('alter table {table_name} disable all triggers');")
+	piece.append('prompt host "&SQLLDR_SCRIPT" {data_name} "&NEW_CENTRAL_CONNECTION" '
+	             '"&DB_DIR/{data_dir}/{data_name}.DAT" "&DB_DIR/{data_dir}/{table_name}.CTL" '
 	             '"&OUTPUT_DIR"')
-	piece.append('host "&SQLLDR_SCRIPT" {table_name} "&NEW_CENTRAL_CONNECTION" "&DB_DIR/INIT_TABLE/{table_name}.DAT" '
-	             '"&DB_DIR/INIT_TABLE/{table_name}.CTL" "&OUTPUT_DIR"')
+	piece.append('host "&SQLLDR_SCRIPT" {data_name} "&NEW_CENTRAL_CONNECTION" "&DB_DIR/{data_dir}/{data_name}.DAT" '
+	             '"&DB_DIR/{data_dir}/{table_name}.CTL" "&OUTPUT_DIR"')
 	piece.append('prompt "&OUTPUT_DIR/LOAD_SQLLDR.RC"')
 	piece.append('@"&OUTPUT_DIR/LOAD_SQLLDR.RC"')
-	piece.append("exec EXEC_IMMEDIATE('alter table {table_name} enable all triggers');")
+	whole and piece.append("exec EXEC_IMMEDIATE('alter table {table_name} enable all triggers');")
 	piece.append('\n')
 
-	return '\n'.join(piece).format(table_name=table_name)
+	return '\n'.join(piece).format(data_name=data_name, table_name=table_name, data_dir=data_dir)
 
 
 def _create_object_piece(object_type, object_name, file_format='SQL'):
@@ -51,20 +90,31 @@ def _create_section(section_name):
 	        'set echo off timing off \n').format(section_name=section_name)
 
 
-def _update_release_number(release_number):
-	insert_stmt = "insert into application(product, release_date, release_number)values('{product}', sysdate, '{release}');"
+def object_piece(phase, name, data_dir='INIT_TABLE'):
+	"""
+	Return the piece of script installing the given object in the given phase (see PHASES), data_dir is the folder of
+	the DAT files loaded by the DATA phase.
+	"""
 
-	return '\n'.join([insert_stmt.format(product='Z', release=release_number),
-	                  insert_stmt.format(product='W', release=release_number),
-	                  'commit;\n'])
+	if phase == 'TABLE':
+		return _create_table_piece(name)
+	if phase == 'INDEX':
+		return _create_index_piece(name)
+	if phase == 'DATA':
+		return _create_sqlldr_piece(name, data_dir)
+	if phase == 'PACKAGE_HEADER':
+		return _create_object_piece('PACKAGE', name, 'PKS')
+	if phase == 'PACKAGE_BODY':
+		return _create_object_piece('PACKAGE', name, 'PKB')
+	return _create_object_piece(phase, name)
 
-def generate_ifs_model_script(db_dir, release_number):
-	import time
-	import os
 
-	yield '--This script was generated on %s. \n' % time.ctime()
+def session_header():
+	"""
+	Return the beginning of a session installing objects: the session settings and the check of the user.
+	"""
 
-	yield '\n'.join(
+	return '\n'.join(
 		['alter session set NLS_DATE_LANGUAGE=\'AMERICAN\';',
 		 'alter session set NLS_NUMERIC_CHARACTERS=\'.,\';',
 		 'alter session set NLS_LENGTH_SEMANTICS=&SEMANTIC;',
@@ -77,64 +127,58 @@ def generate_ifs_model_script(db_dir, release_number):
 		 '/',
 		 'set serveroutput on size unlimited \n'])
 
-	yield _create_section('TYPE')
-	for file_name in sorted(os.listdir(os.path.join(db_dir, 'TYPE'))):
-		yield _create_object_piece('TYPE', file_name.split('.')[0])
 
-	yield _create_section('TABLE')
-	for file_name in sorted(os.listdir(os.path.join(db_dir, 'TABLE'))):
-		if not file_name.endswith('.IDX.SQL'):
-			yield _create_table_piece(file_name.split('.')[0])
+def show_errors():
+	return ('-- -------------------------------------------------------------------------------------\n'
+	        '-- Show errors\n'
+	        '-- -------------------------------------------------------------------------------------\n'
+	        'select * from user_errors;\n'
+	        "select 'ORA-20000: [' ||  object_type ||  ' -  ' || table_name || '] is not succesfully installed.' error_msg "
+	        "from db_objects where table_name not in (select object_name from user_objects);\n")
 
-	yield _create_section('SEQUENCE')
-	for file_name in sorted(os.listdir(os.path.join(db_dir, 'SEQUENCE'))):
-		yield _create_object_piece('SEQUENCE', file_name.split('.')[0])
 
-	yield _create_section('FUNCTION')
-	for file_name in sorted(os.listdir(os.path.join(db_dir, 'FUNCTION'))):
-		yield _create_object_piece('FUNCTION', file_name.split('.')[0])
+def update_release_number(release_number):
+	insert_stmt = "insert into application(product, release_date, release_number)values('{product}', sysdate, '{release}');"
 
-	yield _create_section('PROCEDURE')
-	for file_name in sorted(os.listdir(os.path.join(db_dir, 'PROCEDURE'))):
-		yield _create_object_piece('PROCEDURE', file_name.split('.')[0])
+	return '\n'.join([insert_stmt.format(product='Z', release=release_number),
+	                  insert_stmt.format(product='W', release=release_number),
+	                  'commit;\n'])
 
-	yield _create_section('PACKAGE_HEADER')
-	for file_name in sorted(os.listdir(os.path.join(db_dir, 'PACKAGE'))):
-		if file_name.endswith('.PKS'):
-			yield _create_object_piece('PACKAGE', file_name.split('.')[0], 'PKS')
+def generate_ifs_model_script(install_objects, release_number):
+	"""
+	Generate the IFS script installing the given objects (InstallObject) compiled by the build, in the order of
+	(install_order, name) within each section.
 
-	yield _create_section('VIEW')
-	for file_name in sorted(os.listdir(os.path.join(db_dir, 'VIEW'))):
-		yield _create_object_piece('VIEW', file_name.split('.')[0])
+	>>> script = ''.join(generate_ifs_model_script([InstallObject('PROCEDURE', 2, 'PRO_A', 100),
+	...                                             InstallObject('PROCEDURE', 1, 'PRO_B', 100)], '4.0.0.0'))
+	>>> script.index('PROCEDURE/PRO_B.SQL') < script.index('PROCEDURE/PRO_A.SQL')
+	True
+	"""
 
-	yield _create_section('PACKAGE_BODY')
-	for file_name in sorted(os.listdir(os.path.join(db_dir, 'PACKAGE'))):
-		if file_name.endswith('.PKB'):
-			yield _create_object_piece('PACKAGE', file_name.split('.')[0], 'PKB')
+	objects = {}
+	for obj in sorted(install_objects):
+		objects.setdefault(obj.object_type, []).append(obj.name)
 
-	yield _create_section('INIT DATA using SQL Loader')
-	yield 'DEFINE SQLLDR_SCRIPT="&DB_DIR/TOOLS/COMMON/LOAD_SQLLDR.BAT" \n'
-	yield 'prompt SQLLDR_SCRIPT=&SQLLDR_SCRIPT \n'
-	for file_name in sorted(os.listdir(os.path.join(db_dir, 'INIT_TABLE'))):
-		if file_name.endswith('.DAT'):
-			yield _create_sqlldr_piece(file_name.split('.')[0])
+	yield '--This script was generated for the release %s. \n' % release_number
+	yield session_header()
 
-	yield _create_section('Load application release table')
-	yield _update_release_number(release_number)
+	for phase, object_type in PHASES:
+		if phase == 'DATA':
+			yield _create_section('INIT DATA using SQL Loader')
+			yield SQLLDR_DEFINE
+		elif phase == 'INDEX':
+			yield _create_section('Load application release table')
+			yield update_release_number(release_number)
+			yield _create_section('INDEXES')
+		else:
+			yield _create_section(phase)
 
-	yield _create_section('INDEXES')
-	for file_name in sorted(os.listdir(os.path.join(db_dir, 'TABLE'))):
-		if file_name.endswith('.IDX.SQL'):
-			yield _create_index_piece(file_name.split('.')[0])
+		for name in objects.get(object_type, ()):
+			yield object_piece(phase, name)
 
-	yield '-- -------------------------------------------------------------------------------------\n'
-	yield '-- Show errors\n'
-	yield '-- -------------------------------------------------------------------------------------\n'
-	yield 'select * from user_errors;\n'
-	yield ("select 'ORA-20000: [' ||  object_type ||  ' -  ' || table_name || '] is not succesfully installed.' error_msg "
-	       "from db_objects where table_name not in (select object_name from user_objects);\n")
+	yield show_errors()
 
 
 if __name__ == '__main__':
-	for line in generate_ifs_model_script(r'C:\Users\yufa\Desktop\Document\Study\Python\EzDB\Output\DB'):
-		print line
\ No newline at end of file
+	import doctest
+	doctest.testmod()
\ No newline at end of file
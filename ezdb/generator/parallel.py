@@ -0,0 +1,200 @@
+__author__ = 'yufa'
+
+import json
+import heapq
+from collections import namedtuple
+
+import ifs
+
+
+# Folder of the parallel installation scripts in the DB package
+PARALLEL_DIR = 'TOOLS/SCHEMA_CREATION/PARALLEL'
+
+# Estimated time (seconds) to install an object: (fixed time, time per unit of InstallObject.cost) by object type,
+# the PL/SQL objects use the default
+_COST_MODEL = {'TABLE': (0.5, 0.02), 'INDEX': (1.0, 2.0), 'DATA': (2.0, 1.0 / (1024 * 1024))}
+_DEFAULT_COST_MODEL = (0.2, 1.0 / (64 * 1024))
+
+InstallStep = namedtuple('InstallStep', 'phase name cost')
+
+
+def estimated_cost(obj):
+	"""
+	Return the estimated time (seconds) to install the given InstallObject.
+
+	>>> estimated_cost(ifs.InstallObject('TABLE', 1, 'LO_DEMO', 25))
+	1.0
+	"""
+
+	fixed, per_unit = _COST_MODEL.get(obj.object_type, _DEFAULT_COST_MODEL)
+	return round(fixed + per_unit * obj.cost, 3)
+
+
+def install_stages(install_objects):
+	"""
+	Return the stages of the installation in order, as (phase, install_order, steps). The steps of a stage are
+	independent of each other and depend on all the steps of the previous stage, the stages follow the phases of the
+	IFS script (see ifs.PHASES): types, tables, PL/SQL objects, loads (which use the PL/SQL procedure EXEC_IMMEDIATE)
+	and indexes. Each install_order of a phase is a stage of its own.
+	"""
+
+	objects = {}
+	for obj in install_objects:
+		objects.setdefault(obj.object_type, []).append(obj)
+
+	stages = []
+	for phase, object_type in ifs.PHASES:
+		levels = {}
+		for obj in objects.get(object_type, ()):
+			levels.setdefault(obj.install_order, []).append(InstallStep(phase, obj.name, estimated_cost(obj)))
+		for install_order in sorted(levels):
+			stages.append((phase, install_order, sorted(levels[install_order], key=lambda step: step.name)))
+	return stages
+
+
+def partition(steps, sessions):
+	"""
+	Split the steps into at most the given number of sessions of about the same estimated time: the longest steps
+	first, each one to the least loaded session.
+
+	>>> steps = [InstallStep('TABLE', name, cost) for name, cost in (('A', 5), ('B', 3), ('C', 2), ('D', 2))]
+	>>> [[step.name for step in session] for session in partition(steps, 2)]
+	[['A', 'D'], ['B', 'C']]
+	"""
+
+	loads = [(0, i) for i in range(min(sessions, len(steps)))]
+	partitions = [[] for _ in loads]
+	for step in sorted(steps, key=lambda step: (-step.cost, step.name)):
+		load, i = heapq.heappop(loads)
+		partitions[i].append(step)
+		heapq.heappush(loads, (load + step.cost, i))
+	return partitions
+
+
+def install_plan(install_objects, sessions):
+	"""
+	Return the plan of the parallel installation: the stages, each one with the steps of each session (worker script)
+	and the stage it depends on.
+	"""
+
+	stages = []
+	for phase, install_order, steps in install_stages(install_objects):
+		number = len(stages) + 1
+		workers = []
+		for i, session_steps in enumerate(partition(steps, sessions)):
+			workers.append({'script': 'S%02d_%s_%d_W%d.SQL' % (number, phase, install_order, i + 1),
+			                'estimated_seconds': round(sum(step.cost for step in session_steps), 3),
+			                'steps': [[step.name, step.cost] for step in session_steps]})
+		stages.append({'stage': number,
+		               'phase': phase,
+		               'install_order': install_order,
+		               'depends_on': [number - 1] if number > 1 else [],
+		               'estimated_seconds': max(worker['estimated_seconds'] for worker in workers),
+		               'workers': workers})
+
+	return {'sessions': sessions,
+	        'stages': stages,
+	        'estimated_seconds': round(sum(stage['estimated_seconds'] for stage in stages), 3),
+	        'serial_estimated_seconds': round(sum(worker['estimated_seconds'] for stage in stages
+	                                              for worker in stage['workers']), 3)}
+
+
+def _worker_script(stage, worker, release_number):
+	script = ['--Stage %d (%s, install order %d) of the release %s, estimated %.1f seconds.\n'
+	          % (stage['stage'], stage['phase'], stage['install_order'], release_number, worker['estimated_seconds']),
+	          '@"&1"\n',
+	          ifs.session_header()]
+
+	if stage['phase'] == 'DATA':
+		# the loads running at the same time must not share the sql*loader return code file
+		script.append('DEFINE OUTPUT_DIR="&OUTPUT_DIR/%s"\nhost mkdir "&OUTPUT_DIR"\n' % worker['script'][:-4])
+		script.append(ifs.SQLLDR_DEFINE)
+
+	script.extend(ifs.object_piece(stage['phase'], name) for name, _ in worker['steps'])
+	script.append('exit\n')
+	return ''.join(script)
+
+
+def _finish_script(release_number):
+	return ''.join(['--Last step of the parallel installation of the release %s.\n' % release_number,
+	                '@"&1"\n',
+	                ifs.session_header(),
+	                ifs.update_release_number(release_number),
+	                '--The PL/SQL objects installed in parallel may have been compiled before the objects they use\n',
+	                'exec DBMS_UTILITY.COMPILE_SCHEMA(schema => USER, compile_all => FALSE);\n',
+	                ifs.show_errors(),
+	                'exit\n'])
+
+
+def _coordinator_sh(plan, release_number):
+	script = ['#!/bin/sh\n',
+	          '# Install the release %s with up to %d parallel sqlplus sessions, stage by stage.\n'
+	          % (release_number, plan['sessions']),
+	          '# Usage: sh IFS_PARALLEL.sh <connection> <defines script>\n',
+	          '# The defines script is a sqlplus script defining the variables used by IFS_MODEL.SQL (DB_DIR, TBS_DATA ...).\n',
+	          'CONNECTION="$1"\n',
+	          'DEFINES="$2"\n',
+	          'SCRIPT_DIR=$(cd "$(dirname "$0")" && pwd)\n\n',
+	          'run() {\n',
+	          '\tsqlplus -S -L "$CONNECTION" @"$SCRIPT_DIR/$1" "$DEFINES" > "${1%.SQL}.LOG" 2>&1\n',
+	          '}\n\n']
+
+	for stage in plan['stages']:
+		script.append('echo "Stage %d: %s (install order %d)"\n' % (stage['stage'], stage['phase'], stage['install_order']))
+		script.extend('run %s &\n' % worker['script'] for worker in stage['workers'])
+		script.append('wait\n\n')
+
+	script.append('run IFS_FINISH.SQL\n')
+	return ''.join(script)
+
+
+def _coordinator_bat(plan, release_number):
+	script = ['@echo off\n',
+	          'rem Install the release %s with up to %d parallel sqlplus sessions, stage by stage.\n'
+	          % (release_number, plan['sessions']),
+	          'rem Usage: IFS_PARALLEL.BAT ^<connection^> ^<defines script^>\n',
+	          'rem The defines script is a sqlplus script defining the variables used by IFS_MODEL.SQL (DB_DIR, TBS_DATA ...).\n',
+	          'set CONNECTION=%~1\n',
+	          'set DEFINES=%~2\n',
+	          'set SCRIPT_DIR=%~dp0\n\n',
+	          'rem The pipe is closed, so the stage is finished, when all the sessions started in the block have exited\n']
+
+	run = 'start "" /B cmd /C sqlplus -S -L "%%CONNECTION%%" @"%%SCRIPT_DIR%%%s" "%%DEFINES%%" ^> "%s.LOG" 2^>^&1\n'
+	for stage in plan['stages']:
+		script.append('echo Stage %d: %s (install order %d)\n' % (stage['stage'], stage['phase'], stage['install_order']))
+		script.append('(\n')
+		script.extend(run % (worker['script'], worker['script'][:-4]) for worker in stage['workers'])
+		script.append(') | set /P "="\n\n')
+
+	script.append('sqlplus -S -L "%CONNECTION%" @"%SCRIPT_DIR%IFS_FINISH.SQL" "%DEFINES%" > "IFS_FINISH.LOG" 2>&1\n')
+	return ''.join(script)
+
+
+def generate_parallel_scripts(install_objects, release_number, sessions):
+	"""
+	Generate the scripts installing the given objects (InstallObject) with up to the given number of parallel sqlplus
+	sessions, as (file name, content):
+	IFS_PLAN.json - the stages of the installation and the steps of each worker script, with their estimated time,
+	a worker script for each session of each stage, IFS_FINISH.SQL run at the end,
+	IFS_PARALLEL.sh and IFS_PARALLEL.BAT running the worker scripts of each stage in parallel, stage by stage.
+
+	>>> objects = [ifs.InstallObject('TABLE', 1, 'LO_%d' % i, 10) for i in range(3)]
+	>>> [name for name, _ in generate_parallel_scripts(objects, '4.0.0.0', 2)]
+	['IFS_PLAN.json', 'S01_TABLE_1_W1.SQL', 'S01_TABLE_1_W2.SQL', 'IFS_FINISH.SQL', 'IFS_PARALLEL.sh', 'IFS_PARALLEL.BAT']
+	"""
+
+	plan = install_plan(install_objects, sessions)
+	yield 'IFS_PLAN.json', json.dumps(plan, indent=2, sort_keys=True)
+
+	for stage in plan['stages']:
+		for worker in stage['workers']:
+			yield worker['script'], _worker_script(stage, worker, release_number)
+
+	yield 'IFS_FINISH.SQL', _finish_script(release_number)
+	yield 'IFS_PARALLEL.sh', _coordinator_sh(plan, release_number)
+	yield 'IFS_PARALLEL.BAT', _coordinator_bat(plan, release_number)
+
+
+if __name__ == '__main__':
+	import doctest
+	doctest.testmod()
@@ -0,0 +1,208 @@
+__author__ = 'yufa'
+
+import os
+import shutil
+import hashlib
+import logging
+import tarfile
+from cStringIO import StringIO
+
+import archive
+from copier import FileCopier
+
+
+class DirectorySink(object):
+	"""
+	Write the members of the DB package into the exploded DB folder, which is packaged afterwards.
+	The member names are relative to the DB folder, e.g. TABLE/LO_DEMO.SQL.
+	The source files are copied by the given FileCopier (in the background if it has several threads).
+	If shared_dir is given, the DB folder of another variant of the same build (see ezdb.Compiler.compile_variants),
+	the files already copied there are hard linked from it instead.
+	"""
+
+	def __init__(self, db_dir, clean=True, copier=None, shared_dir=None):
+		self.db_dir = db_dir
+		self.copier = copier or FileCopier()
+		self.shared_dir = shared_dir
+		self.__linker = FileCopier(hardlink=True)
+		if clean and os.path.exists(db_dir):
+			shutil.rmtree(db_dir, ignore_errors=False)
+		if not os.path.isdir(db_dir):
+			os.makedirs(db_dir)
+
+	def add_folder(self, name, clean=False):
+		folder = os.path.join(self.db_dir, name)
+		if clean and os.path.exists(folder):
+			shutil.rmtree(folder, ignore_errors=False)
+		if not os.path.isdir(folder):
+			os.makedirs(folder)
+
+	def remove_folder(self, name):
+		# left by a previous build into the reused DB folder
+		folder = os.path.join(self.db_dir, name)
+		if os.path.exists(folder):
+			shutil.rmtree(folder, ignore_errors=False)
+
+	def write(self, name, data, binary=False):
+		with open(os.path.join(self.db_dir, name), 'wb' if binary else 'w') as f:
+			f.write(data)
+
+	def copy(self, name, source_file):
+		shared_file = self.shared_dir and os.path.join(self.shared_dir, name)
+		if shared_file and os.path.isfile(shared_file):
+			# copied from the same source file by the other variant
+			self.__linker.copy(shared_file, os.path.join(self.db_dir, name))
+		else:
+			self.copier.copy(source_file, os.path.join(self.db_dir, name))
+
+	def members(self):
+		self.copier.wait()
+		return archive.tree_members(self.db_dir)
+
+	@property
+	def copy_stats(self):
+		stats = dict(self.copier.stats)
+		for method, size in self.__linker.stats.iteritems():
+			stats[method] = stats.get(method, 0) + size
+		return stats
+
+	def close(self):
+		self.copier.close()
+
+	def abort(self):
+		self.copier.abort()
+
+
+class ArchiveSink(object):
+	"""
+	Write the members of the DB package straight into the package (tar stream), from memory or from their source
+	file, without writing the DB folder.
+	The package is written to a temporary file, renamed when the sink is closed, so a failed build doesn't leave a
+	truncated package behind. The metadata of the members is normalized (see archive.normalize_tarinfo).
+	"""
+
+	def __init__(self, path, compression='gzip', level=None, threads=1, root='DB'):
+		self.path = path
+		self.root = root
+		self.__temp_path = path + '.tmp'
+		self.__mtime = archive.package_mtime()
+		self.__fileobj, self.__files = archive.open_package(self.__temp_path, compression, level, threads, self.__mtime)
+		self.__tar = tarfile.open(fileobj=self.__fileobj, mode='w|')
+		self.__members = []
+		self.__folders = set()
+		self.add_folder('')
+
+	def __member(self, name):
+		return '/'.join([self.root, name.replace(os.sep, '/')]).rstrip('/')
+
+	def add_folder(self, name, clean=False):
+		# nothing is written twice into the package, so a folder is always clean
+		if name in self.__folders: return
+
+		info = tarfile.TarInfo(self.__member(name))
+		info.type = tarfile.DIRTYPE
+		self.__tar.addfile(archive.normalize_tarinfo(info, self.__mtime))
+		self.__folders.add(name)
+		name and self.__members.append((name, None))
+
+	def remove_folder(self, name):
+		# nothing is in the package unless it is added
+		pass
+
+	def __add_file(self, name, data, mode=0644):
+		info = tarfile.TarInfo(self.__member(name))
+		info.size = len(data)
+		info.mode = mode
+		self.__tar.addfile(archive.normalize_tarinfo(info, self.__mtime), StringIO(data))
+
+		self.__members.append((name, hashlib.sha256(data).hexdigest()))
+
+	def write(self, name, data, binary=False):
+		# same line endings as the files written in text mode into the DB folder
+		if os.linesep != '\n' and not binary:
+			data = data.replace('\n', os.linesep)
+		self.__add_file(name, data)
+
+	def copy(self, name, source_file):
+		with open(source_file, 'rb') as f:
+			self.__add_file(name, f.read(), os.fstat(f.fileno()).st_mode)
+
+	def members(self):
+		"""
+		Return the members written so far, see archive.content_digest.
+		"""
+
+		return list(self.__members)
+
+	@property
+	def copy_stats(self):
+		return {}
+
+	def __close_files(self):
+		for f in self.__files:
+			f.close()
+
+	def close(self):
+		self.__tar.close()
+		self.__close_files()
+		if os.path.exists(self.path):
+			os.remove(self.path)
+		os.rename(self.__temp_path, self.path)
+
+	def abort(self):
+		try:
+			try:
+				self.__tar.close()
+			finally:
+				self.__close_files()
+		finally:
+			if os.path.exists(self.__temp_path):
+				os.remove(self.__temp_path)
+
+
+class TeeSink(object):
+	"""
+	Write the members of the DB package into several sinks, e.g. the package and an exploded DB folder kept as a
+	mirror for debugging. The members are taken from the first sink.
+	"""
+
+	def __init__(self, *sinks):
+		self.sinks = sinks
+
+	def add_folder(self, name, clean=False):
+		for sink in self.sinks:
+			sink.add_folder(name, clean)
+
+	def remove_folder(self, name):
+		for sink in self.sinks:
+			sink.remove_folder(name)
+
+	def write(self, name, data, binary=False):
+		for sink in self.sinks:
+			sink.write(name, data, binary)
+
+	def copy(self, name, source_file):
+		for sink in self.sinks:
+			sink.copy(name, source_file)
+
+	def members(self):
+		return self.sinks[0].members()
+
+	@property
+	def copy_stats(self):
+		stats = {}
+		for sink in self.sinks:
+			for method, size in sink.copy_stats.iteritems():
+				stats[method] = stats.get(method, 0) + size
+		return stats
+
+	def close(self):
+		for sink in self.sinks:
+			sink.close()
+
+	def abort(self):
+		for sink in self.sinks:
+			try:
+				sink.abort()
+			except Exception, e:
+				logging.warning('Failed to abort the output %s: %s' % (sink, e))